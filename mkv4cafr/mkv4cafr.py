@@ -5,8 +5,8 @@ import getpass
 import subprocess
 import json
 import copy
-import glob
 import signal
+import time
 import coverage
 
 from mkv4cafrlib import mkv4cafrlib
@@ -15,9 +15,20 @@ from mkv4cafrlib import fileutils
 from mkv4cafrlib import mkvtoolnixutils
 from mkv4cafrlib import mkvmergeutils
 from mkv4cafrlib import jsonutils
+from mkv4cafrlib import jobsutils
+from mkv4cafrlib import cacheutils
+from mkv4cafrlib import journalutils
+from mkv4cafrlib import watchutils
+from mkv4cafrlib import ebmlutils
+from mkv4cafrlib import progressutils
+from mkv4cafrlib import metricsutils
+from mkv4cafrlib import profileutils
 
 # Constants
 MAX_SUBTITLES_PER_HOUR_RATIO = 75.0
+EDIT_BACKEND_MKVPROPEDIT = "mkvpropedit"
+EDIT_BACKEND_NATIVE = "native"
+EDIT_BACKENDS = [EDIT_BACKEND_MKVPROPEDIT, EDIT_BACKEND_NATIVE]
 
 
 # Register a signal handler to properly exit the application.
@@ -48,6 +59,26 @@ def directory_must_exist_if_specified(raw_path):
     return os.path.abspath(raw_path)
 
 
+def positive_integer(raw_value):
+    try:
+        value = int(raw_value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('"{}" is not an integer'.format(raw_value))
+    if (value < 1):
+        raise argparse.ArgumentTypeError('"{}" must be greater than 0'.format(raw_value))
+    return value
+
+
+def positive_float(raw_value):
+    try:
+        value = float(raw_value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('"{}" is not a number'.format(raw_value))
+    if (value <= 0):
+        raise argparse.ArgumentTypeError('"{}" must be greater than 0'.format(raw_value))
+    return value
+
+
 def main() -> int:
     print_header()
 
@@ -57,8 +88,29 @@ def main() -> int:
 
     parser.add_argument('-f', '--input-file', type=argparse.FileType('rb'), help='input mkv file')
     parser.add_argument('-d', '--input-dir', action='store', type=str, help='input mkv directory', default=None)
+    parser.add_argument('-l', '--input-list', action='store', type=str, help='text file listing input mkv files, one per line', default=None)
     parser.add_argument('-o', '--output-dir', type=directory_must_exist_if_specified, help='output directory')
     parser.add_argument('-e', '--edit-in-place', action='store_true', help='Process input file in place', default=False)
+    parser.add_argument('-r', '--recursive', action='store_true', help='Search for mkv files in subdirectories of input directory', default=False)
+    parser.add_argument('--ignore-case', action='store_true', help='Match the .mkv extension of files regardless of its case', default=False)
+    parser.add_argument('-j', '--jobs', type=positive_integer, help='number of files processed in parallel in input directory mode', default=1)
+    parser.add_argument('-k', '--keep-going', action='store_true', help='Continue processing other files when a file fails', default=False)
+    parser.add_argument('--failures-file', action='store', type=str, help='text file listing the files that failed, one per line. Can be used as <input list>', default=None)
+    parser.add_argument('--journal', action='store', type=str, help='journal file recording the outcome of each file in input directory mode', default=None)
+    parser.add_argument('--resume', action='store_true', help='Skip files already completed according to the journal', default=False)
+    parser.add_argument('--plan-only', action='store', type=str, help='Do not modify any file. Write the required changes of each file to the given json lines file instead', default=None)
+    parser.add_argument('-w', '--watch', action='store_true', help='Keep running and process new or modified files of input directory as they are written', default=False)
+    parser.add_argument('--watch-settle', type=positive_float, help='number of seconds the size and modification time of a file must stay unchanged before it is processed in watch mode', default=watchutils.DEFAULT_SETTLE_TIME_SECONDS)
+    parser.add_argument('--watch-interval', type=positive_float, help='number of seconds between directory scans when the platform does not support file system notifications', default=watchutils.DEFAULT_POLLING_INTERVAL_SECONDS)
+    parser.add_argument('--probe-backend', choices=mkvmergeutils.PROBE_BACKENDS, help='Read metadata of files with mkvmerge or with the native Matroska reader. The native reader uses mkvmerge for files it can not read, and for files with AC-3, E-AC-3, DTS, TrueHD or MLP audio tracks, whose codec name mkvmerge reads from the audio content', default=mkvmergeutils.PROBE_BACKEND_MKVMERGE)
+    parser.add_argument('--edit-backend', choices=EDIT_BACKENDS, help='Edit metadata of files with mkvpropedit or with the native Matroska writer. The native writer falls back to mkvpropedit for changes it does not support', default=EDIT_BACKEND_MKVPROPEDIT)
+    parser.add_argument('--progress-rate', type=positive_float, help='maximum number of times per second the copy progress is redrawn', default=progressutils.DEFAULT_MAX_REFRESH_RATE)
+    parser.add_argument('--metrics-file', action='store', type=str, help='json lines file recording the duration of each processing stage of each file', default=None)
+    parser.add_argument('--profile', action='store', type=str, help='directory where the profiling statistics of each file are written. Files are processed sequentially', default=None)
+    parser.add_argument('--profile-top', type=positive_integer, help='number of functions listed in the profiling summary', default=profileutils.DEFAULT_TOP_COUNT)
+    parser.add_argument('--no-probe-cache', action='store_true', help='Always probe files with mkvmerge instead of using cached results', default=False)
+    parser.add_argument('--probe-cache-dir', action='store', type=str, help='probe cache directory', default=cacheutils.get_default_cache_dir_path())
+    parser.add_argument('--probe-cache-size', type=positive_integer, help='maximum size of the probe cache in megabytes', default=int(cacheutils.DEFAULT_PROBE_CACHE_MAX_SIZE/(1024*1024)))
 
     try:
         args = parser.parse_args()
@@ -68,27 +120,131 @@ def main() -> int:
     print("Argument values:")
     print("  input file: " + fileutils.get_str_path_or_empty_str(args.input_file) )
     print("  input directory: " + fileutils.get_str_path_or_empty_str(args.input_dir))
+    print("  input list: " + fileutils.get_str_path_or_empty_str(args.input_list))
     print("  output directory: " + fileutils.get_str_path_or_empty_str(args.output_dir))
     print("  edit-in-place: " + str(args.edit_in_place))
+    print("  recursive: " + str(args.recursive))
+    print("  ignore-case: " + str(args.ignore_case))
+    print("  jobs: " + str(args.jobs))
+    print("  keep-going: " + str(args.keep_going))
+    print("  failures file: " + fileutils.get_str_path_or_empty_str(args.failures_file))
+    print("  journal: " + fileutils.get_str_path_or_empty_str(args.journal))
+    print("  resume: " + str(args.resume))
+    print("  plan only: " + fileutils.get_str_path_or_empty_str(args.plan_only))
+    print("  watch: " + str(args.watch))
+    print("  watch settle: " + str(args.watch_settle))
+    print("  watch interval: " + str(args.watch_interval))
+    print("  probe backend: " + args.probe_backend)
+    print("  edit backend: " + args.edit_backend)
+    print("  progress rate: " + str(args.progress_rate))
+    print("  metrics file: " + fileutils.get_str_path_or_empty_str(args.metrics_file))
+    print("  profile: " + fileutils.get_str_path_or_empty_str(args.profile))
+    print("  probe cache: " + ("disabled" if args.no_probe_cache else args.probe_cache_dir))
 
     # Valide input arguments
-    if (fileutils.get_str_path_or_none(args.input_dir) != None and fileutils.get_str_path_or_none(args.input_file) != None):
-        print("<input file> and <input directory> are mutually exclusive.")
+    input_count = 0
+    for input_arg in [args.input_file, args.input_dir, args.input_list]:
+        if (fileutils.get_str_path_or_none(input_arg) != None):
+            input_count += 1
+    if (input_count > 1):
+        print("<input file>, <input directory> and <input list> are mutually exclusive.")
         return 1
-    if (fileutils.get_str_path_or_none(args.input_dir) == None and fileutils.get_str_path_or_none(args.input_file) == None):
-        print("Must specify <input file> or <input directory>.")
+    if (input_count == 0):
+        print("Must specify <input file>, <input directory> or <input list>.")
         return 1
     if (not args.edit_in_place and fileutils.get_str_path_or_none(args.output_dir) == None):
         print("Must specify <output directory> if not editing in-place.")
         return 1
+    if (args.resume and args.journal is None):
+        print("Must specify <journal> to resume a previous run.")
+        return 1
+    if (args.watch and fileutils.get_str_path_or_none(args.input_dir) == None):
+        print("Must specify <input directory> in watch mode.")
+        return 1
+    # The copies in the output directory would be found again while searching the input directory
+    if (args.recursive and not args.edit_in_place and args.input_dir and args.output_dir and
+        fileutils.is_path_in_directory(str(args.output_dir), str(args.input_dir))):
+        print("<output directory> must not be inside <input directory> when searching subdirectories.")
+        return 1
+
+    # Only one profiler can be active at a time, and it only profiles its own thread
+    if (args.profile is not None and args.jobs > 1):
+        print("Files are processed sequentially while profiling. Ignoring <jobs>.")
+        args.jobs = 1
+
+    progressutils.get_progress_tracker().set_max_refresh_rate(args.progress_rate)
 
     # Search for mkvpropedit on the system    
+    # MKVToolNix is optional if files are read and edited natively. It is only used as a fallback.
     mkvtoolnix_install_path = mkvtoolnixutils.setup_mkvtoolnix()
+    mkvtoolnix_optional = (args.probe_backend == mkvmergeutils.PROBE_BACKEND_NATIVE and args.edit_backend == EDIT_BACKEND_NATIVE)
     if (mkvtoolnix_install_path is None):
-        sys.exit(1)
-    mkvmerge_exec_path    = os.path.join(mkvtoolnix_install_path, "mkvmerge"    + findutils.get_executable_file_extension_name())
-    mkvpropedit_exec_path = os.path.join(mkvtoolnix_install_path, "mkvpropedit" + findutils.get_executable_file_extension_name())
-    print("Found mkvpropedit: " + mkvpropedit_exec_path)
+        if (not mkvtoolnix_optional):
+            sys.exit(1)
+        print("Continuing without MKVToolNix. Files that can not be processed natively will fail.")
+    else:
+        mkvmerge_exec_path    = os.path.join(mkvtoolnix_install_path, "mkvmerge"    + findutils.get_executable_file_extension_name())
+        mkvpropedit_exec_path = os.path.join(mkvtoolnix_install_path, "mkvpropedit" + findutils.get_executable_file_extension_name())
+        print("Found mkvpropedit: " + mkvpropedit_exec_path)
+
+    # Resources shared by all processed files:
+    #   probe_cache:   cache of mkvmerge results, or None.
+    #   plan_file:     opened plan file in plan only mode, or None.
+    #   probe_backend: backend reading the metadata of files.
+    #   edit_backend:  backend editing the metadata of files.
+    #   metrics:       recorder of the duration of processing stages, or None.
+    #   profiler:      profiler of each processed file, or None.
+    context = dict()
+    context['probe_cache'] = None
+    context['plan_file'] = None
+    context['metrics'] = None
+    context['profiler'] = None
+    context['probe_backend'] = args.probe_backend
+    context['edit_backend'] = args.edit_backend
+
+    # Open the probe cache. Processing continues without a cache if it can not be opened.
+    if (not args.no_probe_cache):
+        context['probe_cache'] = cacheutils.open_probe_cache(args.probe_cache_dir, args.probe_cache_size*1024*1024)
+
+    try:
+        if (args.plan_only is not None):
+            try:
+                context['plan_file'] = open(args.plan_only, "w", encoding="utf-8")
+            except Exception as e:
+                print("Failed to open plan file '" + args.plan_only + "': " + str(e))
+                return 1
+        if (args.metrics_file is not None):
+            context['metrics'] = metricsutils.open_metrics_file(args.metrics_file)
+            if (context['metrics'] is None):
+                return 1
+        if (args.profile is not None):
+            context['profiler'] = profileutils.open_profiler(args.profile, args.profile_top)
+            if (context['profiler'] is None):
+                return 1
+        return process_input(args, context)
+    finally:
+        if (context['probe_cache'] is not None):
+            context['probe_cache'].close()
+        if (context['plan_file'] is not None):
+            context['plan_file'].close()
+        if (context['metrics'] is not None):
+            context['metrics'].close()
+
+
+def read_input_list(file_path: str) -> list:
+    # Read file paths from a text file, one per line.
+    # Empty lines and lines starting with '#' are ignored.
+    mkv_files = list()
+    with open(file_path, "r", encoding="utf-8") as text_file:
+        for line in text_file:
+            line = line.rstrip("\r\n")
+            if (line.strip() == "" or line.startswith("#")):
+                continue
+            mkv_files.append(os.path.abspath(line))
+    return mkv_files
+
+
+def process_input(args, context: dict) -> int:
 
     # If we run in input directory mode
     if (fileutils.get_str_path_or_none(args.input_dir) != None):
@@ -98,26 +254,44 @@ def main() -> int:
             print("Directory '" + input_dir_abspath + "' not found.")
             return 1
 
-        # Find all *.mkv files
-        mkv_files = []
-        for mkv_file in glob.glob(glob.escape(input_dir_abspath) + "/*.mkv"):
-            mkv_files.append(mkv_file)
-
-        print("Processing " + str(len(mkv_files)) + " mkv files from input directory '" + input_dir_abspath + "'.")
-        for i in range(len(mkv_files)):
-            mkv_file_path = mkv_files[i]
-            print("Processing file " + str(i+1) + " of " + str(len(mkv_files)) + ": '" + mkv_file_path + "'.")
-            exit_code = process_file(mkv_file_path, str(args.output_dir), args.edit_in_place)
-            if (exit_code != 0):
-                print("Failed processing file " + str(i+1) + " of " + str(len(mkv_files)) + ": '" + mkv_file_path + "'!")
-                return exit_code
-            
-        print("done.")
-        return 0
+        if (args.watch):
+            return watch_input_dir(input_dir_abspath, args, context)
+
+        # Find all *.mkv files.
+        # Files are discovered while they are processed.
+        mkv_files = findutils.find_files_by_extension(input_dir_abspath, ".mkv", args.recursive, args.ignore_case)
+
+        print("Processing mkv files from input directory '" + input_dir_abspath + "'.")
+        return process_batch(mkv_files, args, context)
+
+    # or we run in input list mode
+    elif (fileutils.get_str_path_or_none(args.input_list) != None):
+        try:
+            mkv_files = read_input_list(args.input_list)
+        except Exception as e:
+            print("Failed to read input list '" + args.input_list + "': " + str(e))
+            return 1
+
+        print("Processing " + str(len(mkv_files)) + " mkv files from input list '" + args.input_list + "'.")
+        return process_batch(mkv_files, args, context)
     
     # or we run in input file mode
     elif (fileutils.get_str_path_or_none(args.input_file) != None):
-        exit_code = process_file(fileutils.get_str_path_or_empty_str(args.input_file), str(args.output_dir), args.edit_in_place)
+        input_file_path = os.path.abspath(fileutils.get_str_path_or_empty_str(args.input_file))
+        file_report = dict()
+        start_time = time.monotonic()
+        process_file_args = (input_file_path, str(args.output_dir), args.edit_in_place, context['probe_cache'], file_report, args.plan_only is not None, context['probe_backend'], context['edit_backend'])
+        if (context['profiler'] is not None):
+            exit_code = context['profiler'].profile(input_file_path, process_file, *process_file_args)
+            context['profiler'].print_summary()
+        else:
+            exit_code = process_file(*process_file_args)
+        if (context['metrics'] is not None):
+            outcome = file_report['outcome'] if exit_code == 0 else journalutils.OUTCOME_FAILED
+            context['metrics'].record_file(input_file_path, outcome, time.monotonic() - start_time, file_report['stages'] if 'stages' in file_report else [])
+            metricsutils.print_summary(context['metrics'].write_summary())
+        if (context['plan_file'] is not None):
+            write_plan_record(context['plan_file'], input_file_path, exit_code, file_report)
         if (exit_code != 0):
             print("Failed processing file '" + fileutils.get_str_path_or_empty_str(args.input_file) + "'!")
         else:
@@ -128,6 +302,91 @@ def main() -> int:
         return 1
 
 
+def process_batch(mkv_files, args, context: dict) -> int:
+    # Load files completed by a previous run
+    completed_files = dict()
+    if (args.resume):
+        completed_files = journalutils.load_completed_files(args.journal)
+        print("Resuming run. " + str(len(completed_files)) + " files were already completed.")
+
+    journal = None
+    if (args.journal is not None):
+        try:
+            journal = journalutils.RunJournal(args.journal)
+        except Exception as e:
+            print("Failed to open journal file '" + args.journal + "': " + str(e))
+            return 1
+
+    try:
+        exit_code = process_files(mkv_files, args, context, journal, completed_files)
+    finally:
+        if (journal is not None):
+            journal.close()
+    if (exit_code != 0):
+        return exit_code
+
+    print("done.")
+    return 0
+
+
+def watch_input_dir(input_dir_abspath: str, args, context: dict) -> int:
+    # Only process the files that are created or modified after the watch is started.
+    # Existing files must be processed with a regular run, optionally with the same journal.
+    try:
+        watcher = watchutils.create_watcher(input_dir_abspath, ".mkv", args.recursive, args.ignore_case, args.watch_interval)
+    except Exception as e:
+        print("Failed to watch directory '" + input_dir_abspath + "': " + str(e))
+        return 1
+    tracker = watchutils.StabilityTracker(args.watch_settle)
+
+    completed_files = dict()
+    if (args.resume):
+        completed_files = journalutils.load_completed_files(args.journal)
+        print("Resuming run. " + str(len(completed_files)) + " files were already completed.")
+
+    journal = None
+    if (args.journal is not None):
+        try:
+            journal = journalutils.RunJournal(args.journal)
+        except Exception as e:
+            watcher.close()
+            print("Failed to open journal file '" + args.journal + "': " + str(e))
+            return 1
+
+    # Fingerprint of each file after it was processed.
+    # Editing a file in place generates new events for the file. They must not trigger processing the file again.
+    processed_fingerprints = dict()
+
+    print("Watching directory '" + input_dir_abspath + "' for new mkv files. Press CTRL+C to stop.")
+    try:
+        while True:
+            for mkv_file_path in watcher.get_changed_paths(min(1.0, args.watch_settle)):
+                tracker.add(mkv_file_path)
+
+            mkv_files = list()
+            for mkv_file_path in tracker.pop_stable_paths():
+                if (mkv_file_path in processed_fingerprints and processed_fingerprints[mkv_file_path] == get_file_fingerprint(mkv_file_path)):
+                    continue
+                mkv_files.append(mkv_file_path)
+            if (len(mkv_files) == 0):
+                continue
+
+            # A failure does not stop watching. The failed file is processed again if it is modified.
+            # Files that were not processed, for example files already completed by a previous run, are not fingerprinted.
+            processed_files = set()
+            process_files(mkv_files, args, context, journal, completed_files, processed_files, True)
+            for mkv_file_path in processed_files:
+                processed_fingerprints[mkv_file_path] = get_file_fingerprint(mkv_file_path)
+            print("Watching directory '" + input_dir_abspath + "' for new mkv files.")
+    except KeyboardInterrupt:
+        print("Watch stopped.")
+    finally:
+        watcher.close()
+        if (journal is not None):
+            journal.close()
+    return 0
+
+
 def indent_string(value: str, indent: int):
     lines = value.split("\n")
     for i in range(len(lines)):
@@ -136,39 +395,263 @@ def indent_string(value: str, indent: int):
     return output
 
 
-def process_file(input_file_path: str, output_dir_path: str, edit_in_place: bool) -> int:
+def get_file_number_str(index: int, total_count):
+    # The total number of files is unknown when files are discovered while being processed.
+    if (total_count is None):
+        return str(index+1)
+    return str(index+1) + " of " + str(total_count)
+
+
+def get_file_fingerprint(file_path: str):
+    try:
+        return cacheutils.get_file_identity(file_path)
+    except OSError as e:
+        return None
+
+
+def print_batch_summary(outcome_counts: dict, skipped_count: int, failures: list, plan_only: bool = False):
+    processed_count = sum(outcome_counts.values())
+    print("Processed " + str(processed_count) + " mkv files.")
+    if (skipped_count > 0):
+        print("Skipped " + str(skipped_count) + " mkv files already processed.")
+    print("  unchanged: " + str(outcome_counts[journalutils.OUTCOME_UNCHANGED]))
+    if (plan_only):
+        print("  require changes: " + str(outcome_counts[journalutils.OUTCOME_EDITED]))
+    else:
+        print("  edited: " + str(outcome_counts[journalutils.OUTCOME_EDITED]))
+    print("  failed: " + str(outcome_counts[journalutils.OUTCOME_FAILED]))
+    if (len(failures) > 0):
+        print("The following files have failed:")
+        for mkv_file_path, error in failures:
+            print("  '" + mkv_file_path + "': " + error)
+
+
+def write_plan_record(plan_file, mkv_file_path: str, exit_code: int, file_report: dict):
+    # Write the planned changes of a file as a single json line.
+    record = dict()
+    record['path'] = mkv_file_path
+    record['size'] = file_report['size'] if 'size' in file_report else None
+    if (exit_code != 0):
+        record['status'] = "failed"
+        record['error'] = file_report['error'] if 'error' in file_report else "unknown error"
+    elif (file_report['outcome'] == journalutils.OUTCOME_UNCHANGED):
+        record['status'] = "unchanged"
+    else:
+        record['status'] = "edit"
+        record['diff'] = file_report['diff']
+        record['target'] = file_report['target']
+        record['copy'] = (file_report['target'] != mkv_file_path)
+        record['mkvpropedit_args'] = file_report['mkvpropedit_args']
+    plan_file.write(json.dumps(record) + "\n")
+    plan_file.flush()
+
+
+def write_failures_file(file_path: str, failures: list) -> bool:
+    # One file path per line. The file can be used as an input list to process the failed files again.
+    try:
+        with open(file_path, "w", encoding="utf-8") as text_file:
+            for mkv_file_path, error in failures:
+                text_file.write(mkv_file_path + "\n")
+    except Exception as e:
+        print("Failed to write failures file '" + file_path + "': " + str(e))
+        return False
+    return True
+
+
+def process_files(mkv_files, args, context: dict, journal = None, completed_files = None, processed_files: set = None, keep_going: bool = None) -> int:
+    # The optional `processed_files` set is filled with the path of each file that was processed, successfully or not.
+    # Files that are not processed because the batch was stopped by a failure are not added.
+    # `keep_going` overrides the --keep-going argument.
+    if (keep_going is None):
+        keep_going = args.keep_going
+
+    # Aggregated exit code of all files. This is the exit code of the first file that failed.
+    batch_exit_code = 0
+    skipped_count = 0
+    outcome_counts = {journalutils.OUTCOME_UNCHANGED: 0, journalutils.OUTCOME_EDITED: 0, journalutils.OUTCOME_FAILED: 0}
+    failures = list()
+    total_count = len(mkv_files) if isinstance(mkv_files, list) else None
+    output_dir_path = str(args.output_dir)
+    input_dir_path = fileutils.get_str_path_or_none(args.input_dir)
+    probe_cache = context['probe_cache']
+    probe_backend = context['probe_backend']
+    edit_backend = context['edit_backend']
+    plan_file = context['plan_file']
+    plan_only = plan_file is not None
+    metrics = context['metrics']
+    profiler = context['profiler']
+    copy_bytes = 0
+
+    def get_pending_files():
+        nonlocal skipped_count
+        for mkv_file_path in mkv_files:
+            # Skip files completed by a previous run
+            if (completed_files and journalutils.is_file_completed(completed_files, mkv_file_path, get_file_fingerprint(mkv_file_path))):
+                print("Skipping file '" + mkv_file_path + "'. File was already processed.")
+                skipped_count += 1
+                continue
+            yield mkv_file_path
+
+    def call_process_file(i: int, mkv_file_path: str, file_report: dict) -> int:
+        file_output_dir_path = output_dir_path
+        if (input_dir_path and not args.edit_in_place):
+            file_output_dir_path = fileutils.get_output_dir_for_input_file(mkv_file_path, input_dir_path, output_dir_path)
+        process_file_args = (mkv_file_path, file_output_dir_path, args.edit_in_place, probe_cache, file_report, plan_only, probe_backend, edit_backend)
+        if (profiler is not None):
+            return profiler.profile(mkv_file_path, process_file, *process_file_args)
+        return process_file(*process_file_args)
+
+    def process_item(item):
+        i, mkv_file_path = item
+        print("Processing file " + get_file_number_str(i, total_count) + ": '" + mkv_file_path + "'.")
+        file_report = dict()
+        start_time = time.monotonic()
+        if (not keep_going):
+            exit_code = call_process_file(i, mkv_file_path, file_report)
+            file_report['duration'] = time.monotonic() - start_time
+            return (exit_code, file_report)
+
+        # An unexpected error in a file must not stop the processing of other files
+        try:
+            exit_code = call_process_file(i, mkv_file_path, file_report)
+        except Exception as e:
+            print(f"{type(e).__name__}: {e}")
+            file_report['error'] = f"{type(e).__name__}: {e}"
+            exit_code = 1
+        file_report['duration'] = time.monotonic() - start_time
+        return (exit_code, file_report)
+
+    def on_item_processed(item, result) -> bool:
+        nonlocal batch_exit_code
+        nonlocal copy_bytes
+        i, mkv_file_path = item
+        exit_code, file_report = result
+        if (processed_files is not None):
+            processed_files.add(mkv_file_path)
+
+        outcome = file_report['outcome'] if 'outcome' in file_report else journalutils.OUTCOME_FAILED
+        if (exit_code != 0):
+            outcome = journalutils.OUTCOME_FAILED
+        outcome_counts[outcome] += 1
+
+        # Record the outcome once the file is processed.
+        # The fingerprint is computed after processing because editing in place modifies the file.
+        # Files are not completed when only planning changes.
+        if (journal is not None and not plan_only):
+            journal.record(mkv_file_path, outcome, get_file_fingerprint(mkv_file_path))
+
+        if (metrics is not None):
+            metrics.record_file(mkv_file_path, outcome, file_report['duration'], file_report['stages'] if 'stages' in file_report else [])
+
+        if (plan_only):
+            write_plan_record(plan_file, mkv_file_path, exit_code, file_report)
+            if (outcome == journalutils.OUTCOME_EDITED and not args.edit_in_place):
+                copy_bytes += file_report['size']
+
+        if (exit_code != 0):
+            print("Failed processing file " + get_file_number_str(i, total_count) + ": '" + mkv_file_path + "'!")
+            failures.append((mkv_file_path, file_report['error'] if 'error' in file_report else "unknown error"))
+            if (batch_exit_code == 0):
+                batch_exit_code = exit_code
+            return keep_going
+        return True
+
+    jobsutils.run_jobs(enumerate(get_pending_files()), process_item, args.jobs, on_item_processed, progressutils.get_progress_tracker().write_output)
+
+    print_batch_summary(outcome_counts, skipped_count, failures, plan_only)
+    if (metrics is not None):
+        metricsutils.print_summary(metrics.write_summary())
+    if (profiler is not None):
+        profiler.print_summary()
+    if (plan_only):
+        print("Plan written to '" + args.plan_only + "'. " + str(copy_bytes) + " bytes would be copied to output directory.")
+    if (args.failures_file is not None):
+        if (write_failures_file(args.failures_file, failures) and len(failures) > 0):
+            print("List of failed files written to '" + args.failures_file + "'.")
+    return batch_exit_code
+
+
+def process_file(input_file_path: str, output_dir_path: str, edit_in_place: bool, probe_cache = None, file_report: dict = None, plan_only: bool = False, probe_backend: str = mkvmergeutils.PROBE_BACKEND_MKVMERGE, edit_backend: str = EDIT_BACKEND_MKVPROPEDIT) -> int:
+    # The optional `file_report` dict is filled with details about how the file was processed:
+    #   outcome: 'unchanged' or 'edited' if the file was processed successfully.
+    #   error:   a short description of the failure if the file could not be processed.
+    #   size:    the size of the input file in bytes.
+    #   diff:    the required metadata changes.
+    #   target:  the file that is edited.
+    #   mkvpropedit_args: the command that edits the target file.
+    #   copy_strategy: how the input file was copied to the output directory, if it was copied.
+    #   stages:  the duration and outcome of each processing stage. See metricsutils.measure_stage().
+    #
+    # If `plan_only` is set, the file is analyzed but nothing is written to disk.
+    # The outcome 'edited' then means that the file requires to be edited.
+    if (file_report is None):
+        file_report = dict()
+    stages = list()
+    file_report['stages'] = stages
 
     # Validate if file exists
     input_abspath = os.path.abspath(input_file_path)
     if not os.path.isfile(input_abspath):
         print("File '" + input_abspath + "' not found.")
+        file_report['error'] = "file not found"
         return 1
+    file_report['size'] = os.path.getsize(input_abspath)
 
     # Parse media json
     print("Getting media information...")
-    try:
-        media_json_bytes = subprocess.check_output(["mkvmerge", "-J", input_abspath])                       
-    except subprocess.CalledProcessError as procexc:                                                                                                   
-        print("Failed to get json metadata for file '" + input_abspath + "'. Error code: ", procexc.returncode, procexc.output)
-        return 1
-    media_json_str = media_json_bytes.decode("utf-8")
+    json_obj = None
+    media_json_bytes = None
+    with metricsutils.measure_stage(stages, "probe") as stage:
+        # The native backend returns the json objects directly. There is nothing to parse.
+        if (probe_backend == mkvmergeutils.PROBE_BACKEND_NATIVE):
+            json_obj = mkvmergeutils.get_native_media_file_info(input_abspath)
+        try:
+            if (json_obj is None):
+                media_json_bytes = mkvmergeutils.get_media_file_json_bytes(input_abspath, probe_cache)
+                stage['bytes'] = len(media_json_bytes)
+        except subprocess.CalledProcessError as procexc:                                                                                                   
+            print("Failed to get json metadata for file '" + input_abspath + "'. Error code: ", procexc.returncode, procexc.output)
+            file_report['error'] = "mkvmerge failed with error code " + str(procexc.returncode)
+            stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+            return 1
+        except FileNotFoundError as e:
+            print("Failed to get json metadata for file '" + input_abspath + "'. mkvmerge not found.")
+            file_report['error'] = "mkvmerge not found"
+            stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+            return 1
 
     # Parse media json
-    try:
-        json_obj = json.loads(media_json_str)
-    except Exception as e:
-        print(str(e))
-        return 1
+    if (json_obj is None):
+        with metricsutils.measure_stage(stages, "parse") as stage:
+            # The raw metadata is only kept for the backup sidecar.
+            # Otherwise, it is released once decoded to text, before the json objects are created.
+            # The sections that the rules do not use are kept as raw json. See mkvmergeutils.split_media_json().
+            try:
+                media_json_text, raw_values = mkvmergeutils.split_media_json(media_json_bytes)
+                if (not edit_in_place or plan_only):
+                    media_json_bytes = None
+                json_obj = mkvmergeutils.decode_media_json_text(media_json_text, raw_values)
+                media_json_text = None
+            except Exception as e:
+                print(str(e))
+                file_report['error'] = "invalid json metadata: " + str(e)
+                stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+                return 1
 
     # Update
-    json_copy = mkv4cafrlib.update_properties_as_per_preferences(json_obj, input_abspath)
+    with metricsutils.measure_stage(stages, "rules") as stage:
+        stage['rules'] = dict()
+        json_copy = mkv4cafrlib.update_properties_as_per_preferences(json_obj, input_abspath, stage['rules'])
 
     # Validate inconsistencies
-    has_inconsistencies = mkv4cafrlib.validate_inconsistencies(json_copy, input_abspath)
-    if (has_inconsistencies == False or has_inconsistencies is None):
-        print("Inconsistencies were found during metadata validation for file '" + input_abspath + "'.")
-        print("Aborting update.")
-        return 1
+    with metricsutils.measure_stage(stages, "validate") as stage:
+        has_inconsistencies = mkv4cafrlib.validate_inconsistencies(json_copy, input_abspath)
+        if (has_inconsistencies == False or has_inconsistencies is None):
+            print("Inconsistencies were found during metadata validation for file '" + input_abspath + "'.")
+            print("Aborting update.")
+            file_report['error'] = "inconsistent metadata"
+            stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+            return 1
 
     # DEBUG:
     #json_copy['tracks'][1] = json_obj['tracks'][1]
@@ -178,25 +661,33 @@ def process_file(input_file_path: str, output_dir_path: str, edit_in_place: bool
 
     # Save metadata for debugging, if possible.
     # Only required if you edit in place.
-    if (edit_in_place):
-        try:
-            with open(input_abspath + ".backup.json", "wb") as binary_file:
-                binary_file.write(media_json_bytes)
-        except Exception as e: pass
-
-        try:
-            with open(input_abspath + ".fix.json", "w") as text_file:
-                #json.dump(json_copy, text_file)
-                #json_copy_str = json.dumps(json_copy, indent=4)
-                #print >> text_file, json_copy
-                json.dump(json_copy, text_file, indent=2)
-        except Exception as e: pass
+    if (edit_in_place and not plan_only):
+        with metricsutils.measure_stage(stages, "sidecars") as stage:
+            try:
+                if (media_json_bytes is not None):
+                    with open(input_abspath + ".backup.json", "wb") as binary_file:
+                        binary_file.write(media_json_bytes)
+                else:
+                    with open(input_abspath + ".backup.json", "w") as text_file:
+                        json.dump(json_obj, text_file, indent=2)
+            except Exception as e: pass
+
+            try:
+                with open(input_abspath + ".fix.json", "w") as text_file:
+                    #json.dump(json_copy, text_file)
+                    #json_copy_str = json.dumps(json_copy, indent=4)
+                    #print >> text_file, json_copy
+                    json.dump(json_copy, text_file, indent=2, default=mkvmergeutils.get_json_serializable_value)
+            except Exception as e: pass
 
     # Compute difference between json_obj and json_copy
-    json_diff = mkv4cafrlib.compute_json_differences(json_obj, json_copy)
+    with metricsutils.measure_stage(stages, "diff") as stage:
+        json_diff = mkv4cafrlib.compute_json_differences(json_obj, json_copy)
     has_diff = bool(json_diff)
+    file_report['diff'] = json_diff if has_diff else dict()
     if (not has_diff):
         print("No modification required in input file metadata.")
+        file_report['outcome'] = journalutils.OUTCOME_UNCHANGED
         return 0
     
     print("Input file requires the following changes in metadata:")
@@ -208,35 +699,81 @@ def process_file(input_file_path: str, output_dir_path: str, edit_in_place: bool
     # Set the target file to edit if we do not edit-in-place
     target_file = input_abspath
     if (not edit_in_place):
-        print("Copying input file to output directory...")
         target_file = fileutils.get_copy_file_to_directory_target(input_abspath, output_dir_path)
-        success = fileutils.copy_file_with_progress(input_abspath, target_file)
-        if (not success):
-            print("Failed to copy file '" + target_file + "' to directory.")
-            return 1
-        print("Copy completed.")
-    input_abspath = "" # Make sure the rest of the code do not use the input file as reference
-
-    # Change the target file to be modified
+    file_report['target'] = target_file
 
     # Build edit-in-place command    
     mkvpropedit_args = mkv4cafrlib.get_mkvpropedit_args_for_diff(json_diff, target_file)
     if (mkvpropedit_args is None or len(mkvpropedit_args) == 0):
         print("Failed to get mkvpropedit command to edit file.")
+        file_report['error'] = "unable to build mkvpropedit command"
         return 1
+    file_report['mkvpropedit_args'] = mkvpropedit_args
 
-    # Update metadata
-    try:
-        print("Updating meta data of file '" + target_file + "'.")
-        subprocess.check_output(mkvpropedit_args)
-    except subprocess.CalledProcessError as procexc:                                                                                                   
-        print("Failed to execute command '" + " ".join(mkvpropedit_args) + "'.\n")
+    if (plan_only):
+        print("Plan only. File '" + target_file + "' is not modified.")
+        file_report['outcome'] = journalutils.OUTCOME_EDITED
+        return 0
 
-        output_str = procexc.output.decode("utf-8")
-        print("Error code: ", procexc.returncode, output_str)
-        return 1
-    return 0
+    if (not edit_in_place):
+        print("Copying input file to output directory...")
+        with metricsutils.measure_stage(stages, "copy") as stage:
+            # Files from subdirectories of the input directory are copied to the same subdirectories of the output directory
+            try:
+                os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            except OSError as e:
+                print("Failed to create directory '" + os.path.dirname(target_file) + "': " + str(e))
+                file_report['error'] = "copy to output directory failed"
+                stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+                return 1
+
+            # The progress of parallel copies is aggregated on a single status line
+            copy_strategy = fileutils.copy_file_with_progress(input_abspath, target_file, True, progressutils.get_progress_tracker())
+            if (copy_strategy is None):
+                print("Failed to copy file '" + target_file + "' to directory.")
+                file_report['error'] = "copy to output directory failed"
+                stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+                return 1
+            stage['bytes'] = file_report['size']
+            stage['strategy'] = copy_strategy
+        print("Copy completed using " + copy_strategy + ".")
+        file_report['copy_strategy'] = copy_strategy
+    input_abspath = "" # Make sure the rest of the code do not use the input file as reference
+
+    # Update metadata natively, if possible
+    if (edit_backend == EDIT_BACKEND_NATIVE):
+        with metricsutils.measure_stage(stages, "native_edit") as stage:
+            try:
+                print("Updating meta data of file '" + target_file + "'.")
+                if (ebmlutils.edit_media_file(target_file, json_diff)):
+                    file_report['outcome'] = journalutils.OUTCOME_EDITED
+                    return 0
+                print("Changes can not be written natively. Using mkvpropedit instead.")
+                stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+            except (ebmlutils.EbmlError, OSError) as e:
+                print("Failed to write changes natively: " + str(e) + ". Using mkvpropedit instead.")
+                stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
 
+    # Update metadata
+    with metricsutils.measure_stage(stages, "mkvpropedit") as stage:
+        try:
+            print("Updating meta data of file '" + target_file + "'.")
+            subprocess.check_output(mkvpropedit_args)
+        except subprocess.CalledProcessError as procexc:                                                                                                   
+            print("Failed to execute command '" + " ".join(mkvpropedit_args) + "'.\n")
+
+            output_str = procexc.output.decode("utf-8")
+            print("Error code: ", procexc.returncode, output_str)
+            file_report['error'] = "mkvpropedit failed with error code " + str(procexc.returncode)
+            stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+            return 1
+        except FileNotFoundError as e:
+            print("Failed to execute command '" + " ".join(mkvpropedit_args) + "'. mkvpropedit not found.")
+            file_report['error'] = "mkvpropedit not found"
+            stage['outcome'] = metricsutils.STAGE_OUTCOME_FAILED
+            return 1
+    file_report['outcome'] = journalutils.OUTCOME_EDITED
+    return 0
 
 if __name__ == "__main__":
     exit_code = main()
@@ -0,0 +1,136 @@
+import os
+import zlib
+import sqlite3
+import threading
+
+# Constants
+DEFAULT_PROBE_CACHE_MAX_SIZE = 128*1024*1024 # 128Mb
+PROBE_CACHE_FILE_NAME = "probe_cache.sqlite"
+
+
+def get_default_cache_dir_path():
+    if os.name == 'nt' or os.name == 'win32':
+        base_dir = os.environ['LOCALAPPDATA'] if 'LOCALAPPDATA' in os.environ else os.path.expanduser("~")
+    else:
+        base_dir = os.environ['XDG_CACHE_HOME'] if 'XDG_CACHE_HOME' in os.environ else os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "mkv4cafr")
+
+
+def get_file_identity(file_path: str):
+    # A file is identified by its location on disk and its size and modification time.
+    # If any of these changes, the file must be probed again.
+    stat = os.stat(file_path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def get_file_identity_key(file_identity: tuple) -> str:
+    # Device and inode numbers may not fit in a sqlite INTEGER (signed 64 bits). Store the key as text.
+    return ":".join(str(x) for x in file_identity)
+
+
+class ProbeCache:
+    # A persistent cache of the `mkvmerge -J` output of files.
+    # Entries are evicted in least recently used order when the total size of the cache exceeds `max_size` bytes.
+    def __init__(self, file_path: str, max_size: int = DEFAULT_PROBE_CACHE_MAX_SIZE):
+        self.file_path = file_path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(file_path, timeout=30, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS probes ("
+                                    "key TEXT PRIMARY KEY, "
+                                    "path TEXT NOT NULL, "
+                                    "data BLOB NOT NULL, "
+                                    "data_size INTEGER NOT NULL, "
+                                    "last_access INTEGER NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS probes_last_access ON probes(last_access)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS probes_path ON probes(path)")
+        self.total_size = self.connection.execute("SELECT COALESCE(SUM(data_size), 0) FROM probes").fetchone()[0]
+
+        # Access order is tracked with a counter instead of a timestamp.
+        # The resolution of the system clock is not sufficient to order accesses made within a few milliseconds.
+        self.access_counter = self.connection.execute("SELECT COALESCE(MAX(last_access), 0) FROM probes").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    # Errors of the cache database, ie: 'database is locked' or a full disk, are printed and ignored.
+    # The file is then probed as if the cache was disabled.
+    def get(self, file_identity: tuple):
+        key = get_file_identity_key(file_identity)
+        with self.lock:
+            try:
+                row = self.connection.execute("SELECT data FROM probes WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                print("Failed to read probe cache '" + self.file_path + "': " + str(e))
+                row = None
+            if (row is None):
+                self.misses += 1
+                return None
+
+            # Failing to update the access order of the entry does not prevent using it
+            try:
+                with self.connection:
+                    self.connection.execute("UPDATE probes SET last_access = ? WHERE key = ?", (self.__next_access(), key))
+            except sqlite3.Error as e:
+                print("Failed to update probe cache '" + self.file_path + "': " + str(e))
+            self.hits += 1
+        return zlib.decompress(row[0])
+
+    def put(self, file_identity: tuple, file_path: str, data: bytes):
+        key = get_file_identity_key(file_identity)
+        compressed_data = zlib.compress(data)
+        with self.lock:
+            # The changes are rolled back on errors. So is the total size.
+            total_size = self.total_size
+            try:
+                with self.connection:
+                    # Previous entries of the same file are obsolete
+                    for row in self.connection.execute("SELECT data_size FROM probes WHERE path = ? OR key = ?", (file_path, key)).fetchall():
+                        self.total_size -= row[0]
+                    self.connection.execute("DELETE FROM probes WHERE path = ? OR key = ?", (file_path, key))
+                    self.connection.execute("INSERT OR REPLACE INTO probes (key, path, data, data_size, last_access) VALUES (?, ?, ?, ?, ?)",
+                                            (key, file_path, compressed_data, len(compressed_data), self.__next_access()))
+                    self.total_size += len(compressed_data)
+                    self.__evict()
+            except sqlite3.Error as e:
+                print("Failed to write probe cache '" + self.file_path + "': " + str(e))
+                self.total_size = total_size
+
+    def get_size(self) -> int:
+        with self.lock:
+            return self.total_size
+
+    def __next_access(self) -> int:
+        self.access_counter += 1
+        return self.access_counter
+
+    def __evict(self):
+        if (self.total_size <= self.max_size):
+            return
+
+        # Delete least recently used entries until the cache fits.
+        # Free a little more than required so that the next insertions do not need to evict again right away.
+        target_size = int(self.max_size * 0.9)
+        while (self.total_size > target_size):
+            rows = self.connection.execute("SELECT key, data_size FROM probes ORDER BY last_access ASC LIMIT 64").fetchall()
+            if (len(rows) == 0):
+                break
+            for key, data_size in rows:
+                if (self.total_size <= target_size):
+                    break
+                self.connection.execute("DELETE FROM probes WHERE key = ?", (key,))
+                self.total_size -= data_size
+
+
+def open_probe_cache(cache_dir_path: str, max_size: int):
+    try:
+        os.makedirs(cache_dir_path, exist_ok=True)
+        return ProbeCache(os.path.join(cache_dir_path, PROBE_CACHE_FILE_NAME), max_size)
+    except Exception as e:
+        print("Failed to open probe cache in directory '" + cache_dir_path + "': " + str(e))
+        return None
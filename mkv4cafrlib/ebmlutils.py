@@ -0,0 +1,863 @@
+import os
+import zlib
+import struct
+import datetime
+
+# Reads the metadata of a Matroska file without parsing its clusters.
+# The result has the same layout as the output of `mkvmerge -J`.
+# Simple track and title edits can also be written in place, like mkvpropedit does.
+# See https://www.matroska.org/technical/elements.html
+
+# Constants
+MAX_ELEMENT_DATA_SIZE = 16*1024*1024 # 16Mb. Metadata elements are much smaller. Larger elements are considered corrupted.
+UNKNOWN_SIZE = -1
+
+# EBML header
+EBML_ID                 = 0x1A45DFA3
+EBML_DOCTYPE_ID         = 0x4282
+
+# Level 1 elements
+SEGMENT_ID              = 0x18538067
+SEEKHEAD_ID             = 0x114D9B74
+INFO_ID                 = 0x1549A966
+TRACKS_ID               = 0x1654AE6B
+TAGS_ID                 = 0x1254C367
+ATTACHMENTS_ID          = 0x1941A469
+CHAPTERS_ID             = 0x1043A770
+CLUSTER_ID              = 0x1F43B675
+CUES_ID                 = 0x1C53BB6B
+
+# Global elements
+VOID_ID                 = 0xEC
+CRC32_ID                = 0xBF
+
+# SeekHead
+SEEK_ID                 = 0x4DBB
+SEEK_ID_ID              = 0x53AB
+SEEK_POSITION_ID        = 0x53AC
+
+# Info
+TIMESTAMP_SCALE_ID      = 0x2AD7B1
+DURATION_ID             = 0x4489
+TITLE_ID                = 0x7BA9
+MUXING_APP_ID           = 0x4D80
+WRITING_APP_ID          = 0x5741
+DATE_UTC_ID             = 0x4461
+SEGMENT_UID_ID          = 0x73A4
+
+# Tracks
+TRACK_ENTRY_ID          = 0xAE
+TRACK_NUMBER_ID         = 0xD7
+TRACK_UID_ID            = 0x73C5
+TRACK_TYPE_ID           = 0x83
+FLAG_ENABLED_ID         = 0xB9
+FLAG_DEFAULT_ID         = 0x88
+FLAG_FORCED_ID          = 0x55AA
+FLAG_HEARING_IMPAIRED_ID  = 0x55AB
+FLAG_VISUAL_IMPAIRED_ID   = 0x55AC
+FLAG_TEXT_DESCRIPTIONS_ID = 0x55AD
+FLAG_ORIGINAL_ID          = 0x55AE
+FLAG_COMMENTARY_ID        = 0x55AF
+NAME_ID                 = 0x536E
+LANGUAGE_ID             = 0x22B59C
+LANGUAGE_BCP47_ID       = 0x22B59D
+CODEC_ID_ID             = 0x86
+CODEC_PRIVATE_ID        = 0x63A2
+DEFAULT_DURATION_ID     = 0x23E383
+VIDEO_ID                = 0xE0
+PIXEL_WIDTH_ID          = 0xB0
+PIXEL_HEIGHT_ID         = 0xBA
+DISPLAY_WIDTH_ID        = 0x54B0
+DISPLAY_HEIGHT_ID       = 0x54BA
+AUDIO_ID                = 0xE1
+SAMPLING_FREQUENCY_ID   = 0xB5
+CHANNELS_ID             = 0x9F
+BIT_DEPTH_ID            = 0x6264
+
+# Tags
+TAG_ID                  = 0x7373
+TARGETS_ID              = 0x63C0
+TAG_TRACK_UID_ID        = 0x63C5
+SIMPLE_TAG_ID           = 0x67C8
+TAG_NAME_ID             = 0x45A3
+TAG_STRING_ID           = 0x4487
+
+# Attachments
+ATTACHED_FILE_ID        = 0x61A7
+FILE_DESCRIPTION_ID     = 0x467E
+FILE_NAME_ID            = 0x466E
+FILE_MIME_TYPE_ID       = 0x4660
+FILE_DATA_ID            = 0x465C
+FILE_UID_ID             = 0x46AE
+
+# Chapters
+EDITION_ENTRY_ID        = 0x45B9
+CHAPTER_ATOM_ID         = 0xB6
+
+# Matroska dates are expressed in nanoseconds since this date
+MATROSKA_EPOCH = datetime.datetime(2001, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Boolean track flags and their mkvmerge property name
+TRACK_FLAG_PROPERTIES = {
+    FLAG_ENABLED_ID: "enabled_track",
+    FLAG_DEFAULT_ID: "default_track",
+    FLAG_FORCED_ID: "forced_track",
+    FLAG_HEARING_IMPAIRED_ID: "flag_hearing_impaired",
+    FLAG_VISUAL_IMPAIRED_ID: "flag_visual_impaired",
+    FLAG_TEXT_DESCRIPTIONS_ID: "flag_text_descriptions",
+    FLAG_ORIGINAL_ID: "flag_original",
+    FLAG_COMMENTARY_ID: "flag_commentary",
+}
+
+# Track types and their mkvmerge name
+TRACK_TYPES = {
+    1: "video",
+    2: "audio",
+    17: "subtitles",
+    18: "buttons",
+}
+
+# Codec identifiers and their mkvmerge name. Identifiers ending with '/' are prefixes.
+CODEC_NAMES = {
+    "V_MPEG4/ISO/AVC": "AVC/H.264/MPEG-4p10",
+    "V_MPEGH/ISO/HEVC": "HEVC/H.265/MPEG-H",
+    "V_MPEG4/ISO/": "MPEG-4p2",
+    "V_MPEG1": "MPEG-1/2",
+    "V_MPEG2": "MPEG-1/2",
+    "V_AV1": "AV1",
+    "V_VP8": "VP8",
+    "V_VP9": "VP9",
+    "V_THEORA": "Theora",
+    "A_AC3": "AC-3",
+    "A_EAC3": "E-AC-3",
+    "A_DTS": "DTS",
+    "A_TRUEHD": "TrueHD",
+    "A_MLP": "MLP",
+    "A_AAC": "AAC",
+    "A_AAC/": "AAC",
+    "A_FLAC": "FLAC",
+    "A_OPUS": "Opus",
+    "A_VORBIS": "Vorbis",
+    "A_MPEG/L2": "MP2",
+    "A_MPEG/L3": "MP3",
+    "A_PCM/": "PCM",
+    "A_ALAC": "ALAC",
+    "S_TEXT/UTF8": "SubRip/SRT",
+    "S_TEXT/ASCII": "SubRip/SRT",
+    "S_TEXT/ASS": "SubStationAlpha",
+    "S_TEXT/SSA": "SubStationAlpha",
+    "S_ASS": "SubStationAlpha",
+    "S_SSA": "SubStationAlpha",
+    "S_TEXT/WEBVTT": "WebVTT",
+    "S_TEXT/USF": "USF",
+    "S_HDMV/PGS": "HDMV PGS",
+    "S_HDMV/TEXTST": "HDMV TextST",
+    "S_VOBSUB": "VobSub",
+    "S_DVBSUB": "DVBSUB",
+    "S_KATE": "Kate",
+}
+
+# Codec identifiers whose mkvmerge name depends on the content of the track, ie: 'DTS-HD Master Audio', 'TrueHD Atmos' or 'AC-3 Dolby Surround EX'.
+# mkvmerge reads the first frames of these tracks. Their name can not be found in the metadata.
+BITSTREAM_CODEC_IDS = ["A_AC3", "A_EAC3", "A_DTS", "A_TRUEHD", "A_MLP", "A_MS/ACM", "V_MS/VFW/FOURCC"]
+
+# ISO 639-2 language codes and their ISO 639-1 equivalent.
+# Bibliographic codes (ie: 'fre') are first so that they are preferred over terminologic codes (ie: 'fra').
+LANGUAGE_ISO639_2_TO_1 = {
+    "ara": "ar", "chi": "zh", "cze": "cs", "dan": "da", "dut": "nl", "eng": "en", "fin": "fi", "fre": "fr",
+    "ger": "de", "gre": "el", "heb": "he", "hin": "hi", "hun": "hu", "ice": "is", "ind": "id", "ita": "it",
+    "jpn": "ja", "kor": "ko", "may": "ms", "nor": "no", "per": "fa", "pol": "pl", "por": "pt", "rum": "ro",
+    "rus": "ru", "slo": "sk", "spa": "es", "swe": "sv", "tha": "th", "tur": "tr", "ukr": "uk", "vie": "vi",
+    "bul": "bg", "cat": "ca", "hrv": "hr", "est": "et", "lav": "lv", "lit": "lt", "srp": "sr", "slv": "sl",
+    "baq": "eu", "glg": "gl", "wel": "cy", "gle": "ga", "ben": "bn", "tam": "ta", "tel": "te", "urd": "ur",
+    "zho": "zh", "ces": "cs", "nld": "nl", "fra": "fr", "deu": "de", "ell": "el", "isl": "is", "msa": "ms",
+    "fas": "fa", "ron": "ro", "slk": "sk", "eus": "eu", "cym": "cy",
+}
+LANGUAGE_ISO639_1_TO_2 = dict()
+for iso639_2, iso639_1 in LANGUAGE_ISO639_2_TO_1.items():
+    if (not iso639_1 in LANGUAGE_ISO639_1_TO_2):
+        LANGUAGE_ISO639_1_TO_2[iso639_1] = iso639_2
+
+# Track properties that can be edited in place, and their element id
+EDITABLE_TRACK_PROPERTIES = {
+    "default_track": FLAG_DEFAULT_ID,
+    "enabled_track": FLAG_ENABLED_ID,
+    "forced_track": FLAG_FORCED_ID,
+    "language": LANGUAGE_ID,
+    "language_ietf": LANGUAGE_BCP47_ID,
+    "track_name": NAME_ID,
+}
+
+
+class EbmlError(Exception):
+    pass
+
+
+def read_vint(data: bytes, offset: int, keep_marker: bool):
+    # Returns the value and the length of the variable length integer at `offset`.
+    # Element ids keep their length marker. Element sizes do not.
+    if (offset >= len(data)):
+        raise EbmlError("unexpected end of data at offset " + str(offset))
+    first_byte = data[offset]
+    if (first_byte == 0):
+        raise EbmlError("invalid variable length integer at offset " + str(offset))
+    length = 1
+    mask = 0x80
+    while (not first_byte & mask):
+        mask >>= 1
+        length += 1
+    if (offset + length > len(data)):
+        raise EbmlError("unexpected end of data at offset " + str(offset))
+    value = first_byte if keep_marker else first_byte & (mask - 1)
+    all_ones = (value == mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | data[offset + i]
+        all_ones = all_ones and data[offset + i] == 0xFF
+    if (not keep_marker and all_ones):
+        value = UNKNOWN_SIZE
+    return (value, length)
+
+
+def iter_elements(data: bytes, start: int = 0, end: int = None):
+    # Yields the id, data start and data end of each element stored in `data`.
+    if (end is None):
+        end = len(data)
+    offset = start
+    while (offset < end):
+        element_id, id_length = read_vint(data, offset, True)
+        element_size, size_length = read_vint(data, offset + id_length, False)
+        data_start = offset + id_length + size_length
+        if (element_size == UNKNOWN_SIZE or data_start + element_size > end):
+            raise EbmlError("invalid size for element 0x{:X} at offset {}".format(element_id, offset))
+        yield (element_id, data_start, data_start + element_size)
+        offset = data_start + element_size
+
+
+def decode_uint(data: bytes) -> int:
+    return int.from_bytes(data, "big", signed=False)
+
+
+def decode_int(data: bytes) -> int:
+    return int.from_bytes(data, "big", signed=True)
+
+
+def decode_float(data: bytes) -> float:
+    if (len(data) == 0):
+        return 0.0
+    if (len(data) == 4):
+        return struct.unpack(">f", data)[0]
+    if (len(data) == 8):
+        return struct.unpack(">d", data)[0]
+    raise EbmlError("invalid float of " + str(len(data)) + " bytes")
+
+
+def decode_string(data: bytes) -> str:
+    return data.rstrip(b'\0').decode("utf-8", errors="replace")
+
+
+def get_language_ietf(language: str) -> str:
+    if (language in LANGUAGE_ISO639_2_TO_1):
+        return LANGUAGE_ISO639_2_TO_1[language]
+    return language
+
+
+def get_language_from_ietf(language_ietf: str) -> str:
+    primary_language = language_ietf.split('-')[0].lower()
+    if (primary_language in LANGUAGE_ISO639_1_TO_2):
+        return LANGUAGE_ISO639_1_TO_2[primary_language]
+    return primary_language
+
+
+def get_codec_name(codec_id: str) -> str:
+    if (codec_id in CODEC_NAMES):
+        return CODEC_NAMES[codec_id]
+    for prefix, name in CODEC_NAMES.items():
+        if (prefix.endswith('/') and codec_id.startswith(prefix)):
+            return name
+    return codec_id
+
+
+def is_codec_name_from_codec_id(codec_id: str) -> bool:
+    # Returns True if the mkvmerge name of a codec only depends on its identifier
+    if (codec_id in BITSTREAM_CODEC_IDS):
+        return False
+    return get_codec_name(codec_id) != codec_id
+
+
+def get_bitstream_codec_ids(json_obj: dict) -> list:
+    # Returns the codec identifiers of the tracks whose name reported by mkvmerge can not be found without reading the track content
+    codec_ids = list()
+    for track in json_obj['tracks']:
+        codec_id = track['properties']['codec_id']
+        if (not is_codec_name_from_codec_id(codec_id) and not codec_id in codec_ids):
+            codec_ids.append(codec_id)
+    return codec_ids
+
+
+class MatroskaReader:
+    # Reads the metadata elements of a Matroska file with positioned reads.
+    # Level 1 elements are located with the SeekHead. Clusters are never read.
+    def __init__(self, file):
+        self.file = file
+        self.file_size = os.fstat(file.fileno()).st_size
+        self.bytes_read = 0
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        self.file.seek(offset)
+        data = self.file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def read_element_header(self, offset: int):
+        # Returns the id, data offset and data size of the element at `offset`
+        header = self.read_at(offset, 12)
+        element_id, id_length = read_vint(header, 0, True)
+        element_size, size_length = read_vint(header, id_length, False)
+        return (element_id, offset + id_length + size_length, element_size)
+
+    def read_element_data(self, element_id: int, data_offset: int, data_size: int) -> bytes:
+        if (data_size == UNKNOWN_SIZE or data_size > MAX_ELEMENT_DATA_SIZE or data_offset + data_size > self.file_size):
+            raise EbmlError("invalid size for element 0x{:X} at offset {}".format(element_id, data_offset))
+        return self.read_at(data_offset, data_size)
+
+    def read_segment_offsets(self):
+        # Returns the data offset of the segment and the offset of its level 1 elements, indexed by element id.
+        element_id, data_offset, data_size = self.read_element_header(0)
+        if (element_id != EBML_ID):
+            raise EbmlError("not an EBML file")
+        ebml_header = self.read_element_data(element_id, data_offset, data_size)
+        doc_type = "matroska"
+        for child_id, start, end in iter_elements(ebml_header):
+            if (child_id == EBML_DOCTYPE_ID):
+                doc_type = decode_string(ebml_header[start:end])
+        if (doc_type != "matroska" and doc_type != "webm"):
+            raise EbmlError("unsupported document type '" + doc_type + "'")
+
+        element_id, segment_offset, segment_size = self.read_element_header(data_offset + data_size)
+        if (element_id != SEGMENT_ID):
+            raise EbmlError("segment not found")
+        segment_end = self.file_size if segment_size == UNKNOWN_SIZE else min(self.file_size, segment_offset + segment_size)
+
+        element_offsets = dict()
+        pending_seekheads = list()
+        visited_seekheads = set()
+
+        # Scan the level 1 elements located before the first cluster.
+        # Elements located after the clusters are found through the SeekHead.
+        offset = segment_offset
+        while (offset < segment_end):
+            element_id, data_offset, data_size = self.read_element_header(offset)
+            if (element_id == CLUSTER_ID or data_size == UNKNOWN_SIZE):
+                break
+            if (element_id == SEEKHEAD_ID):
+                pending_seekheads.append(offset)
+            elif (not element_id in element_offsets):
+                element_offsets[element_id] = offset
+            offset = data_offset + data_size
+
+        # Follow the SeekHead entries. A SeekHead may point to another SeekHead.
+        while (len(pending_seekheads) > 0):
+            seekhead_offset = pending_seekheads.pop()
+            if (seekhead_offset in visited_seekheads):
+                continue
+            visited_seekheads.add(seekhead_offset)
+            element_id, data_offset, data_size = self.read_element_header(seekhead_offset)
+            seekhead = self.read_element_data(element_id, data_offset, data_size)
+            for seek_id, seek_start, seek_end in iter_elements(seekhead):
+                if (seek_id != SEEK_ID):
+                    continue
+                target_id = None
+                target_position = None
+                for child_id, start, end in iter_elements(seekhead, seek_start, seek_end):
+                    if (child_id == SEEK_ID_ID):
+                        target_id = decode_uint(seekhead[start:end])
+                    elif (child_id == SEEK_POSITION_ID):
+                        target_position = decode_uint(seekhead[start:end])
+                if (target_id is None or target_position is None or segment_offset + target_position >= segment_end):
+                    continue
+                if (target_id == SEEKHEAD_ID):
+                    pending_seekheads.append(segment_offset + target_position)
+                elif (not target_id in element_offsets):
+                    element_offsets[target_id] = segment_offset + target_position
+
+        return (segment_offset, element_offsets)
+
+    def read_level1_element(self, element_offsets: dict, expected_id: int):
+        # Returns the data of a level 1 element or None if the file does not have such element
+        if (not expected_id in element_offsets):
+            return None
+        element_id, data_offset, data_size = self.read_element_header(element_offsets[expected_id])
+        if (element_id != expected_id):
+            raise EbmlError("element 0x{:X} not found at offset {}".format(expected_id, element_offsets[expected_id]))
+        return self.read_element_data(element_id, data_offset, data_size)
+
+    def read_attachments(self, element_offset: int) -> list:
+        # Attached files may be large. Only the headers of their children are read.
+        attachments = list()
+        element_id, data_offset, data_size = self.read_element_header(element_offset)
+        if (element_id != ATTACHMENTS_ID or data_size == UNKNOWN_SIZE):
+            raise EbmlError("attachments not found at offset " + str(element_offset))
+        offset = data_offset
+        while (offset < data_offset + data_size):
+            file_id, file_data_offset, file_data_size = self.read_element_header(offset)
+            offset = file_data_offset + file_data_size
+            if (file_id != ATTACHED_FILE_ID):
+                continue
+            attachment = dict()
+            attachment['id'] = len(attachments) + 1
+            properties = dict()
+            child_offset = file_data_offset
+            while (child_offset < file_data_offset + file_data_size):
+                child_id, child_data_offset, child_data_size = self.read_element_header(child_offset)
+                child_offset = child_data_offset + child_data_size
+                if (child_id == FILE_DATA_ID):
+                    attachment['size'] = child_data_size
+                    continue
+                child_data = self.read_element_data(child_id, child_data_offset, child_data_size)
+                match child_id:
+                    case 0x467E: # FileDescription
+                        attachment['description'] = decode_string(child_data)
+                    case 0x466E: # FileName
+                        attachment['file_name'] = decode_string(child_data)
+                    case 0x4660: # FileMimeType
+                        attachment['content_type'] = decode_string(child_data)
+                    case 0x46AE: # FileUID
+                        properties['uid'] = decode_uint(child_data)
+            attachment['properties'] = properties
+            attachments.append(attachment)
+        return attachments
+
+    def read_media_info(self, file_path: str) -> dict:
+        segment_offset, element_offsets = self.read_segment_offsets()
+
+        info = self.read_level1_element(element_offsets, INFO_ID)
+        if (info is None):
+            raise EbmlError("segment information not found")
+        tracks = self.read_level1_element(element_offsets, TRACKS_ID)
+        tags = self.read_level1_element(element_offsets, TAGS_ID)
+        chapters = self.read_level1_element(element_offsets, CHAPTERS_ID)
+
+        json_obj = dict()
+        json_obj['attachments'] = self.read_attachments(element_offsets[ATTACHMENTS_ID]) if ATTACHMENTS_ID in element_offsets else []
+        json_obj['chapters'] = parse_chapters(chapters) if chapters is not None else []
+        json_obj['container'] = parse_info(info)
+        json_obj['errors'] = []
+        json_obj['file_name'] = file_path
+        json_obj['tracks'] = parse_tracks(tracks) if tracks is not None else []
+        json_obj['global_tags'] = []
+        json_obj['track_tags'] = []
+        if (tags is not None):
+            apply_tags(json_obj, tags)
+        json_obj['warnings'] = []
+        return json_obj
+
+
+def parse_info(data: bytes) -> dict:
+    properties = dict()
+    properties['container_type'] = 17
+    timestamp_scale = 1000000
+    duration = None
+    for element_id, start, end in iter_elements(data):
+        value = data[start:end]
+        match element_id:
+            case 0x2AD7B1: # TimestampScale
+                timestamp_scale = decode_uint(value)
+            case 0x4489: # Duration
+                duration = decode_float(value)
+            case 0x7BA9: # Title
+                properties['title'] = decode_string(value)
+            case 0x4D80: # MuxingApp
+                properties['muxing_application'] = decode_string(value)
+            case 0x5741: # WritingApp
+                properties['writing_application'] = decode_string(value)
+            case 0x73A4: # SegmentUID
+                properties['segment_uid'] = value.hex()
+            case 0x4461: # DateUTC
+                date = MATROSKA_EPOCH + datetime.timedelta(microseconds=decode_int(value)//1000)
+                properties['date_utc'] = date.strftime("%Y-%m-%dT%H:%M:%SZ")
+                properties['date_local'] = date.astimezone().replace(microsecond=0).isoformat()
+    if (duration is not None):
+        properties['duration'] = int(round(duration * timestamp_scale))
+    properties['is_providing_timestamps'] = True
+    properties['timestamp_scale'] = timestamp_scale
+
+    container = dict()
+    container['properties'] = properties
+    container['recognized'] = True
+    container['supported'] = True
+    container['type'] = "Matroska"
+    return container
+
+
+def parse_track_entry(data: bytes, start: int, end: int, track_id: int) -> dict:
+    properties = dict()
+    # Default values of flags as per Matroska specifications
+    properties['default_track'] = True
+    properties['enabled_track'] = True
+    properties['forced_track'] = False
+    language = "eng"
+    language_ietf = None
+    codec_id = ""
+    track_type = None
+    for element_id, child_start, child_end in iter_elements(data, start, end):
+        value = data[child_start:child_end]
+        if (element_id in TRACK_FLAG_PROPERTIES):
+            properties[TRACK_FLAG_PROPERTIES[element_id]] = decode_uint(value) != 0
+            continue
+        match element_id:
+            case 0xD7: # TrackNumber
+                properties['number'] = decode_uint(value)
+            case 0x73C5: # TrackUID
+                properties['uid'] = decode_uint(value)
+            case 0x83: # TrackType
+                track_type = decode_uint(value)
+            case 0x536E: # Name
+                properties['track_name'] = decode_string(value)
+            case 0x22B59C: # Language
+                language = decode_string(value)
+            case 0x22B59D: # LanguageBCP47
+                language_ietf = decode_string(value)
+            case 0x86: # CodecID
+                codec_id = decode_string(value)
+            case 0x63A2: # CodecPrivate
+                properties['codec_private_data'] = value.hex()
+                properties['codec_private_length'] = len(value)
+            case 0x23E383: # DefaultDuration
+                properties['default_duration'] = decode_uint(value)
+            case 0xE0: # Video
+                parse_video(data, child_start, child_end, properties)
+            case 0xE1: # Audio
+                parse_audio(data, child_start, child_end, properties)
+
+    # The legacy language element is ignored if the IETF BCP 47 element is present
+    if (language_ietf is None):
+        language_ietf = get_language_ietf(language)
+    else:
+        language = get_language_from_ietf(language_ietf)
+    properties['language'] = language
+    properties['language_ietf'] = language_ietf
+    properties['codec_id'] = codec_id
+    if (not 'codec_private_length' in properties):
+        properties['codec_private_length'] = 0
+
+    track = dict()
+    track['codec'] = get_codec_name(codec_id)
+    track['id'] = track_id
+    track['properties'] = properties
+    track['type'] = TRACK_TYPES[track_type] if track_type in TRACK_TYPES else "unknown"
+    return track
+
+
+def parse_video(data: bytes, start: int, end: int, properties: dict):
+    pixel_width = None
+    pixel_height = None
+    display_width = None
+    display_height = None
+    for element_id, child_start, child_end in iter_elements(data, start, end):
+        value = data[child_start:child_end]
+        match element_id:
+            case 0xB0: # PixelWidth
+                pixel_width = decode_uint(value)
+            case 0xBA: # PixelHeight
+                pixel_height = decode_uint(value)
+            case 0x54B0: # DisplayWidth
+                display_width = decode_uint(value)
+            case 0x54BA: # DisplayHeight
+                display_height = decode_uint(value)
+    if (pixel_width is not None and pixel_height is not None):
+        properties['pixel_dimensions'] = "{0}x{1}".format(pixel_width, pixel_height)
+        display_width = display_width if display_width is not None else pixel_width
+        display_height = display_height if display_height is not None else pixel_height
+        properties['display_dimensions'] = "{0}x{1}".format(display_width, display_height)
+
+
+def parse_audio(data: bytes, start: int, end: int, properties: dict):
+    properties['audio_channels'] = 1
+    for element_id, child_start, child_end in iter_elements(data, start, end):
+        value = data[child_start:child_end]
+        match element_id:
+            case 0xB5: # SamplingFrequency
+                properties['audio_sampling_frequency'] = int(decode_float(value))
+            case 0x9F: # Channels
+                properties['audio_channels'] = decode_uint(value)
+            case 0x6264: # BitDepth
+                properties['audio_bits_per_sample'] = decode_uint(value)
+
+
+def parse_tracks(data: bytes) -> list:
+    # Track ids are assigned in file order, like mkvmerge does
+    tracks = list()
+    for element_id, start, end in iter_elements(data):
+        if (element_id == TRACK_ENTRY_ID):
+            tracks.append(parse_track_entry(data, start, end, len(tracks)))
+    return tracks
+
+
+def parse_chapters(data: bytes) -> list:
+    num_entries = 0
+    for element_id, start, end in iter_elements(data):
+        if (element_id != EDITION_ENTRY_ID):
+            continue
+        for child_id, child_start, child_end in iter_elements(data, start, end):
+            if (child_id == CHAPTER_ATOM_ID):
+                num_entries += 1
+    if (num_entries == 0):
+        return []
+    return [{"num_entries": num_entries}]
+
+
+def apply_tags(json_obj: dict, data: bytes):
+    # Simple tags targeting a track are added to the track properties as 'tag_<name>'.
+    # Tags that only contain statistics are not counted as track tags.
+    tracks_by_uid = dict()
+    for track in json_obj['tracks']:
+        if ('uid' in track['properties']):
+            tracks_by_uid[track['properties']['uid']] = track
+    global_tags_count = 0
+    track_tags_counts = dict()
+
+    for element_id, start, end in iter_elements(data):
+        if (element_id != TAG_ID):
+            continue
+        track_uids = list()
+        simple_tags = list()
+        for child_id, child_start, child_end in iter_elements(data, start, end):
+            if (child_id == TARGETS_ID):
+                for target_id, target_start, target_end in iter_elements(data, child_start, child_end):
+                    if (target_id == TAG_TRACK_UID_ID):
+                        track_uid = decode_uint(data[target_start:target_end])
+                        if (track_uid != 0):
+                            track_uids.append(track_uid)
+            elif (child_id == SIMPLE_TAG_ID):
+                name = None
+                value = None
+                for simple_id, simple_start, simple_end in iter_elements(data, child_start, child_end):
+                    if (simple_id == TAG_NAME_ID):
+                        name = decode_string(data[simple_start:simple_end])
+                    elif (simple_id == TAG_STRING_ID):
+                        value = decode_string(data[simple_start:simple_end])
+                if (name is not None):
+                    simple_tags.append((name, value))
+
+        if (len(track_uids) == 0):
+            global_tags_count += 1
+            continue
+        is_statistics_tag = any(name == "_STATISTICS_TAGS" for name, value in simple_tags)
+        for track_uid in track_uids:
+            if (not track_uid in tracks_by_uid):
+                continue
+            track = tracks_by_uid[track_uid]
+            for name, value in simple_tags:
+                if (value is not None):
+                    track['properties']["tag_" + name.lower()] = value
+            if (not is_statistics_tag):
+                track_tags_counts[track['id']] = track_tags_counts.get(track['id'], 0) + 1
+
+    if (global_tags_count > 0):
+        json_obj['global_tags'] = [{"num_entries": global_tags_count}]
+    for track_id, count in sorted(track_tags_counts.items()):
+        json_obj['track_tags'].append({"num_entries": count, "track_id": track_id})
+
+
+def encode_element_id(element_id: int) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+
+
+def encode_element_size(size: int, length: int = None) -> bytes:
+    # The value with all bits set is reserved for unknown sizes
+    min_length = 1
+    while (size >= (1 << (7 * min_length)) - 1):
+        min_length += 1
+    if (length is None or length < min_length):
+        length = min_length
+    if (length > 8):
+        raise EbmlError("element size " + str(size) + " is too large")
+    return (size | (1 << (7 * length))).to_bytes(length, "big")
+
+
+def encode_element(element_id: int, payload: bytes, size_length: int = None) -> bytes:
+    return encode_element_id(element_id) + encode_element_size(len(payload), size_length) + payload
+
+
+def encode_void_element(total_size: int) -> bytes:
+    # A Void element of exactly `total_size` bytes, header included
+    if (total_size < 2):
+        raise EbmlError("a void element requires at least 2 bytes")
+    if (total_size <= 128):
+        return encode_element(VOID_ID, bytes(total_size - 2), 1)
+    return encode_element(VOID_ID, bytes(total_size - 9), 8)
+
+
+def encode_property_value(element_id: int, value) -> bytes:
+    if (element_id in TRACK_FLAG_PROPERTIES):
+        value = str(value).lower() in ["1", "true"] if isinstance(value, str) else bool(value)
+        return encode_element(element_id, b'\x01' if value else b'\x00')
+    return encode_element(element_id, str(value).encode("utf-8"))
+
+
+def split_children(data: bytes, start: int = 0, end: int = None) -> list:
+    # Returns the id and the raw bytes of each child element
+    children = list()
+    offset = start
+    for element_id, data_start, data_end in iter_elements(data, start, end):
+        children.append((element_id, data[offset:data_end]))
+        offset = data_end
+    return children
+
+
+def join_children(children: list) -> bytes:
+    # A CRC-32 element, if any, is the first child. It covers all the other children.
+    payload = b''.join(raw for element_id, raw in children if element_id != CRC32_ID)
+    if (len(children) > 0 and children[0][0] == CRC32_ID):
+        crc = zlib.crc32(payload).to_bytes(4, "little")
+        return encode_element(CRC32_ID, crc) + payload
+    return payload
+
+
+def set_child_value(children: list, element_id: int, value):
+    # An empty value deletes the element, like mkvpropedit's --delete option
+    indice = [i for i in range(len(children)) if children[i][0] == element_id]
+    if (value == ""):
+        for i in reversed(indice):
+            del children[i]
+        return
+    element = (element_id, encode_property_value(element_id, value))
+    if (len(indice) == 0):
+        children.append(element)
+    else:
+        children[indice[0]] = element
+
+
+def get_track_edits(track_diff: dict):
+    # Returns the element values to write for a track of a diff, or None if a property is not supported
+    edits = dict()
+    properties = track_diff['properties'] if 'properties' in track_diff else dict()
+    for property_name, value in properties.items():
+        if (not property_name in EDITABLE_TRACK_PROPERTIES):
+            return None
+        edits[EDITABLE_TRACK_PROPERTIES[property_name]] = value
+
+    # Keep the legacy and IETF BCP 47 languages consistent, like mkvpropedit does
+    if (LANGUAGE_ID in edits and not LANGUAGE_BCP47_ID in edits and edits[LANGUAGE_ID] != ""):
+        edits[LANGUAGE_BCP47_ID] = get_language_ietf(edits[LANGUAGE_ID])
+    if (LANGUAGE_BCP47_ID in edits and not LANGUAGE_ID in edits and edits[LANGUAGE_BCP47_ID] != ""):
+        edits[LANGUAGE_ID] = get_language_from_ietf(edits[LANGUAGE_BCP47_ID])
+    return edits
+
+
+class MatroskaEditor(MatroskaReader):
+    # Rewrites level 1 elements in place.
+    # An element that grows or shrinks takes its space from, or gives it back to, the Void element that follows it.
+    # Other elements never move, so the SeekHead and Cues remain valid.
+    def get_available_space(self, element_offset: int, data_offset: int, data_size: int) -> int:
+        available_space = data_offset + data_size - element_offset
+        next_offset = data_offset + data_size
+        if (next_offset < self.file_size):
+            next_id, next_data_offset, next_data_size = self.read_element_header(next_offset)
+            if (next_id == VOID_ID and next_data_size != UNKNOWN_SIZE):
+                available_space += next_data_offset + next_data_size - next_offset
+        return available_space
+
+    def build_element_update(self, element_offset: int, element_id: int, payload: bytes, data_offset: int, data_size: int):
+        # Returns the bytes to write at `element_offset`, or None if the new element does not fit
+        available_space = self.get_available_space(element_offset, data_offset, data_size)
+        size_length = data_offset - element_offset - len(encode_element_id(element_id))
+        element = encode_element(element_id, payload, size_length)
+        remaining_space = available_space - len(element)
+        if (remaining_space == 1):
+            # A void element can not be 1 byte long. Use a longer size field instead.
+            element = encode_element(element_id, payload, size_length + 1)
+            remaining_space = 0
+        if (remaining_space < 0):
+            return None
+        if (remaining_space > 0):
+            element += encode_void_element(remaining_space)
+        return element
+
+    def apply_edits(self, json_diff: dict) -> bool:
+        # Applies the title and track changes of a diff computed by `compute_json_differences()`.
+        # Returns False, without modifying the file, if a change is not supported or does not fit.
+        segment_offset, element_offsets = self.read_segment_offsets()
+        updates = list()
+
+        # Title
+        title = None
+        if ('container' in json_diff and 'properties' in json_diff['container']):
+            container_properties = json_diff['container']['properties']
+            for property_name in container_properties.keys():
+                if (property_name != "title"):
+                    return False
+            title = container_properties['title'] if 'title' in container_properties else None
+        if (title is not None):
+            if (not INFO_ID in element_offsets):
+                return False
+            element_offset = element_offsets[INFO_ID]
+            element_id, data_offset, data_size = self.read_element_header(element_offset)
+            info = self.read_element_data(element_id, data_offset, data_size)
+            children = split_children(info)
+            set_child_value(children, TITLE_ID, title)
+            element = self.build_element_update(element_offset, element_id, join_children(children), data_offset, data_size)
+            if (element is None):
+                return False
+            updates.append((element_offset, element))
+
+        # Tracks, in file order
+        tracks_edits = dict()
+        tracks_diff = json_diff['tracks'] if 'tracks' in json_diff else list()
+        for i in range(len(tracks_diff)):
+            track_edits = get_track_edits(tracks_diff[i])
+            if (track_edits is None):
+                return False
+            if (len(track_edits) > 0):
+                tracks_edits[i] = track_edits
+        if (len(tracks_edits) > 0):
+            if (not TRACKS_ID in element_offsets):
+                return False
+            element_offset = element_offsets[TRACKS_ID]
+            element_id, data_offset, data_size = self.read_element_header(element_offset)
+            tracks = self.read_element_data(element_id, data_offset, data_size)
+            children = split_children(tracks)
+            track_index = 0
+            for i in range(len(children)):
+                child_id, raw = children[i]
+                if (child_id != TRACK_ENTRY_ID):
+                    continue
+                if (track_index in tracks_edits):
+                    entry_id, entry_start, entry_end = next(iter_elements(raw))
+                    entry_children = split_children(raw, entry_start, entry_end)
+                    for edit_id, value in tracks_edits[track_index].items():
+                        set_child_value(entry_children, edit_id, value)
+                    children[i] = (child_id, encode_element(TRACK_ENTRY_ID, join_children(entry_children)))
+                track_index += 1
+            if (max(tracks_edits.keys()) >= track_index):
+                return False
+            element = self.build_element_update(element_offset, element_id, join_children(children), data_offset, data_size)
+            if (element is None):
+                return False
+            updates.append((element_offset, element))
+
+        # All changes fit. Write them.
+        for element_offset, element in updates:
+            self.file.seek(element_offset)
+            self.file.write(element)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return True
+
+
+def edit_media_file(file_path: str, json_diff: dict) -> bool:
+    # Writes the changes of a diff to a Matroska file without executing mkvpropedit.
+    # Returns False if the changes must be written with mkvpropedit instead.
+    with open(file_path, "r+b") as file:
+        editor = MatroskaEditor(file)
+        return editor.apply_edits(json_diff)
+
+
+def read_media_file_info(file_path: str) -> dict:
+    # Returns the metadata of a Matroska file in the same layout as `mkvmerge -J`.
+    # Like mkvmerge, 'file_name' is the path of the file as given.
+    # The codec names of the tracks listed by get_bitstream_codec_ids() may differ from the ones of mkvmerge.
+    # Raises EbmlError if the file is not a valid Matroska file.
+    with open(file_path, "rb") as file:
+        reader = MatroskaReader(file)
+        return reader.read_media_info(file_path)
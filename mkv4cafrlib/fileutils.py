@@ -3,7 +3,23 @@ import io
 import time
 import shutil
 import argparse
+import errno
 import sys
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Copy strategies, from fastest to slowest
+COPY_STRATEGY_REFLINK = "reflink"
+COPY_STRATEGY_COPY_FILE_RANGE = "copy_file_range"
+COPY_STRATEGY_SENDFILE = "sendfile"
+COPY_STRATEGY_READINTO = "readinto"
+COPY_CHUNK_SIZE = 10*1024*1024 # 10Mb chunk size
+FICLONE = 0x40049409 # Linux ioctl. Shares the data blocks of a file with another file on btrfs and XFS.
+
+# Errors that indicate that a copy strategy is not supported for a pair of files
+UNSUPPORTED_COPY_ERRNOS = [errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.ENOTTY, errno.EPERM]
 
 # https://stackoverflow.com/questions/56762491/python-equivalent-to-c-line
 def LINE():
@@ -24,6 +40,25 @@ def get_copy_file_to_directory_target(input_path: str, output_dir: str):
     return output_file_path_abs
 
 
+def get_output_dir_for_input_file(input_path: str, input_dir: str, output_dir: str):
+    # Files found in subdirectories of the input directory keep their relative path in the output directory.
+    # Otherwise, files with the same name in different subdirectories would overwrite each other.
+    relative_dir = os.path.relpath(os.path.dirname(os.path.abspath(input_path)), os.path.abspath(input_dir))
+    if (relative_dir == os.curdir or relative_dir.startswith(os.pardir)):
+        return output_dir
+    return os.path.join(output_dir, relative_dir)
+
+
+def is_path_in_directory(path: str, dir_path: str):
+    path = os.path.realpath(path)
+    dir_path = os.path.realpath(dir_path)
+    try:
+        return os.path.commonpath([path, dir_path]) == dir_path
+    except ValueError as e:
+        # Paths on different drives
+        return False
+
+
 def copy_file(input_path: str, output_path: str):
     # https://docs.python.org/3/library/shutil.html#shutil.copy2
     try:
@@ -73,42 +108,140 @@ def print_progress_bar(actual: int, total: int):
     return len(bar)
 
 
-def copy_file_with_progress(input_path: str, output_path: str):
+def raise_truncated_copy_error(output_size: int, input_size: int):
+    # The input file was truncated while being copied
+    raise OSError(errno.EIO, "End of input file reached after " + str(output_size) + " of " + str(input_size) + " bytes")
+
+
+def copy_file_reflink(fin, fout) -> bool:
+    if (fcntl is None or not sys.platform.startswith("linux")):
+        return False
     try:
-        bar_lenght = 0
-        chunk_size = 10*1024*1024 # 10Mb chunk size
-        input_size = os.path.getsize(input_path)
-        output_size = 0
-        with open(input_path, 'rb') as fin:
-            with open(output_path, 'wb') as fout:
+        fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+    except OSError as e:
+        if (e.errno in UNSUPPORTED_COPY_ERRNOS):
+            return False
+        raise e
+    return True
+
+
+def copy_file_range_loop(fin, fout, input_size: int, progress_callback) -> bool:
+    # The data is copied by the kernel, without going through user space.
+    # Returns False if nothing was copied because the files do not support copy_file_range().
+    # Raises an OSError if the input file is shorter than `input_size`.
+    if (not hasattr(os, "copy_file_range")):
+        return False
+    output_size = 0
+    while (output_size < input_size):
+        try:
+            copied_size = os.copy_file_range(fin.fileno(), fout.fileno(), min(COPY_CHUNK_SIZE, input_size - output_size), output_size, output_size)
+        except OSError as e:
+            if (output_size == 0 and e.errno in UNSUPPORTED_COPY_ERRNOS):
+                return False
+            raise e
+        if (copied_size == 0):
+            # Some file systems return 0 instead of an error when they do not really support the copy
+            if (output_size == 0):
+                return False
+            raise_truncated_copy_error(output_size, input_size)
+        output_size += copied_size
+        progress_callback(output_size, input_size)
+    return True
+
+
+def sendfile_loop(fin, fout, input_size: int, progress_callback) -> bool:
+    # Returns False if nothing was copied because the platform does not support sendfile() between files.
+    if (not hasattr(os, "sendfile")):
+        return False
+    output_size = 0
+    while (output_size < input_size):
+        try:
+            copied_size = os.sendfile(fout.fileno(), fin.fileno(), output_size, min(COPY_CHUNK_SIZE, input_size - output_size))
+        except OSError as e:
+            if (output_size == 0 and e.errno in UNSUPPORTED_COPY_ERRNOS):
+                return False
+            raise e
+        if (copied_size == 0):
+            # Some file systems return 0 instead of an error when they do not really support the copy
+            if (output_size == 0):
+                return False
+            raise_truncated_copy_error(output_size, input_size)
+        output_size += copied_size
+        progress_callback(output_size, input_size)
+    return True
 
-                # read a chunk of the input file
-                data = fin.read(chunk_size)
 
-                while (len(data) > 0):
-                    # write this chunk to the output file
-                    fout.write(data)
-                    output_size += len(data)
+def readinto_loop(fin, fout, input_size: int, progress_callback):
+    # A single buffer is reused for all chunks
+    buffer = memoryview(bytearray(COPY_CHUNK_SIZE))
+    output_size = 0
+    read_size = fin.readinto(buffer)
+    while (read_size > 0):
+        # Unbuffered writes may be partial
+        written_size = 0
+        while (written_size < read_size):
+            written_size += fout.write(buffer[written_size:read_size])
+        output_size += read_size
+        progress_callback(output_size, input_size)
+        read_size = fin.readinto(buffer)
+    if (output_size < input_size):
+        raise_truncated_copy_error(output_size, input_size)
 
-                    # and update the progress on screen
-                    bar_lenght = print_progress_bar(output_size, input_size)
 
-                    # read the next chunk
-                    data = fin.read(chunk_size)
+def copy_file_contents(input_path: str, output_path: str, progress_callback = None) -> str:
+    # Copies a file with the fastest strategy supported by the file systems of both files.
+    # Returns the name of the strategy that was used.
+    if (progress_callback is None):
+        progress_callback = lambda actual, total: None
+    input_size = os.path.getsize(input_path)
+    with open(input_path, 'rb', buffering=0) as fin:
+        with open(output_path, 'wb', buffering=0) as fout:
+            if (input_size > 0 and copy_file_reflink(fin, fout)):
+                progress_callback(input_size, input_size)
+                return COPY_STRATEGY_REFLINK
+            if (input_size > 0 and copy_file_range_loop(fin, fout, input_size, progress_callback)):
+                return COPY_STRATEGY_COPY_FILE_RANGE
+            if (input_size > 0 and sendfile_loop(fin, fout, input_size, progress_callback)):
+                return COPY_STRATEGY_SENDFILE
+            readinto_loop(fin, fout, input_size, progress_callback)
+            return COPY_STRATEGY_READINTO
 
+
+def copy_file_with_progress(input_path: str, output_path: str, show_progress: bool = True, progress_tracker = None):
+    # Returns the name of the copy strategy that was used, or None if the copy failed.
+    # If a progress tracker is specified, the progress is reported to the tracker instead of being printed.
+    bar_lenght = 0
+    task_id = None
+    def on_progress(actual: int, total: int):
+        nonlocal bar_lenght
+        if (not show_progress):
+            return
+        if (progress_tracker is not None):
+            progress_tracker.update_task(task_id, actual)
+        elif (total > 0):
+            bar_lenght = print_progress_bar(actual, total)
+
+    try:
+        if (show_progress and progress_tracker is not None):
+            task_id = progress_tracker.begin_task(input_path, os.path.getsize(input_path))
+        copy_strategy = copy_file_contents(input_path, output_path, on_progress)
     except shutil.Error as err:
         print("") # new line. go 1 line below the progress bar
         print(err)
-        return False
+        return None
     except Exception as e:
         err_desc = str(e)
         print(err_desc)
-        return False
+        return None
+    finally:
+        if (task_id is not None):
+            progress_tracker.end_task(task_id)
         
     # Erase copying bar
-    print("\r" + ' '*bar_lenght + "\r", end="", flush=True)
+    if (bar_lenght > 0):
+        print("\r" + ' '*bar_lenght + "\r", end="", flush=True)
 
-    return True
+    return copy_strategy
 
 
 def get_str_path_or_empty_str(obj):
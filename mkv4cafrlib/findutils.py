@@ -47,3 +47,40 @@ def is_absolute_file_in_path(exec_path: str):
     if (file_abs_path == exec_path):
         return True
     return False
+
+
+def find_files_by_extension(dir_path: str, extension: str, recursive: bool = False, ignore_case: bool = False):
+    # Generator that yields the path of all files in `dir_path` matching the given extension (ie: ".mkv").
+    # Files are yielded as soon as they are found to allow processing to start right away,
+    # without building the full list of files in memory first.
+    #
+    # Hidden files and directories (starting with a '.') are skipped, like `glob.glob()` does.
+    # This also skips macOS AppleDouble files (ie: `._file.mkv`) commonly found on network shares.
+    # Symbolic links to directories are not followed to prevent infinite loops.
+    if (ignore_case):
+        extension = extension.lower()
+
+    pending_dirs = [dir_path]
+    while (len(pending_dirs) > 0):
+        current_dir = pending_dirs.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    if (entry.name.startswith('.')):
+                        continue
+
+                    # `is_dir()` and `is_file()` are answered from the directory entry's type (d_type) when available
+                    # which does not require an additional system call per entry.
+                    if (entry.is_dir(follow_symlinks=False)):
+                        if (recursive):
+                            pending_dirs.append(entry.path)
+                        continue
+
+                    name = entry.name.lower() if ignore_case else entry.name
+                    if (name.endswith(extension) and entry.is_file()):
+                        yield entry.path
+        except OSError as e:
+            # The root directory must be readable. Subdirectories that can not be read are skipped.
+            if (current_dir == dir_path):
+                raise e
+            print("Skipping directory '" + current_dir + "': " + str(e))
@@ -0,0 +1,142 @@
+import io
+import sys
+import threading
+import concurrent.futures
+
+
+class ThreadOutputRouter(io.TextIOBase):
+    # A replacement for sys.stdout which sends the text written by a worker thread
+    # to that thread's private buffer. Text written by any other thread goes to the real stream.
+    # This keeps the output of each processed file grouped instead of interleaved.
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def begin_capture(self):
+        self.local.buffer = io.StringIO()
+
+    def end_capture(self) -> str:
+        buffer = getattr(self.local, 'buffer', None)
+        self.local.buffer = None
+        if (buffer is None):
+            return ""
+        return buffer.getvalue()
+
+    def is_capturing(self) -> bool:
+        return getattr(self.local, 'buffer', None) is not None
+
+    def writable(self):
+        return True
+
+    def write(self, value: str):
+        buffer = getattr(self.local, 'buffer', None)
+        if (buffer is None):
+            return self.stream.write(value)
+        return buffer.write(value)
+
+    def flush(self):
+        buffer = getattr(self.local, 'buffer', None)
+        if (buffer is None):
+            self.stream.flush()
+
+
+def get_console_stream():
+    # Returns the stream that is actually connected to the console,
+    # even if the output of the current thread is being captured.
+    stream = sys.stdout
+    if (isinstance(stream, ThreadOutputRouter)):
+        return stream.stream
+    return stream
+
+
+def is_output_captured() -> bool:
+    stream = sys.stdout
+    if (isinstance(stream, ThreadOutputRouter)):
+        return stream.is_capturing()
+    return False
+
+
+def run_jobs(items, job_func, jobs: int, result_func, output_func = None):
+    # Calls `job_func(item)` for each item of the given iterable using at most `jobs` concurrent threads.
+    # `result_func(item, result)` is called by the calling thread, in completion order.
+    # If `result_func` returns False, no new job is started and the function returns
+    # once the jobs that are already running are completed.
+    #
+    # When running more than one job at a time, everything a job prints is buffered
+    # and printed as a single block when the job completes.
+    # The block is written with `output_func(text)`, if specified.
+
+    # Run sequentially. There is nothing to group.
+    if (jobs <= 1):
+        for item in items:
+            result = job_func(item)
+            if (not result_func(item, result)):
+                break
+        return
+
+    router = ThreadOutputRouter(sys.stdout)
+
+    def run_captured(item):
+        router.begin_capture()
+        try:
+            result = job_func(item)
+        except BaseException as e:
+            return (None, router.end_capture(), e)
+        return (result, router.end_capture(), None)
+
+    previous_stdout = sys.stdout
+    sys.stdout = router
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            # Do not consume the whole iterable at once.
+            # Keep a few jobs ready so that workers never wait for the main thread.
+            max_pending = jobs * 2
+            iterator = iter(items)
+            pending = dict()
+            accept_new_jobs = True
+
+            def submit_next() -> bool:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return False
+                future = executor.submit(run_captured, item)
+                pending[future] = item
+                return True
+
+            while (len(pending) < max_pending and submit_next()):
+                pass
+
+            while (len(pending) > 0):
+                done, not_done = concurrent.futures.wait(pending.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    result, output, error = future.result()
+
+                    # Print the job's output as a single block
+                    if (output_func is not None):
+                        output_func(output)
+                    else:
+                        router.stream.write(output)
+                        router.stream.flush()
+
+                    if (error is not None):
+                        for other in pending.keys():
+                            other.cancel()
+                        raise error
+
+                    # Jobs that were already running when we stopped accepting new jobs are still reported
+                    keep_going = result_func(item, result)
+                    if (accept_new_jobs and not keep_going):
+                        accept_new_jobs = False
+                        for other in pending.keys():
+                            other.cancel()
+
+                # Drop jobs that were cancelled before they started
+                for future in [f for f in pending.keys() if f.cancelled()]:
+                    pending.pop(future)
+
+                while (accept_new_jobs and len(pending) < max_pending and submit_next()):
+                    pass
+    finally:
+        sys.stdout = previous_stdout
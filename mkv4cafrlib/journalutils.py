@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import threading
+
+# Constants
+OUTCOME_UNCHANGED = "unchanged"
+OUTCOME_EDITED = "edited"
+OUTCOME_FAILED = "failed"
+COMPLETED_OUTCOMES = [OUTCOME_UNCHANGED, OUTCOME_EDITED]
+
+
+class RunJournal:
+    # An append-only log of the outcome of each processed file, stored as one json object per line.
+    # Each entry is flushed to disk before `record()` returns so that a crash
+    # only loses the outcome of the files that were being processed.
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.file = open(file_path, "ab")
+
+        # Terminate the incomplete last line left by a crash. Otherwise, the next entry would be appended to it and lost.
+        if (self.file.tell() > 0):
+            with open(file_path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                last_character = file.read(1)
+            if (last_character != b"\n"):
+                self.file.write(b"\n")
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def record(self, file_path: str, outcome: str, fingerprint):
+        entry = dict()
+        entry['path'] = file_path
+        entry['outcome'] = outcome
+        entry['fingerprint'] = list(fingerprint) if fingerprint is not None else None
+        entry['time'] = time.time()
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            self.file.write(line.encode("utf-8"))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+
+def load_completed_files(journal_path: str) -> dict:
+    # Returns the fingerprint of all files that were successfully processed, indexed by file path.
+    # The last entry of a file wins. An incomplete last line, left by a crash, is ignored.
+    completed_files = dict()
+    if (not os.path.isfile(journal_path)):
+        return completed_files
+    with open(journal_path, "rb") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+                file_path = entry['path']
+                outcome = entry['outcome']
+                fingerprint = entry['fingerprint']
+            except Exception as e:
+                continue
+            if (outcome in COMPLETED_OUTCOMES and fingerprint is not None):
+                completed_files[file_path] = tuple(fingerprint)
+            elif (file_path in completed_files):
+                del completed_files[file_path]
+    return completed_files
+
+
+def is_file_completed(completed_files: dict, file_path: str, fingerprint) -> bool:
+    # A file is completed only if it was not modified since it was processed
+    if (not file_path in completed_files):
+        return False
+    return completed_files[file_path] == fingerprint
@@ -0,0 +1,313 @@
+import sys
+from mkv4cafrlib import mkvmergeutils
+
+# Compact model of the output of `mkvmerge -J`, for holding the metadata of many files in memory.
+# Tracks store their usual properties in slots instead of dicts, and the key order of dicts is shared between objects.
+# Fields derived from the properties are computed once, and again when a property is modified with `set_property()`.
+# The conversion to and from the json dict is lossless, including the order of the keys.
+
+# Constants
+TRACK_FLAG_BITS = {
+    "VFF": 0x01,
+    "VFQ": 0x02,
+    "VFI": 0x04,
+    "VO":  0x08,
+    "AD":  0x10,
+    "DVD": 0x20,
+    "SDH": 0x40,
+}
+MAX_SHARED_KEY_ORDERS = 10000
+MAX_SHARED_VALUE_LENGTH = 64
+
+# Track properties stored in slots. Other properties are stored in a dict.
+TRACK_PROPERTY_SLOTS = (
+    "audio_bits_per_sample",
+    "audio_channels",
+    "audio_sampling_frequency",
+    "codec_id",
+    "codec_private_data",
+    "codec_private_length",
+    "default_duration",
+    "default_track",
+    "display_dimensions",
+    "display_unit",
+    "enabled_track",
+    "encoding",
+    "forced_track",
+    "language",
+    "language_ietf",
+    "minimum_timestamp",
+    "num_index_entries",
+    "number",
+    "packetizer",
+    "pixel_dimensions",
+    "tag__statistics_tags",
+    "tag__statistics_writing_app",
+    "tag__statistics_writing_date_utc",
+    "tag_bps",
+    "tag_duration",
+    "tag_number_of_bytes",
+    "tag_number_of_frames",
+    "text_subtitles",
+    "track_name",
+    "uid",
+)
+TRACK_PROPERTY_SLOTS_SET = frozenset(TRACK_PROPERTY_SLOTS)
+
+# Track properties the derived fields are computed from
+TRACK_DERIVED_FIELDS_PROPERTIES = frozenset(["track_name", "language", "language_ietf", "tag_number_of_frames", "num_index_entries"])
+
+# Shared key orders
+shared_key_orders = dict()
+
+
+def get_shared_key_order(keys) -> tuple:
+    key_order = tuple(keys)
+    shared_key_order = shared_key_orders.get(key_order)
+    if (shared_key_order is not None):
+        return shared_key_order
+    if (len(shared_key_orders) < MAX_SHARED_KEY_ORDERS):
+        shared_key_orders[key_order] = key_order
+    return key_order
+
+
+def get_shared_value(value):
+    # Short strings, like languages and codecs, are repeated in the metadata of most files
+    if (isinstance(value, str) and len(value) <= MAX_SHARED_VALUE_LENGTH):
+        return sys.intern(value)
+    return value
+
+
+def get_flags_array_from_bits(flags: int) -> list:
+    flags_array = list()
+    for flag, bit in TRACK_FLAG_BITS.items():
+        if (flags & bit):
+            flags_array.append(flag)
+    return flags_array
+
+
+class Track:
+    __slots__ = ('keys', 'id', 'type', 'codec', 'property_names', 'other_properties', 'other_keys',
+                 'normalized_type', 'normalized_language', 'flags', 'codec_friendly_name', 'subtitles_count') + TRACK_PROPERTY_SLOTS
+
+    def __init__(self, track: dict):
+        self.keys = get_shared_key_order(track.keys())
+        self.id = track['id'] if 'id' in track else None
+        self.type = get_shared_value(track['type']) if 'type' in track else None
+        self.codec = get_shared_value(track['codec']) if 'codec' in track else None
+        self.other_keys = None
+        self.property_names = None
+        self.other_properties = None
+        for name in TRACK_PROPERTY_SLOTS:
+            setattr(self, name, None)
+
+        for key, value in track.items():
+            if (key in ['id', 'type', 'codec']):
+                continue
+            if (key == 'properties' and isinstance(value, dict)):
+                self.__set_properties(value)
+                continue
+            if (self.other_keys is None):
+                self.other_keys = dict()
+            self.other_keys[key] = value
+
+        self.update_derived_fields()
+
+    def __set_properties(self, properties: dict):
+        self.property_names = get_shared_key_order(properties.keys())
+        for name, value in properties.items():
+            if (name in TRACK_PROPERTY_SLOTS_SET):
+                setattr(self, name, get_shared_value(value))
+                continue
+            if (self.other_properties is None):
+                self.other_properties = dict()
+            self.other_properties[name] = value
+
+    def has_property(self, name: str) -> bool:
+        return self.property_names is not None and name in self.property_names
+
+    def get_property(self, name: str):
+        if (not self.has_property(name)):
+            return None
+        if (name in TRACK_PROPERTY_SLOTS_SET):
+            return getattr(self, name)
+        return self.other_properties[name]
+
+    def set_property(self, name: str, value) -> bool:
+        # Same as mkvmergeutils.set_track_property_value(). Tracks without properties are not modified.
+        if (self.property_names is None):
+            return False
+        if (not name in self.property_names):
+            self.property_names = get_shared_key_order(self.property_names + (name,))
+        if (name in TRACK_PROPERTY_SLOTS_SET):
+            setattr(self, name, get_shared_value(value))
+        else:
+            if (self.other_properties is None):
+                self.other_properties = dict()
+            self.other_properties[name] = value
+        if (name in TRACK_DERIVED_FIELDS_PROPERTIES):
+            self.update_derived_fields()
+        return True
+
+    def get_properties(self) -> dict:
+        if (self.property_names is None):
+            return None
+        properties = dict()
+        for name in self.property_names:
+            properties[name] = getattr(self, name) if name in TRACK_PROPERTY_SLOTS_SET else self.other_properties[name]
+        return properties
+
+    def get_flags_array(self) -> list:
+        # Same as mkvmergeutils.get_track_name_flags_array()
+        if (self.property_names is None or self.flags == 0):
+            return None
+        return get_flags_array_from_bits(self.flags)
+
+    def update_derived_fields(self):
+        self.normalized_type = get_shared_value(self.type.lower()) if isinstance(self.type, str) else None
+
+        language = self.get_property('language')
+        language_ietf = self.get_property('language_ietf')
+        self.normalized_language = language_ietf if language_ietf else (language if language else "und")
+
+        # Flags are extracted like mkvmergeutils.get_track_name_flags_array()
+        self.flags = 0
+        if (self.property_names is not None):
+            track_name = str(self.track_name) if self.has_property('track_name') else ""
+            flags_array = mkvmergeutils.get_flags_array_for_track_name(track_name, language_ietf if self.has_property('language_ietf') else "")
+            for flag in (flags_array if flags_array is not None else []):
+                self.flags |= TRACK_FLAG_BITS[flag]
+
+        self.codec_friendly_name = get_shared_value(mkvmergeutils.get_codec_friendly_name(self.codec)) if isinstance(self.codec, str) else None
+
+        # Same as mkvmergeutils.get_track_subtitles_count()
+        self.subtitles_count = None
+        if (self.normalized_type == 'subtitles' and self.property_names is not None):
+            try:
+                self.subtitles_count = int(self.get_property('tag_number_of_frames') if self.has_property('tag_number_of_frames') else 0)
+            except (TypeError, ValueError) as e:
+                pass
+
+    def to_dict(self) -> dict:
+        track = dict()
+        for key in self.keys:
+            match key:
+                case 'id':
+                    track[key] = self.id
+                case 'type':
+                    track[key] = self.type
+                case 'codec':
+                    track[key] = self.codec
+                case 'properties' if self.property_names is not None:
+                    track[key] = self.get_properties()
+                case _:
+                    track[key] = self.other_keys[key]
+        return track
+
+
+class Container:
+    __slots__ = ('keys', 'type', 'recognized', 'supported', 'properties', 'other_keys', 'duration_ms')
+
+    def __init__(self, container: dict):
+        self.keys = get_shared_key_order(container.keys())
+        self.type = get_shared_value(container['type']) if 'type' in container else None
+        self.recognized = container['recognized'] if 'recognized' in container else None
+        self.supported = container['supported'] if 'supported' in container else None
+        self.properties = container['properties'] if 'properties' in container else None
+        self.other_keys = None
+        for key, value in container.items():
+            if (key in ['type', 'recognized', 'supported', 'properties']):
+                continue
+            if (self.other_keys is None):
+                self.other_keys = dict()
+            self.other_keys[key] = value
+        self.update_derived_fields()
+
+    def update_derived_fields(self):
+        # Same as mkvmergeutils.get_container_duration_ms()
+        self.duration_ms = None
+        if (isinstance(self.properties, dict) and self.properties.get('duration') is not None):
+            try:
+                self.duration_ms = int(int(self.properties['duration'])/(1000*1000))
+            except (TypeError, ValueError) as e:
+                pass
+
+    def to_dict(self) -> dict:
+        container = dict()
+        for key in self.keys:
+            match key:
+                case 'type':
+                    container[key] = self.type
+                case 'recognized':
+                    container[key] = self.recognized
+                case 'supported':
+                    container[key] = self.supported
+                case 'properties':
+                    container[key] = dict(self.properties) if isinstance(self.properties, dict) else self.properties
+                case _:
+                    container[key] = self.other_keys[key]
+        return container
+
+
+class MediaInfo:
+    # Model of a complete `mkvmerge -J` document.
+    # Sections that are not modeled, like `attachments` and `chapters`, are kept as they are.
+    __slots__ = ('keys', 'file_name', 'container', 'tracks', 'other_keys')
+
+    def __init__(self, json_obj: dict):
+        self.keys = get_shared_key_order(json_obj.keys())
+        self.file_name = json_obj['file_name'] if 'file_name' in json_obj else None
+        self.container = None
+        self.tracks = None
+        self.other_keys = None
+        for key, value in json_obj.items():
+            if (key == 'file_name'):
+                continue
+            if (key == 'container' and isinstance(value, dict)):
+                self.container = Container(value)
+                continue
+            if (key == 'tracks' and isinstance(value, list) and all(isinstance(track, dict) for track in value)):
+                self.tracks = [Track(track) for track in value]
+                continue
+            if (self.other_keys is None):
+                self.other_keys = dict()
+            self.other_keys[key] = value
+
+    def get_tracks_flags_arrays(self) -> list:
+        # Flags array of each track, for mkvmergeutils.TrackIndex
+        if (self.tracks is None):
+            return None
+        return [track.get_flags_array() for track in self.tracks]
+
+    def get_tracks_of_type(self, type: str) -> list:
+        if (self.tracks is None):
+            return list()
+        return [track for track in self.tracks if track.normalized_type == type]
+
+    def to_dict(self) -> dict:
+        json_obj = dict()
+        for key in self.keys:
+            match key:
+                case 'file_name':
+                    json_obj[key] = self.file_name
+                case 'container' if self.container is not None:
+                    json_obj[key] = self.container.to_dict()
+                case 'tracks' if self.tracks is not None:
+                    json_obj[key] = [track.to_dict() for track in self.tracks]
+                case _:
+                    json_obj[key] = self.other_keys[key]
+        return json_obj
+
+
+def get_media_info_dict(json_obj) -> dict:
+    # Returns the json dict of a MediaInfo. Other objects are returned as is.
+    if (isinstance(json_obj, MediaInfo)):
+        return json_obj.to_dict()
+    return json_obj
+
+
+def get_media_info_tracks_flags(json_obj) -> list:
+    # Returns the flags of the tracks of a MediaInfo, extracted when the MediaInfo was created. Returns None for other objects.
+    if (isinstance(json_obj, MediaInfo)):
+        return json_obj.get_tracks_flags_arrays()
+    return None
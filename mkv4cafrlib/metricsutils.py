@@ -0,0 +1,127 @@
+import time
+import json
+import math
+import threading
+import contextlib
+
+# Constants
+STAGE_OUTCOME_OK = "ok"
+STAGE_OUTCOME_FAILED = "failed"
+STAGE_OUTCOME_ERROR = "error" # an exception was raised
+
+
+@contextlib.contextmanager
+def measure_stage(stages: list, name: str):
+    # Measures the duration of a processing stage and appends it to `stages`.
+    # The caller may set the 'bytes' and 'outcome' keys of the yielded stage.
+    stage = dict()
+    stage['stage'] = name
+    stage['outcome'] = STAGE_OUTCOME_OK
+    start_time = time.monotonic()
+    try:
+        yield stage
+    except BaseException as e:
+        stage['outcome'] = STAGE_OUTCOME_ERROR
+        raise e
+    finally:
+        stage['duration'] = time.monotonic() - start_time
+        stages.append(stage)
+
+
+def get_percentile(sorted_values: list, percent: float) -> float:
+    # Nearest-rank method
+    if (len(sorted_values) == 0):
+        return None
+    rank = math.ceil(percent / 100.0 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+class MetricsRecorder:
+    # Records the duration, byte count and outcome of the processing stages of each file.
+    # Each stage and each file is written as a json event to an optional json lines file.
+    def __init__(self, file_path: str = None):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.durations = dict()
+        self.byte_counts = dict()
+        self.file = open(file_path, "a", encoding="utf-8") if file_path is not None else None
+
+    def close(self):
+        with self.lock:
+            if (self.file is not None):
+                self.file.close()
+                self.file = None
+
+    def __write_event(self, event: dict):
+        if (self.file is None):
+            return
+        event['time'] = time.time()
+        self.file.write(json.dumps(event) + "\n")
+        self.file.flush()
+
+    def record_file(self, file_path: str, outcome: str, duration: float, stages: list):
+        with self.lock:
+            for stage in stages:
+                name = stage['stage']
+                if (not name in self.durations):
+                    self.durations[name] = list()
+                    self.byte_counts[name] = 0
+                self.durations[name].append(stage['duration'])
+                self.byte_counts[name] += stage['bytes'] if 'bytes' in stage else 0
+
+                event = dict()
+                event['event'] = "stage"
+                event['path'] = file_path
+                event.update(stage)
+                self.__write_event(event)
+
+            event = dict()
+            event['event'] = "file"
+            event['path'] = file_path
+            event['outcome'] = outcome
+            event['duration'] = duration
+            self.__write_event(event)
+
+    def get_summary(self) -> dict:
+        # Returns the statistics of each stage, in the order stages were first recorded
+        summary = dict()
+        with self.lock:
+            for name, durations in self.durations.items():
+                sorted_durations = sorted(durations)
+                stats = dict()
+                stats['count'] = len(sorted_durations)
+                stats['p50'] = get_percentile(sorted_durations, 50)
+                stats['p95'] = get_percentile(sorted_durations, 95)
+                stats['max'] = sorted_durations[-1]
+                stats['total'] = sum(sorted_durations)
+                stats['bytes'] = self.byte_counts[name]
+                summary[name] = stats
+        return summary
+
+    def write_summary(self) -> dict:
+        summary = self.get_summary()
+        event = dict()
+        event['event'] = "summary"
+        event['stages'] = summary
+        with self.lock:
+            self.__write_event(event)
+        return summary
+
+
+def print_summary(summary: dict):
+    if (len(summary) == 0):
+        return
+    print("Stage timings:")
+    for name, stats in summary.items():
+        line = "  {0}: count={1} p50={2:.3f}s p95={3:.3f}s max={4:.3f}s total={5:.3f}s".format(name, stats['count'], stats['p50'], stats['p95'], stats['max'], stats['total'])
+        if (stats['bytes'] > 0):
+            line += " bytes=" + str(stats['bytes'])
+        print(line)
+
+
+def open_metrics_file(file_path: str):
+    try:
+        return MetricsRecorder(file_path)
+    except Exception as e:
+        print("Failed to open metrics file '" + file_path + "': " + str(e))
+        return None
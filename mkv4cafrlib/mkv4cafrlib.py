@@ -4,78 +4,99 @@ import sys
 import getpass
 import subprocess
 import json
-import copy
 import glob
+import time
 
 from mkv4cafrlib import findutils
 from mkv4cafrlib import fileutils
 from mkv4cafrlib import mkvtoolnixutils
 from mkv4cafrlib import mkvmergeutils
+from mkv4cafrlib import mediainfoutils
 from mkv4cafrlib import jsonutils
 
 # Constants
 MAX_SUBTITLES_PER_HOUR_RATIO = 75.0
+RULE_SCOPE_TRACK = "track" # the rule updates a single track and only reads this track
+RULE_SCOPE_DOCUMENT = "document" # the rule reads and updates all tracks of its types
+RULE_INPUT_FILE_NAME = "file_name" # the rule reads the name of the input file
 
-def update_video_tracks_set_default_track_flag(json_obj: dict):
+
+def get_track_lookup(tracks: list, lookup: mkvmergeutils.TrackIndex):
+    # The rules share the index of the document they update. Build one if the caller did not.
+    if (lookup is None):
+        return mkvmergeutils.TrackIndex(tracks)
+    return lookup
+
+
+def update_tracks_of_types(json_obj: dict, types: list, update_track, lookup: mkvmergeutils.TrackIndex = None):
+    # Applies a rule of scope RULE_SCOPE_TRACK to each track of the given types
     tracks = json_obj['tracks'] if 'tracks' in json_obj else None
     if (tracks is None):
         return
+    lookup = get_track_lookup(tracks, lookup)
 
+    tracks_indice = lookup.get_indice_by_type(types)
+    for track_index in tracks_indice:
+        update_track(json_obj, track_index, lookup)
+
+
+def update_video_track_set_default_track_flag(json_obj: dict, track_index: int, lookup: mkvmergeutils.TrackIndex):
     # Set video tracks as default tracks
-    video_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, 'video')
-    for track_index in video_tracks_indice:
-        # Update the track
-        json_obj['tracks'][track_index]['properties']['default_track'] = True
+    mkvmergeutils.set_track_property_value(json_obj, track_index, 'default_track', True)
 
 
-def update_video_tracks_remove_track_name(json_obj: dict):
-    tracks = json_obj['tracks'] if 'tracks' in json_obj else None
-    if (tracks is None):
-        return
+def update_video_tracks_set_default_track_flag(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
+    update_tracks_of_types(json_obj, ['video'], update_video_track_set_default_track_flag, lookup)
 
+
+def update_video_track_remove_track_name(json_obj: dict, track_index: int, lookup: mkvmergeutils.TrackIndex):
     # Remove name from video tracks
-    video_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, 'video')
-    for track_index in video_tracks_indice:
-        # Update the track
-        json_obj['tracks'][track_index]['properties']['track_name'] = ""
+    mkvmergeutils.set_track_property_value(json_obj, track_index, 'track_name', "")
+    lookup.update_track(track_index)
 
 
-def update_set_language_from_track_name_hints(json_obj: dict):
-    tracks = json_obj['tracks'] if 'tracks' in json_obj else None
-    if (tracks is None):
-        return
+def update_video_tracks_remove_track_name(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
+    update_tracks_of_types(json_obj, ['video'], update_video_track_remove_track_name, lookup)
+
 
+def update_track_set_language_from_track_name_hints(json_obj: dict, track_index: int, lookup: mkvmergeutils.TrackIndex):
     # Force language of audio/subtitles if a language hint is found in the track's name
-    tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, ['audio', 'subtitles'])
-    for track_index in tracks_indice:
-        # Update the track
-        track = json_obj['tracks'][track_index]
-        if not "properties" in track:
-            continue
-        flags = mkvmergeutils.get_track_name_flags(track)
-        if flags is None:
-            continue
+    track = json_obj['tracks'][track_index]
+    if not "properties" in track:
+        return
+    flags = lookup.get_track_flags(track_index)
+    if flags is None:
+        return
 
-        if (flags.find("VFQ") != -1):
-            json_obj['tracks'][track_index]['properties']['language'] = "fre"
-            json_obj['tracks'][track_index]['properties']['language_ietf'] = "fr-CA"
-        elif (flags.find("VFF") >= 0 or flags.find("VOF") >= 0):
-            json_obj['tracks'][track_index]['properties']['language'] = "fre"
-            json_obj['tracks'][track_index]['properties']['language_ietf'] = "fr-FR"
-        elif (flags.find("VFI") != -1):
-            json_obj['tracks'][track_index]['properties']['language'] = "fre"
-            json_obj['tracks'][track_index]['properties']['language_ietf'] = "fr"
+    if (flags.find("VFQ") != -1):
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'language', "fre")
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'language_ietf', "fr-CA")
+    elif (flags.find("VFF") >= 0 or flags.find("VOF") >= 0):
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'language', "fre")
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'language_ietf', "fr-FR")
+    elif (flags.find("VFI") != -1):
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'language', "fre")
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'language_ietf', "fr")
+    else:
+        # The track is not modified
+        return
+    lookup.update_track(track_index)
+
+
+def update_set_language_from_track_name_hints(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
+    update_tracks_of_types(json_obj, ['audio', 'subtitles'], update_track_set_language_from_track_name_hints, lookup)
 
 
-def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: dict, input_file_path: str):
+def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: dict, input_file_path: str, lookup: mkvmergeutils.TrackIndex = None):
     tracks = json_obj['tracks'] if 'tracks' in json_obj else None
     if (tracks is None):
         return
+    lookup = get_track_lookup(tracks, lookup)
 
     flags = mkvmergeutils.get_track_name_flags_from_filename(input_file_path)
 
-    audio_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, "audio")
-    french_audio_tracks_indice = mkvmergeutils.filter_tracks_indice_by_language(tracks, audio_tracks_indice, ['fre'])
+    audio_tracks_indice = lookup.get_indice_by_type("audio")
+    french_audio_tracks_indice = lookup.filter_indice_by_language(audio_tracks_indice, ['fre'])
 
     total_audio_tracks_count = len(audio_tracks_indice)
     french_audio_tracks_count = len(french_audio_tracks_indice)
@@ -91,18 +112,18 @@ def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: di
 
         match flags:
             case "VFQ":
-                mkvmergeutils.set_track_flag(json_obj, track_index, flags)
+                mkvmergeutils.set_track_flag(json_obj, track_index, flags, lookup)
             case "VFF":
-                mkvmergeutils.set_track_flag(json_obj, track_index, flags)
+                mkvmergeutils.set_track_flag(json_obj, track_index, flags, lookup)
             case "VFI":
-                mkvmergeutils.set_track_flag(json_obj, track_index, flags)
+                mkvmergeutils.set_track_flag(json_obj, track_index, flags, lookup)
             case _:
                 pass
 
     if (flags in ['VF2'] and french_audio_tracks_count == 2):
-        vfq_audio_tracks_indice     = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFQ'])
-        vff_audio_tracks_indice     = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFF'])
-        vfi_audio_tracks_indice     = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFI'])
+        vfq_audio_tracks_indice     = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFQ'])
+        vff_audio_tracks_indice     = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFF'])
+        vfi_audio_tracks_indice     = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFI'])
         vfq_audio_tracks_count = len(vfq_audio_tracks_indice)
         vff_audio_tracks_count = len(vff_audio_tracks_indice)
         vfi_audio_tracks_count = len(vfi_audio_tracks_indice)
@@ -119,7 +140,7 @@ def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: di
                     continue
 
                 # Update the track
-                mkvmergeutils.set_track_flag(json_obj, track_index, "VFF")
+                mkvmergeutils.set_track_flag(json_obj, track_index, "VFF", lookup)
 
                 # Update
                 vff_audio_tracks_indice.append(track_index)
@@ -134,7 +155,7 @@ def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: di
                     continue
 
                 # Update the track
-                mkvmergeutils.set_track_flag(json_obj, track_index, "VFQ")
+                mkvmergeutils.set_track_flag(json_obj, track_index, "VFQ", lookup)
 
                 # Update
                 vfq_audio_tracks_indice.append(track_index)
@@ -142,25 +163,25 @@ def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: di
         
         # If a single english audio track is left, then it must certainy be VO
         # refresh counters
-        audio_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, "audio")
-        french_audio_tracks_indice  = mkvmergeutils.filter_tracks_indice_by_language(tracks, audio_tracks_indice, ['fre'])
+        audio_tracks_indice = lookup.get_indice_by_type("audio")
+        french_audio_tracks_indice  = lookup.filter_indice_by_language(audio_tracks_indice, ['fre'])
         total_audio_tracks_count = len(audio_tracks_indice)
         french_audio_tracks_count = len(french_audio_tracks_indice)
 
-        english_audio_tracks_indice  = mkvmergeutils.filter_tracks_indice_by_language(tracks, audio_tracks_indice, ['eng'])
+        english_audio_tracks_indice  = lookup.filter_indice_by_language(audio_tracks_indice, ['eng'])
         if ((total_audio_tracks_count - french_audio_tracks_count) == 1 and len(english_audio_tracks_indice) == 1 ):
             # Only VF2 containers should be have their English audio track automatically flagged as 'VO'.
             track_index = english_audio_tracks_indice[0]
 
             # Update the track
-            mkvmergeutils.set_track_flag(json_obj, track_index, "VO")
+            mkvmergeutils.set_track_flag(json_obj, track_index, "VO", lookup)
 
 
     # Refresh
-    french_audio_tracks_indice  = mkvmergeutils.filter_tracks_indice_by_language(tracks, audio_tracks_indice, ['fre'])
-    vfq_audio_tracks_indice     = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFQ'])
-    vff_audio_tracks_indice     = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFF'])
-    vfi_audio_tracks_indice     = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFI'])
+    french_audio_tracks_indice  = lookup.filter_indice_by_language(audio_tracks_indice, ['fre'])
+    vfq_audio_tracks_indice     = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFQ'])
+    vff_audio_tracks_indice     = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFF'])
+    vfi_audio_tracks_indice     = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFI'])
     french_audio_tracks_count = len(french_audio_tracks_indice)
     vfq_audio_tracks_count = len(vfq_audio_tracks_indice)
     vff_audio_tracks_count = len(vff_audio_tracks_indice)
@@ -171,132 +192,243 @@ def update_audio_tracks_language_or_track_name_from_input_file_name(json_obj: di
         print("WARNING: Failed to identify VFQ and VFF tracks in VF2 filename '" + input_file_path + "'.")
 
 
-def update_audio_tracks_rename_all_track_names(json_obj: dict):
-    tracks = json_obj['tracks'] if 'tracks' in json_obj else None
-    if (tracks is None):
-        return
-
+def update_audio_track_rename_track_name(json_obj: dict, track_index: int, lookup: mkvmergeutils.TrackIndex):
     # Rename audio tracks
-    audio_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, 'audio')
-    for track_index in audio_tracks_indice:
-        # Update the track
-        new_name = mkvmergeutils.get_track_auto_generated_name(json_obj['tracks'][track_index])
-        json_obj['tracks'][track_index]['properties']['track_name'] = new_name
+    new_name = mkvmergeutils.get_track_auto_generated_name(json_obj['tracks'][track_index])
+    mkvmergeutils.set_track_property_value(json_obj, track_index, 'track_name', new_name)
+    lookup.update_track(track_index)
+
+
+def update_audio_tracks_rename_all_track_names(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
+    update_tracks_of_types(json_obj, ['audio'], update_audio_track_rename_track_name, lookup)
 
 
-def update_audio_tracks_default_track(json_obj: dict):
+def update_audio_tracks_default_track(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
     tracks = json_obj['tracks'] if 'tracks' in json_obj else None
     if (tracks is None):
         return
+    lookup = get_track_lookup(tracks, lookup)
 
     # Update default audio track as per preferences
-    first_default_audio_track_id = mkvmergeutils.get_first_default_track_id_for_type(tracks, 'audio')
-    best_audio_track_id = mkvmergeutils.get_best_track_id_for_type(tracks, 'audio')
+    first_default_audio_track_id = mkvmergeutils.get_first_default_track_id_for_type(tracks, 'audio', lookup)
+    best_audio_track_id = mkvmergeutils.get_best_track_id_for_type(tracks, 'audio', lookup)
 
     # Unset all defaults audio tracks
-    audio_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, 'audio')
+    audio_tracks_indice = lookup.get_indice_by_type('audio')
     for track_index in audio_tracks_indice:
-        json_obj['tracks'][track_index]['properties']['default_track'] = False
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'default_track', False)
 
     # Set default_track from "best"
     if ( best_audio_track_id != mkvmergeutils.INVALID_TRACK_ID ):
-        track_index = mkvmergeutils.get_track_index_from_id(tracks, best_audio_track_id)
-        json_obj["tracks"][track_index]["properties"]["default_track"] = True
+        track_index = lookup.get_index_from_id(best_audio_track_id)
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'default_track', True)
     elif ( first_default_audio_track_id != mkvmergeutils.INVALID_TRACK_ID ):
-        track_index = mkvmergeutils.get_track_index_from_id(tracks, first_default_audio_track_id)
-        json_obj["tracks"][track_index]["properties"]["default_track"] = True
+        track_index = lookup.get_index_from_id(first_default_audio_track_id)
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'default_track', True)
 
 
-def update_subtitle_tracks_set_forced_flag_if_required(json_obj: dict):
-    tracks = json_obj['tracks'] if 'tracks' in json_obj else None
-    if (tracks is None):
+def update_subtitle_track_set_forced_flag_if_required(json_obj: dict, track_index: int, lookup: mkvmergeutils.TrackIndex):
+    # Set forced flag to subtitles that contains less than 75 entries per hour or the string "force" in their name
+    track = json_obj['tracks'][track_index]
+    if not "properties" in track:
         return
+    properties = track['properties']
 
-    # Set forced flag to subtitles that contains less than 75 entries per hour or the string "force" in their name
-    subtitles_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, 'subtitles')
-    for track_index in subtitles_tracks_indice:
-        track = tracks[track_index]
-        if not "properties" in track:
-            continue
-        properties = track['properties']
-
-        # Set forced flag for subtitles that have less than 75 entries per hour
-        track_subtitles_count = mkvmergeutils.get_track_subtitles_count(track)
-        if (track_subtitles_count > 0):
-            container_duration_ms = mkvmergeutils.get_container_duration_ms(json_obj)
-            if (container_duration_ms > 0):
-                container_duration_hours = container_duration_ms/3600000.0
-                subtitles_per_hour = track_subtitles_count / container_duration_hours
-                if (subtitles_per_hour < MAX_SUBTITLES_PER_HOUR_RATIO):
-                    json_obj["tracks"][track_index]["properties"]["forced_track"] = True
-
-        # Check if word "forced" is found, it is propably a forced subtible track
-        track_name = properties['track_name'] if 'track_name' in properties else ""
-        track_name = track_name.upper()
-        if ( track_name.find("FORCE") != -1 or track_name.find("FORCÉ") != -1 ):
-            json_obj["tracks"][track_index]["properties"]["forced_track"] = True
-
-
-def update_subtitle_tracks_default_track_from_forced_flag(json_obj: dict):
+    # Set forced flag for subtitles that have less than 75 entries per hour
+    track_subtitles_count = mkvmergeutils.get_track_subtitles_count(track)
+    if (track_subtitles_count > 0):
+        container_duration_ms = mkvmergeutils.get_container_duration_ms(json_obj)
+        if (container_duration_ms > 0):
+            container_duration_hours = container_duration_ms/3600000.0
+            subtitles_per_hour = track_subtitles_count / container_duration_hours
+            if (subtitles_per_hour < MAX_SUBTITLES_PER_HOUR_RATIO):
+                mkvmergeutils.set_track_property_value(json_obj, track_index, 'forced_track', True)
+
+    # Check if word "forced" is found, it is propably a forced subtible track
+    track_name = properties['track_name'] if 'track_name' in properties else ""
+    track_name = track_name.upper()
+    if ( track_name.find("FORCE") != -1 or track_name.find("FORCÉ") != -1 ):
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'forced_track', True)
+
+
+def update_subtitle_tracks_set_forced_flag_if_required(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
+    update_tracks_of_types(json_obj, ['subtitles'], update_subtitle_track_set_forced_flag_if_required, lookup)
+
+
+def update_subtitle_tracks_default_track_from_forced_flag(json_obj: dict, lookup: mkvmergeutils.TrackIndex = None):
     tracks = json_obj['tracks'] if 'tracks' in json_obj else None
     if (tracks is None):
         return
+    lookup = get_track_lookup(tracks, lookup)
 
     # Update forced subtitles track as per preferences
-    best_forced_subtitle_track_id = mkvmergeutils.get_best_forced_track_id_for_type(tracks, 'subtitles')
+    best_forced_subtitle_track_id = mkvmergeutils.get_best_forced_track_id_for_type(tracks, 'subtitles', lookup)
 
     # Unset all defaults subtitles tracks
-    subtitles_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, 'subtitles')
+    subtitles_tracks_indice = lookup.get_indice_by_type('subtitles')
     for track_index in subtitles_tracks_indice:
-        json_obj['tracks'][track_index]['properties']['default_track'] = False
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'default_track', False)
 
     # Set default_track from "best"
     if ( best_forced_subtitle_track_id != mkvmergeutils.INVALID_TRACK_ID ):
-        track_index = mkvmergeutils.get_track_index_from_id(tracks, best_forced_subtitle_track_id)
-        json_obj["tracks"][track_index]["properties"]["default_track"] = True
+        track_index = lookup.get_index_from_id(best_forced_subtitle_track_id)
+        mkvmergeutils.set_track_property_value(json_obj, track_index, 'default_track', True)
+
+
+def create_rule(name: str, scope: str, function, types: list, reads: list, writes: list) -> dict:
+    # A rule declares the track types and the track properties it reads and writes.
+    # Rules of scope RULE_SCOPE_TRACK are called as `function(json_obj, track_index, lookup)` for each track of their types.
+    # Rules of scope RULE_SCOPE_DOCUMENT are called as `function(json_obj, lookup)`,
+    # or as `function(json_obj, input_file_path, lookup)` if they read RULE_INPUT_FILE_NAME.
+    rule = dict()
+    rule['name'] = name
+    rule['scope'] = scope
+    rule['function'] = function
+    rule['types'] = types
+    rule['reads'] = reads
+    rule['writes'] = writes
+    return rule
+
+
+# The rules, in order of execution
+RULES = [
+    create_rule("video_default_track", RULE_SCOPE_TRACK, update_video_track_set_default_track_flag, ['video'], [], ['default_track']),
+    create_rule("video_track_name", RULE_SCOPE_TRACK, update_video_track_remove_track_name, ['video'], [], ['track_name']),
+    create_rule("language_from_track_name", RULE_SCOPE_TRACK, update_track_set_language_from_track_name_hints, ['audio', 'subtitles'], ['track_name', 'language_ietf'], ['language', 'language_ietf']),
+    create_rule("audio_flags_from_file_name", RULE_SCOPE_DOCUMENT, update_audio_tracks_language_or_track_name_from_input_file_name, ['audio'], [RULE_INPUT_FILE_NAME, 'track_name', 'language', 'language_ietf'], ['track_name', 'language', 'language_ietf']),
+    create_rule("audio_track_name", RULE_SCOPE_TRACK, update_audio_track_rename_track_name, ['audio'], ['track_name', 'language', 'language_ietf', 'audio_channels'], ['track_name']),
+    create_rule("audio_default_track", RULE_SCOPE_DOCUMENT, update_audio_tracks_default_track, ['audio'], ['track_name', 'language', 'language_ietf', 'default_track'], ['default_track']),
+    create_rule("subtitles_forced_track", RULE_SCOPE_TRACK, update_subtitle_track_set_forced_flag_if_required, ['subtitles'], ['track_name', 'tag_number_of_frames'], ['forced_track']),
+    create_rule("subtitles_default_track", RULE_SCOPE_DOCUMENT, update_subtitle_tracks_default_track_from_forced_flag, ['subtitles'], ['track_name', 'language', 'language_ietf', 'forced_track', 'default_track'], ['default_track']),
+]
+
+
+def get_rule_passes(rules: list) -> list:
+    # Groups the rules in passes. A pass runs a single rule of scope RULE_SCOPE_DOCUMENT,
+    # or runs rules of scope RULE_SCOPE_TRACK in a single iteration over the tracks.
+    #
+    # A track rule joins the last pass over the tracks if the document rules that run after this pass
+    # do not read or write tracks of the same types. The order of the rules that update a given track is preserved.
+    passes = list()
+    track_pass = None
+    document_types = set() # types of the document rules that run after `track_pass`
+    for rule in rules:
+        if (rule['scope'] == RULE_SCOPE_DOCUMENT):
+            rule_pass = dict()
+            rule_pass['scope'] = RULE_SCOPE_DOCUMENT
+            rule_pass['rules'] = [rule]
+            rule_pass['types'] = list(rule['types'])
+            passes.append(rule_pass)
+            document_types.update(rule['types'])
+            continue
+
+        if (track_pass is None or not document_types.isdisjoint(rule['types'])):
+            track_pass = dict()
+            track_pass['scope'] = RULE_SCOPE_TRACK
+            track_pass['rules'] = list()
+            track_pass['types'] = list()
+            track_pass['rules_by_type'] = dict()
+            passes.append(track_pass)
+            document_types = set()
+
+        track_pass['rules'].append(rule)
+        for type in rule['types']:
+            if (not type in track_pass['types']):
+                track_pass['types'].append(type)
+                track_pass['rules_by_type'][type] = list()
+            track_pass['rules_by_type'][type].append(rule)
+    return passes
+
+
+# The passes of RULES
+RULE_PASSES = get_rule_passes(RULES)
+
+
+def run_timed_rule(rule: dict, args: tuple, rule_timings: dict):
+    start_time = time.perf_counter()
+    try:
+        rule['function'](*args)
+    finally:
+        rule_timings[rule['name']] = rule_timings.get(rule['name'], 0.0) + time.perf_counter() - start_time
+
+
+def run_rules(json_obj: dict, input_file_path: str, lookup: mkvmergeutils.TrackIndex, rule_passes: list = RULE_PASSES, rule_timings: dict = None):
+    # Runs the rules of each pass, skipping the rules whose inputs are absent.
+    # If `rule_timings` is specified, the duration in seconds of each rule that runs is added to it, by rule name.
+    tracks = json_obj['tracks']
+    for rule_pass in rule_passes:
+        tracks_indice = lookup.get_indice_by_type(rule_pass['types'])
+
+        if (rule_pass['scope'] == RULE_SCOPE_DOCUMENT):
+            rule = rule_pass['rules'][0]
+            if (RULE_INPUT_FILE_NAME in rule['reads']):
+                args = (json_obj, input_file_path, lookup)
+            elif (len(tracks_indice) > 0):
+                args = (json_obj, lookup)
+            else:
+                continue
+            if (rule_timings is None):
+                rule['function'](*args)
+            else:
+                run_timed_rule(rule, args, rule_timings)
+            continue
+
+        rules_by_type = rule_pass['rules_by_type']
+        for track_index in tracks_indice:
+            for rule in rules_by_type[tracks[track_index]['type']]:
+                if (rule_timings is None):
+                    rule['function'](json_obj, track_index, lookup)
+                else:
+                    run_timed_rule(rule, (json_obj, track_index, lookup), rule_timings)
 
 
-def update_properties_as_per_preferences(json_obj: dict, input_file_path: str):
-    # Make a deep copy of all the json data
-    json_copy = copy.deepcopy(json_obj)
+def update_properties_as_per_preferences(json_obj: dict, input_file_path: str, rule_timings: dict = None):
+    # The rules modify the json data of a MediaInfo and return a new MediaInfo.
+    # The flags of the tracks are not extracted again from the track names.
+    media_info = json_obj if isinstance(json_obj, mediainfoutils.MediaInfo) else None
+    track_flags = mediainfoutils.get_media_info_tracks_flags(json_obj)
+    json_obj = mediainfoutils.get_media_info_dict(json_obj)
+
+    # Make a copy-on-write copy of the json data.
+    # The sections that the rules do not modify, like attachments and chapters, are not copied.
+    json_copy = mkvmergeutils.MediaInfoOverlay(json_obj)
 
     tracks = json_copy['tracks'] if 'tracks' in json_copy else None
     if (tracks is None):
         return
 
     # Clear the title, if any
-    try:
-        json_copy['container']['properties']['title'] = ""
-    except Exception as e: pass
-    
-    update_video_tracks_set_default_track_flag(json_copy)
-    update_video_tracks_remove_track_name(json_copy)
-    update_set_language_from_track_name_hints(json_copy)
-    update_audio_tracks_language_or_track_name_from_input_file_name(json_copy, input_file_path)
-    update_audio_tracks_rename_all_track_names(json_copy)
-    update_audio_tracks_default_track(json_copy)
-    update_subtitle_tracks_set_forced_flag_if_required(json_copy)
-    update_subtitle_tracks_default_track_from_forced_flag(json_copy)
+    mkvmergeutils.set_container_properties_title(json_copy, "")
     
+    # All rules share the same index of the tracks
+    lookup = mkvmergeutils.TrackIndex(tracks, track_flags)
+
+    run_rules(json_copy, input_file_path, lookup, RULE_PASSES, rule_timings)
+
+    if (media_info is not None):
+        return mediainfoutils.MediaInfo(json_copy)
     return json_copy
 
 
 def validate_inconsistencies(json_obj, input_abspath):
+    track_flags = mediainfoutils.get_media_info_tracks_flags(json_obj)
+    json_obj = mediainfoutils.get_media_info_dict(json_obj)
     tracks = json_obj['tracks'] if 'tracks' in json_obj else None
     if (tracks is None):
         return
     
-    audio_tracks_indice = mkvmergeutils.get_tracks_indice_by_type(tracks, "audio")
+    lookup = mkvmergeutils.TrackIndex(tracks, track_flags)
+    audio_tracks_indice = lookup.get_indice_by_type("audio")
     
     # Validate a maximum of a single audio track with flag VO
-    vo_audio_tracks_indice = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VO'])
+    vo_audio_tracks_indice = lookup.filter_indice_by_flag(audio_tracks_indice, ['VO'])
     vo_audio_tracks_count = len(vo_audio_tracks_indice)
     if (vo_audio_tracks_count > 1):
         print("Error, multiple audio tracks were identified with the VO flag: " + ",".join(str(x) for x in vo_audio_tracks_indice) + ".")
         return False
     
     # Validate that a VFI audio track do has language set to FR and language_ietf is empty.
-    vfi_audio_tracks_indice = mkvmergeutils.filter_tracks_indice_by_flag(tracks, audio_tracks_indice, ['VFI'])
+    vfi_audio_tracks_indice = lookup.filter_indice_by_flag(audio_tracks_indice, ['VFI'])
     for track_index in vfi_audio_tracks_indice:
         track_language = mkvmergeutils.get_track_property_value(json_obj, track_index, 'language')
         if (not track_language == "fre"):
@@ -313,7 +445,116 @@ def validate_inconsistencies(json_obj, input_abspath):
     return True
 
 
+def is_track_comparable(track: dict) -> bool:
+    # Tracks can only be compared if they have a type, an id and properties
+    if (track is None):
+        return False
+    track_type = track['type'] if 'type' in track else None
+    track_id = track['id'] if 'id' in track else None
+    properties = track['properties'] if 'properties' in track else None
+    if (track_type is None or
+        track_id is None or
+        properties is None):
+        return False
+    return True
+
+
+def get_track_properties_differences(properties_left: dict, properties_right: dict, property_names: list) -> dict:
+    # Returns the properties of the right track that are different from the left track
+    properties_diff = dict()
+    for property_name in property_names:
+        # Get value
+        property_value_left = properties_left[property_name] if property_name in properties_left else None
+        property_value_right = properties_right[property_name] if property_name in properties_right else None
+
+        # Handle special case for track_name set to '' or None
+        if (property_name == "track_name" and 
+            (property_value_left is None or property_value_left == '') and
+            (property_value_right is None or property_value_right == '')):
+            # consider these properties as equals
+            # This check is required for properly detecting special case:
+            # 'No modification required in input file metadata.'
+            continue
+
+        # Check if property is not set on both sides (left and right)
+        if (property_value_left is None and 
+            property_value_right is None):
+            continue
+        # Force right property as an empty string (this will effectively force a change when transionning from `None` to ``. )
+        if (property_value_right is None):
+            property_value_right = ""
+
+        if (property_value_left != property_value_right):
+            # Property has changed
+            properties_diff[property_name] = property_value_right
+
+    return properties_diff
+
+
+def compute_json_differences_from_journal(json_copy: mkvmergeutils.MediaInfoOverlay):
+    # Same as compute_json_differences(json_copy.base, json_copy).
+    # Only the properties found in the change journal of the copy are compared.
+    json_left = json_copy.base
+    json_diff = dict()
+
+    diff_found = False
+
+    tracks_left = json_left['tracks'] if 'tracks' in json_left else None
+    if (tracks_left is None):
+        return None
+
+    # Check integrity
+    for track_left in tracks_left:
+        if (not is_track_comparable(track_left)):
+            return None
+
+    # Compare title
+    if ('title' in json_copy.container_changes):
+        title_left = mkvmergeutils.get_container_properties_title(json_left)
+        title_right = json_copy.container_changes['title']
+        if (not title_left is None and
+            not title_right is None and
+            title_left != title_right):
+
+            # Title has changed
+            json_diff['container'] = dict()
+            json_diff['container']['properties'] = dict()
+            json_diff['container']['properties']['title'] = title_right
+            diff_found = True
+
+    # Compare the modified properties of the modified tracks
+    tracks_diff = dict()
+    property_names = mkvmergeutils.get_track_supported_property_names()
+    for track_index in sorted(json_copy.track_changes):
+        changes = json_copy.track_changes[track_index]
+        changed_property_names = [property_name for property_name in property_names if property_name in changes]
+        properties_diff = get_track_properties_differences(tracks_left[track_index]['properties'], changes, changed_property_names)
+        if (len(properties_diff) > 0):
+            tracks_diff[track_index] = properties_diff
+            diff_found = True
+
+    # Allow returning an empty dict() if no differences was found
+    if (diff_found == False):
+        return dict()
+
+    # Always add a track to the list, to be able to match the original tracks by index
+    json_diff['tracks'] = list()
+    for track_index in range(len(tracks_left)):
+        json_diff['tracks'].append(dict())
+        if (track_index in tracks_diff):
+            json_diff['tracks'][track_index]['properties'] = tracks_diff[track_index]
+
+    return json_diff
+
+
 def compute_json_differences(json_left: dict, json_right: dict):
+    json_left = mediainfoutils.get_media_info_dict(json_left)
+    json_right = mediainfoutils.get_media_info_dict(json_right)
+
+    # The differences of a copy-on-write copy are read from its change journal
+    if (isinstance(json_right, mkvmergeutils.MediaInfoOverlay) and json_right.base is json_left):
+        return compute_json_differences_from_journal(json_right)
+
     json_diff = dict()
 
     diff_found = False
@@ -376,17 +617,17 @@ def compute_json_differences(json_left: dict, json_right: dict):
         # Remember the index to be able to match the original tracks by index
         track_index = len(json_diff['tracks']) - 1
 
-        # If no change in these tracks is found, skip those
-        if (track_left == tracks_right):
-            # Next tracks
-            continue
-
         properties_left = track_left['properties'] if 'properties' in track_left else None
         properties_right = track_right['properties'] if 'properties' in track_right else None
         if (properties_left is None or
             properties_right is None):
             return None
 
+        # Tracks of a copy-on-write copy share the properties of the tracks that were not modified
+        if (properties_left is properties_right):
+            # Next tracks
+            continue
+
         # If no property has changed
         if (properties_left == properties_right):
             # Next tracks
@@ -394,40 +635,11 @@ def compute_json_differences(json_left: dict, json_right: dict):
 
         # Compare properties one by one
         property_names = mkvmergeutils.get_track_supported_property_names()
-        for property_name in property_names:
-            # Get value
-            property_value_left = properties_left[property_name] if property_name in properties_left else None
-            property_value_right = properties_right[property_name] if property_name in properties_right else None
-
-            # Handle special case for track_name set to '' or None
-            if (property_name == "track_name" and 
-                (property_value_left is None or property_value_left == '') and
-                (property_value_right is None or property_value_right == '')):
-                # consider these properties as equals
-                # This check is required for properly detecting special case:
-                # 'No modification required in input file metadata.'
-                continue
-
-            # Check if property is not set on both sides (left and right)
-            if (property_value_left is None and 
-                property_value_right is None):
-                continue
-            # Force right property as an empty string (this will effectively force a change when transionning from `None` to ``. )
-            if (property_value_right is None):
-                property_value_right = ""
-
-            if (property_value_left != property_value_right):
-                # Property has changed
-
-                # Check for existing 'properties' container in the track
-                if (not 'properties' in json_diff['tracks'][track_index]):
-                    json_diff['tracks'][track_index]['properties'] = dict()
-
-                # Set the property value as a diff
-                json_diff['tracks'][track_index]['properties'][property_name] = property_value_right
-                diff_found = True
-                
-        # end for each property_name
+        properties_diff = get_track_properties_differences(properties_left, properties_right, property_names)
+        if (len(properties_diff) > 0):
+            # Set the property values as a diff
+            json_diff['tracks'][track_index]['properties'] = properties_diff
+            diff_found = True
 
         # Check to see if new track was added
 
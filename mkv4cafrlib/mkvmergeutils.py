@@ -1,33 +1,258 @@
 import subprocess
 import json
+import functools
+import re
+from mkv4cafrlib import cacheutils
+from mkv4cafrlib import ebmlutils
 
 # Constants
 INVALID_TRACK_ID = -1
 INVALID_TRACK_INDEX = -1
+PROBE_BACKEND_MKVMERGE = "mkvmerge"
+PROBE_BACKEND_NATIVE = "native"
+PROBE_BACKENDS = [PROBE_BACKEND_MKVMERGE, PROBE_BACKEND_NATIVE]
+TRACK_NAME_FLAGS_CACHE_SIZE = 4096
+MEDIA_JSON_READ_SIZE = 64 * 1024
+
+# Flags are words delimited by one of the characters ` .,-()[]`.
+# An opening parenthesis or bracket can only precede a flag and a closing one can only follow a flag.
+FLAG_TOKEN_REGEX = re.compile(r"[^\0 .,\-()\[\]]+")
+FLAG_INVALID_PREVIOUS_CHARACTERS = ")]"
+FLAG_INVALID_NEXT_CHARACTERS = "(["
+
+# Words of a track name, and the flag each one sets
+TRACK_NAME_FLAGS_TABLE = {
+    "VFF": "VFF",
+    "VOF": "VFF",
+    "FRANCE": "VFF",
+    "TRUEFRENCH": "VFF",
+    "VFQ": "VFQ",
+    "CA": "VFQ",
+    "CANADA": "VFQ",
+    "CANADIAN": "VFQ",
+    "CANADIEN": "VFQ",
+    "VFI": "VFI",
+    "VO": "VO",
+    "AD": "AD",
+    "DVD": "DVD",
+    "SDH": "SDH",
+}
+
+# Words of a file name, and the flag each one sets, by order of priority
+FILE_NAME_FLAGS_TABLE = {
+    "VF2": "VF2",
+    "VFF": "VFF",
+    "VOF": "VFF",
+    "TRUEFRENCH": "VFF",
+    "VFQ": "VFQ",
+    "VFI": "VFI",
+    "VO": "VO",
+}
+FILE_NAME_FLAGS_PRIORITY = ["VF2", "VFF", "VFQ", "VFI", "VO"]
+
+# Sections of `mkvmerge -J` that are not used by the rules.
+# They are kept as raw json and only decoded when they are written. See split_media_json().
+MEDIA_JSON_RAW_KEYS = ["attachments", "chapters", "global_tags", "track_tags"]
+MEDIA_JSON_KEY_PREFIX = b'\n  "'
+
+
+def read_media_file_json(file_path: str) -> bytearray:
+    # Returns the output of `mkvmerge -J`, read incrementally into a single buffer while mkvmerge runs.
+    # subprocess.check_output() joins the chunks of the output once mkvmerge exits, which holds the output twice.
+    # Raises the same exceptions as subprocess.check_output().
+    args = ["mkvmerge", "-J", file_path]
+    media_json_bytes = bytearray()
+    with subprocess.Popen(args, stdout=subprocess.PIPE) as process:
+        try:
+            while True:
+                chunk = process.stdout.read1(MEDIA_JSON_READ_SIZE)
+                if (not chunk):
+                    break
+                media_json_bytes += chunk
+        except BaseException as e:
+            process.kill()
+            raise e
+        return_code = process.wait()
+    if (return_code != 0):
+        raise subprocess.CalledProcessError(return_code, args, output=bytes(media_json_bytes))
+    return media_json_bytes
+
+
+def get_native_media_file_info(file_path: str) -> dict:
+    # Returns the metadata of a file read by the native backend, without executing mkvmerge.
+    # Returns None if the file must be probed with mkvmerge instead:
+    #   the file can not be read by the native backend, or
+    #   mkvmerge names some of its codecs from the content of the tracks. See ebmlutils.BITSTREAM_CODEC_IDS.
+    #   Audio track names are built from the codec names. Both backends must give the same names.
+    # The results are not cached: reading a file's metadata is about as fast as a cache lookup.
+    try:
+        json_obj = ebmlutils.read_media_file_info(file_path)
+    except (ebmlutils.EbmlError, OSError) as e:
+        print("Failed to read metadata of file '" + file_path + "': " + str(e) + ". Using mkvmerge instead.")
+        return None
+    codec_ids = ebmlutils.get_bitstream_codec_ids(json_obj)
+    if (len(codec_ids) > 0):
+        print("The codec names of file '" + file_path + "' depend on the content of its " + ", ".join(codec_ids) + " tracks. Using mkvmerge instead.")
+        return None
+    return json_obj
+
+
+def get_media_file_json_bytes(file_path: str, probe_cache = None) -> bytes:
+    # Returns the raw output of `mkvmerge -J`.
+    # If a probe cache is specified, mkvmerge is only executed for files that are not already in the cache.
+    if (probe_cache is None):
+        return read_media_file_json(file_path)
+
+    # The file may have been renamed or hard linked since it was probed. mkvmerge reports the path it was given.
+    file_identity = cacheutils.get_file_identity(file_path)
+    media_json_bytes = probe_cache.get(file_identity)
+    if (media_json_bytes is not None):
+        media_json_bytes = set_media_json_file_name(media_json_bytes, file_path)
+    if (media_json_bytes is not None):
+        return media_json_bytes
+
+    media_json_bytes = read_media_file_json(file_path)
+
+    # Do not cache the result if the file was modified while probing it
+    if (cacheutils.get_file_identity(file_path) == file_identity):
+        probe_cache.put(file_identity, file_path, media_json_bytes)
+    return media_json_bytes
+
+
+class RawJsonValue:
+    # A json value that is not decoded. The value is kept as raw json for pass-through.
+    # Use `json.dump(json_obj, file, default=mkvmergeutils.get_json_serializable_value)` to write the decoded value.
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def decode(self):
+        return json.loads(self.data)
+
+    def __eq__(self, other):
+        if (isinstance(other, RawJsonValue)):
+            return self.data == other.data
+        return self.decode() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "RawJsonValue(" + str(len(self.data)) + " bytes)"
+
 
+def get_json_serializable_value(value):
+    # Hook for the `default` argument of json.dump()
+    if (isinstance(value, RawJsonValue)):
+        return value.decode()
+    raise TypeError("Object of type " + type(value).__name__ + " is not JSON serializable")
+
+
+def split_media_json(media_json_bytes: bytes, raw_keys: list = MEDIA_JSON_RAW_KEYS) -> tuple:
+    # Returns the json text of the document, where the values of the top level keys in `raw_keys` are replaced by `null`,
+    # and a dict of the raw json of these values. See decode_media_json_text().
+    #
+    # mkvmerge indents its output with 2 spaces, and json strings can not contain a line feed.
+    # A top level key is therefore the only place where a line feed is followed by 2 spaces and a quote.
+    # The values are found with bytes.find() only, which is much faster than decoding them.
+    # Documents with another layout are returned as they are.
+    raw_values = dict()
+    if (not media_json_bytes.startswith(b'{' + MEDIA_JSON_KEY_PREFIX)):
+        return (str(media_json_bytes, "utf-8"), raw_values)
+
+    # Find the value of each raw key. It ends before the `,` of the next key, or before the end of the top level object.
+    spans = list()
+    for key in raw_keys:
+        key_prefix = MEDIA_JSON_KEY_PREFIX + key.encode("utf-8") + b'": '
+        key_pos = media_json_bytes.find(key_prefix)
+        if (key_pos == -1):
+            continue
+        value_start = key_pos + len(key_prefix)
+        next_key_pos = media_json_bytes.find(MEDIA_JSON_KEY_PREFIX, value_start)
+        value_end = next_key_pos - 1 if next_key_pos != -1 else media_json_bytes.rfind(b'\n}')
+        if (value_end > value_start):
+            spans.append((value_start, value_end, key))
+    if (len(spans) == 0):
+        return (str(media_json_bytes, "utf-8"), raw_values)
+
+    data = memoryview(media_json_bytes)
+    pieces = list()
+    piece_start = 0
+    for value_start, value_end, key in sorted(spans):
+        pieces.append(data[piece_start:value_start])
+        pieces.append(b'null')
+        raw_values[key] = RawJsonValue(bytes(data[value_start:value_end]))
+        piece_start = value_end
+    pieces.append(data[piece_start:])
+    return (str(b''.join(pieces), "utf-8"), raw_values)
+
+
+def set_media_json_file_name(media_json_bytes: bytes, file_path: str) -> bytes:
+    # Returns the output of `mkvmerge -J` with `file_name` set to the given path.
+    # Returns None if the document does not have the layout of mkvmerge output. See split_media_json().
+    key_prefix = MEDIA_JSON_KEY_PREFIX + b'file_name": '
+    if (not media_json_bytes.startswith(b'{' + MEDIA_JSON_KEY_PREFIX)):
+        return None
+    value_start = media_json_bytes.find(key_prefix)
+    if (value_start == -1):
+        return None
+    value_start += len(key_prefix)
+    value_end = media_json_bytes.find(b'\n', value_start)
+    if (value_end == -1):
+        return None
+    if (media_json_bytes[value_end-1:value_end] == b','):
+        value_end -= 1
+    return media_json_bytes[:value_start] + json.dumps(file_path, ensure_ascii=False).encode("utf-8") + media_json_bytes[value_end:]
+
+
+def decode_media_json_text(media_json_text: str, raw_values: dict) -> dict:
+    # Decodes the json text returned by split_media_json(). The raw values are set back in place of `null`.
+    json_obj = json.loads(media_json_text)
+    for key, value in raw_values.items():
+        if (key in json_obj and json_obj[key] is None):
+            json_obj[key] = value
+    return json_obj
+
+
+def decode_media_json(media_json_bytes: bytes, raw_keys: list = None) -> dict:
+    # Decodes the output of `mkvmerge -J`.
+    # The values of the top level keys in `raw_keys` are kept as RawJsonValue. See MEDIA_JSON_RAW_KEYS.
+    if (raw_keys is None or len(raw_keys) == 0):
+        return json.loads(media_json_bytes)
+    media_json_text, raw_values = split_media_json(media_json_bytes, raw_keys)
+    return decode_media_json_text(media_json_text, raw_values)
+
+
+def get_media_file_info(file_path: str, probe_cache = None, probe_backend: str = PROBE_BACKEND_MKVMERGE, raw_keys: list = None) -> dict:
+    # The native backend falls back to mkvmerge for files it can not read. See get_native_media_file_info().
+    if (probe_backend == PROBE_BACKEND_NATIVE):
+        json_obj = get_native_media_file_info(file_path)
+        if (json_obj is not None):
+            return json_obj
 
-def get_media_file_info(file_path: str) -> dict:
     media_json_bytes = None
     try:
-        media_json_bytes = subprocess.check_output(["mkvmerge", "-J", file_path])                       
+        media_json_bytes = get_media_file_json_bytes(file_path, probe_cache)
     except Exception as e:
         raise e
-    media_json_str = media_json_bytes.decode("utf-8")
 
     # Parse media json
     try:
-        json_obj = json.loads(media_json_str)
+        json_obj = decode_media_json(media_json_bytes, raw_keys)
     except Exception as e:
         return None
 
     return json_obj
 
 
-def load_media_file_info(file_path: str):
+def load_media_file_info(file_path: str, raw_keys: list = None):
     json_obj = None
     try:
         with open(file_path, 'rb') as file:
-            json_obj = json.load(file)                
+            if (raw_keys is not None):
+                json_obj = decode_media_json(file.read(), raw_keys)
+            else:
+                json_obj = json.load(file)                
     except Exception as e:
         return None
     return json_obj
@@ -52,6 +277,7 @@ def get_tracks_indice_by_type(input_tracks: list, accepted_types: list):
 
 
 def filter_tracks_indice_by_language(input_tracks: list, pre_filtered_track_indice: list, accepted_languages: list):
+    pre_filtered_track_indice = set(pre_filtered_track_indice)
     matching_track_indice = list()
     for i in range(len(input_tracks)):
         track = input_tracks[i]
@@ -81,6 +307,7 @@ def filter_tracks_indice_by_language(input_tracks: list, pre_filtered_track_indi
 
 
 def filter_tracks_indice_by_flag(input_tracks: list, pre_filtered_track_indice: list, accepted_flags: list):
+    pre_filtered_track_indice = set(pre_filtered_track_indice)
     matching_track_indice = list()
     for i in range(len(input_tracks)):
         track = input_tracks[i]
@@ -105,6 +332,194 @@ def filter_tracks_indice_by_flag(input_tracks: list, pre_filtered_track_indice:
     return matching_track_indice
 
 
+class TrackIndex:
+    # Maps the type, languages, flags and id of each track of a document to the track's index.
+    # Build it once per document instead of scanning all tracks on every lookup.
+    # The index must be updated with `update_track()` when the track name or the languages of a track are modified.
+    # `set_track_flag()` updates the index it receives.
+    #
+    # Flags are only extracted from a track's name when they are first needed.
+    # Flags that are already extracted, like the flags of a mediainfoutils.MediaInfo, can be specified
+    # in `track_flags` as a flags array for each track.
+    def __init__(self, tracks: list, track_flags: list = None):
+        self.tracks = tracks
+        self.rebuild()
+        if (track_flags is not None and len(track_flags) == len(tracks)):
+            self.track_flags = [list(flags_array) if flags_array is not None else [] for flags_array in track_flags]
+
+    def rebuild(self):
+        self.indice_by_type = dict()
+        self.indice_by_language = dict()
+        self.indice_by_flag = None
+        self.stale_flags_indice = set()
+        self.index_by_id = dict()
+        self.track_languages = list()
+        self.track_flags = list()
+        for track_index in range(len(self.tracks)):
+            track = self.tracks[track_index]
+            self.indice_by_type.setdefault(track['type'], set()).add(track_index)
+
+            # Keep the first index of each id, like get_track_index_from_id()
+            track_id = track['id'] if 'id' in track else INVALID_TRACK_ID
+            if (track_id not in self.index_by_id):
+                self.index_by_id[track_id] = track_index
+
+            languages = self.__get_track_languages(track_index)
+            for language in languages:
+                self.indice_by_language.setdefault(language, set()).add(track_index)
+            self.track_languages.append(languages)
+            self.track_flags.append(None)
+
+    def __get_track_languages(self, track_index: int) -> list:
+        track = self.tracks[track_index]
+        languages = list()
+        if ("properties" in track):
+            properties = track['properties']
+            for property_name in ['language', 'language_ietf']:
+                value = properties[property_name] if property_name in properties else ""
+                if (value != ""):
+                    languages.append(value)
+        return languages
+
+    def update_track(self, track_index: int):
+        languages = self.__get_track_languages(track_index)
+        if (languages != self.track_languages[track_index]):
+            for language in self.track_languages[track_index]:
+                self.indice_by_language[language].discard(track_index)
+            for language in languages:
+                self.indice_by_language.setdefault(language, set()).add(track_index)
+            self.track_languages[track_index] = languages
+
+        # Extract the flags again when needed.
+        # If the flags of all tracks are already indexed, only the flags of this track are indexed again.
+        # The flags of a stale track may have been extracted by get_track_flags() but they are not indexed yet.
+        previous_flags_array = self.track_flags[track_index]
+        self.track_flags[track_index] = None
+        if (self.indice_by_flag is not None and track_index not in self.stale_flags_indice):
+            for track_flag in (previous_flags_array if previous_flags_array is not None else []):
+                self.indice_by_flag[track_flag].discard(track_index)
+            self.stale_flags_indice.add(track_index)
+
+    def get_track_flags_array(self, track_index: int):
+        # Same as get_track_name_flags_array(). Tracks without flags are stored as an empty list.
+        flags_array = self.track_flags[track_index]
+        if (flags_array is None):
+            flags_array = get_track_name_flags_array(self.tracks[track_index])
+            flags_array = flags_array if flags_array is not None else []
+            self.track_flags[track_index] = flags_array
+        return flags_array if len(flags_array) > 0 else None
+
+    def get_track_flags(self, track_index: int):
+        # Same as get_track_name_flags()
+        flags_array = self.get_track_flags_array(track_index)
+        if (flags_array is None):
+            return None
+        return ','.join(flags_array)
+
+    def get_indice_by_type(self, accepted_types: list):
+        if (isinstance(accepted_types, str)):
+            accepted_types = [accepted_types]
+        matching_track_indice = set()
+        for track_type in accepted_types:
+            if (track_type in self.indice_by_type):
+                matching_track_indice.update(self.indice_by_type[track_type])
+        return sorted(matching_track_indice)
+
+    def get_indice_by_flag(self, flag: str):
+        if (self.indice_by_flag is None):
+            self.indice_by_flag = dict()
+            self.stale_flags_indice = set(range(len(self.tracks)))
+        if (len(self.stale_flags_indice) > 0):
+            for track_index in sorted(self.stale_flags_indice):
+                if ("properties" not in self.tracks[track_index]):
+                    continue
+                flags_array = self.get_track_flags_array(track_index)
+                for track_flag in (flags_array if flags_array is not None else []):
+                    self.indice_by_flag.setdefault(track_flag, set()).add(track_index)
+            self.stale_flags_indice = set()
+        return self.indice_by_flag[flag] if flag in self.indice_by_flag else set()
+
+    def filter_indice_by_language(self, pre_filtered_track_indice: list, accepted_languages: list):
+        matching_track_indice = set()
+        for language in accepted_languages:
+            if (language in self.indice_by_language):
+                matching_track_indice.update(self.indice_by_language[language])
+        matching_track_indice.intersection_update(pre_filtered_track_indice)
+        return sorted(matching_track_indice)
+
+    def filter_indice_by_flag(self, pre_filtered_track_indice: list, accepted_flags: list):
+        candidate_track_indice = set()
+        for flag in accepted_flags:
+            candidate_track_indice.update(self.get_indice_by_flag(flag))
+        candidate_track_indice.intersection_update(pre_filtered_track_indice)
+
+        # Like filter_tracks_indice_by_flag(), a track is listed once for each of its accepted flags
+        matching_track_indice = list()
+        for track_index in sorted(candidate_track_indice):
+            for flag in self.get_track_flags_array(track_index):
+                if (flag in accepted_flags):
+                    matching_track_indice.append(track_index)
+        return matching_track_indice
+
+    def get_index_from_id(self, target_id: int):
+        return self.index_by_id[target_id] if target_id in self.index_by_id else INVALID_TRACK_INDEX
+
+
+class MediaInfoOverlay(dict):
+    # Copy-on-write copy of a document. The base document is never modified.
+    # All sections of the document are shared with the base document, including `attachments`, `chapters` and tags.
+    # Only the track list, each track and the container are shallow copies.
+    # The properties of a track, or of the container, are copied when they are first modified
+    # with `set_track_property_value()` or `set_container_properties_title()`.
+    # The properties of the tracks that were not modified are the same objects as in the base document.
+    #
+    # Modifications are also recorded in a change journal, by track index and property name.
+    # Writing a property many times keeps the last value. Writing back the value of the base document removes the change.
+    def __init__(self, base: dict):
+        super().__init__(base)
+        self.base = base
+        self.modified_tracks_indice = set()
+        self.is_container_modified = False
+        self.track_changes = dict()
+        self.container_changes = dict()
+        if ('tracks' in base):
+            self['tracks'] = [dict(track) if isinstance(track, dict) else track for track in base['tracks']]
+        if ('container' in base):
+            self['container'] = dict(base['container'])
+
+    def get_writable_track_properties(self, track_index: int) -> dict:
+        track = self['tracks'][track_index]
+        if (not track_index in self.modified_tracks_indice):
+            track['properties'] = dict(track['properties'])
+            self.modified_tracks_indice.add(track_index)
+        return track['properties']
+
+    def get_writable_container_properties(self) -> dict:
+        container = self['container']
+        if (not self.is_container_modified):
+            container['properties'] = dict(container['properties'])
+            self.is_container_modified = True
+        return container['properties']
+
+    def __record_change(self, changes: dict, base_properties: dict, property_name: str, property_value):
+        if (property_name in base_properties and base_properties[property_name] == property_value):
+            # The value of the base document is restored
+            changes.pop(property_name, None)
+        else:
+            changes[property_name] = property_value
+
+    def set_track_property(self, track_index: int, property_name: str, property_value):
+        self.get_writable_track_properties(track_index)[property_name] = property_value
+        changes = self.track_changes.setdefault(track_index, dict())
+        self.__record_change(changes, self.base['tracks'][track_index]['properties'], property_name, property_value)
+        if (len(changes) == 0):
+            del self.track_changes[track_index]
+
+    def set_container_property(self, property_name: str, property_value):
+        self.get_writable_container_properties()[property_name] = property_value
+        self.__record_change(self.container_changes, self.base['container']['properties'], property_name, property_value)
+
+
 def get_language_friendly_name(name_tmp: str):
     name = name_tmp.upper()
     if name == "ENG":
@@ -183,28 +598,24 @@ def get_first_video_track_codec_friendly_name(tracks: list):
     return None
 
 
-def test_flag_in_string(value: str, flag: str):
+def get_flag_tokens(value: str) -> set:
+    # Returns the upper case words of a string that are delimited as flags, in a single pass.
     value_upper = value.upper()
-    flag = flag.upper()
-
-    # define previous accepted characters
-    valid_previous_characters = ['\0', ' ', '.', ',', '-', '(', '[']
-    valid_next_characters     = ['\0', ' ', '.', ',', '-', ')', ']']
-
-    search_pos = 0
-    find_pos = value_upper.find(flag, search_pos)
-    while(find_pos != -1):
-        prev_char = value_upper[find_pos - 1] if find_pos > 0 else '\0'
-        next_char = value_upper[find_pos + len(flag)] if (find_pos + len(flag)) < len(value_upper) else '\0'
-
-        if (prev_char in valid_previous_characters and next_char in valid_next_characters):
-            return True
+    tokens = set()
+    for match in FLAG_TOKEN_REGEX.finditer(value_upper):
+        start = match.start()
+        end = match.end()
+        if (start > 0 and value_upper[start - 1] in FLAG_INVALID_PREVIOUS_CHARACTERS):
+            continue
+        if (end < len(value_upper) and value_upper[end] in FLAG_INVALID_NEXT_CHARACTERS):
+            continue
+        tokens.add(match.group())
+    return tokens
 
-        # search next
-        search_pos += 1
-        find_pos = value_upper.find(flag, search_pos)
 
-    return False
+def test_flag_in_string(value: str, flag: str):
+    # A flag can not contain delimiter characters
+    return flag.upper() in get_flag_tokens(value)
 
 
 def get_track_name_flags(track: dict):
@@ -220,25 +631,45 @@ def get_track_name_flags_array(track: dict):
         return None
     properties = track['properties']
     
-    track_name = str(properties['track_name']).upper() if 'track_name' in properties else ""
+    track_name = str(properties['track_name']) if 'track_name' in properties else ""
     track_language_ietf = properties['language_ietf'] if 'language_ietf' in properties else ""
 
-    has_vff = ( test_flag_in_string(track_name, "VFF") or
-                test_flag_in_string(track_name, "VOF") or
-                (track_language_ietf == "fr-FR") or
-                test_flag_in_string(track_name, "FRANCE") or
-                test_flag_in_string(track_name, "TRUEFRENCH") )
-    has_vfq = ( test_flag_in_string(track_name, "VFQ") or
-                (track_language_ietf == "fr-CA") or
-                test_flag_in_string(track_name, "CA") or
-                test_flag_in_string(track_name, "CANADA") or
-                test_flag_in_string(track_name, "CANADIAN") or
-                test_flag_in_string(track_name, "CANADIEN") )
-    has_vfi = test_flag_in_string(track_name, "VFI")
-    has_vo  = test_flag_in_string(track_name, "VO")
-    has_ad  = test_flag_in_string(track_name, "AD")
-    has_dvd = test_flag_in_string(track_name, "DVD")
-    has_sdh = test_flag_in_string(track_name, "SDH")
+    # The flags only depend on the track name and language_ietf.
+    # Modifying either property gives a new cache key.
+    flags = get_flags_array_for_track_name(track_name, track_language_ietf)
+    if (flags is None):
+        return None
+    return list(flags)
+
+
+def get_track_name_flags_cache_info() -> dict:
+    cache_info = get_flags_array_for_track_name.cache_info()
+    info = dict()
+    info['hits'] = cache_info.hits
+    info['misses'] = cache_info.misses
+    info['size'] = cache_info.currsize
+    info['max_size'] = cache_info.maxsize
+    return info
+
+
+def clear_track_name_flags_cache():
+    get_flags_array_for_track_name.cache_clear()
+
+
+@functools.lru_cache(maxsize=TRACK_NAME_FLAGS_CACHE_SIZE)
+def get_flags_array_for_track_name(track_name: str, track_language_ietf: str):
+    # Returns a tuple. The cached value must not be modified by callers.
+    name_flags = set(TRACK_NAME_FLAGS_TABLE[token] for token in get_flag_tokens(track_name) if token in TRACK_NAME_FLAGS_TABLE)
+
+    has_vff = ( "VFF" in name_flags or
+                (track_language_ietf == "fr-FR") )
+    has_vfq = ( "VFQ" in name_flags or
+                (track_language_ietf == "fr-CA") )
+    has_vfi = "VFI" in name_flags
+    has_vo  = "VO" in name_flags
+    has_ad  = "AD" in name_flags
+    has_dvd = "DVD" in name_flags
+    has_sdh = "SDH" in name_flags
 
     # Make corrections if necessary
     if ( has_ad and has_vo):
@@ -264,20 +695,14 @@ def get_track_name_flags_array(track: dict):
     if (len(flags) == 0):
         return None
     
-    return flags
+    return tuple(flags)
 
 
 def get_track_name_flags_from_filename(file_path: str):
-    if (test_flag_in_string(file_path, "VF2")):
-        return "VF2"
-    if (test_flag_in_string(file_path, "VFF") or test_flag_in_string(file_path, "VOF") or test_flag_in_string(file_path, "TrueFrench")):
-        return "VFF"
-    if (test_flag_in_string(file_path, "VFQ")):
-        return "VFQ"
-    if (test_flag_in_string(file_path, "VFI")):
-        return "VFI"
-    if (test_flag_in_string(file_path, "VO")):
-        return "VO"
+    name_flags = set(FILE_NAME_FLAGS_TABLE[token] for token in get_flag_tokens(file_path) if token in FILE_NAME_FLAGS_TABLE)
+    for flag in FILE_NAME_FLAGS_PRIORITY:
+        if (flag in name_flags):
+            return flag
     return None
 
 
@@ -311,10 +736,10 @@ def get_track_auto_generated_name(track: dict):
     return new_name
 
 
-def get_first_default_track_id_for_type(tracks: list, type: str):
+def get_first_default_track_id_for_type(tracks: list, type: str, lookup: TrackIndex = None):
     # Filter for tracks of the given type
     try:
-        matching_tracks_indice = get_tracks_indice_by_type(tracks, type)
+        matching_tracks_indice = lookup.get_indice_by_type(type) if lookup is not None else get_tracks_indice_by_type(tracks, type)
     except Exception as e: pass
 
     # Find the best
@@ -343,7 +768,7 @@ def get_first_default_track_id_for_indice(tracks: list, tracks_indice: list):
     return INVALID_TRACK_ID
 
 
-def get_best_track_id_from_indice(tracks: list, tracks_indice: list):
+def get_best_track_id_from_indice(tracks: list, tracks_indice: list, lookup: TrackIndex = None):
     # Search for a VFQ track
     for track_index in tracks_indice:
         # Get track, properties and id
@@ -354,7 +779,7 @@ def get_best_track_id_from_indice(tracks: list, tracks_indice: list):
         track_id = track['id'] if 'id' in track else INVALID_TRACK_ID
 
         # Check for flag
-        flags = get_track_name_flags(track)
+        flags = lookup.get_track_flags(track_index) if lookup is not None else get_track_name_flags(track)
         if not flags is None and flags.find("VFQ") != -1:
             return track_id
         
@@ -368,7 +793,7 @@ def get_best_track_id_from_indice(tracks: list, tracks_indice: list):
         track_id = track['id'] if 'id' in track else INVALID_TRACK_ID
 
         # Check for flag
-        flags = get_track_name_flags(track)
+        flags = lookup.get_track_flags(track_index) if lookup is not None else get_track_name_flags(track)
         if not flags is None and flags.find("VFF") != -1:
             return track_id
     
@@ -393,21 +818,21 @@ def get_best_track_id_from_indice(tracks: list, tracks_indice: list):
     return existing_default_track_id
 
 
-def get_best_track_id_for_type(tracks: list, type: str):
+def get_best_track_id_for_type(tracks: list, type: str, lookup: TrackIndex = None):
     # Filter for tracks of the given type
     try:
-        matching_tracks_indice = get_tracks_indice_by_type(tracks, type)
+        matching_tracks_indice = lookup.get_indice_by_type(type) if lookup is not None else get_tracks_indice_by_type(tracks, type)
     except Exception as e: pass
 
     # Find the best
-    track_id = get_best_track_id_from_indice(tracks, matching_tracks_indice)
+    track_id = get_best_track_id_from_indice(tracks, matching_tracks_indice, lookup)
     return track_id
 
 
-def get_best_forced_track_id_for_type(tracks: list, type: str):
+def get_best_forced_track_id_for_type(tracks: list, type: str, lookup: TrackIndex = None):
     # Filter for tracks of the given type
     try:
-        matching_tracks_indice = get_tracks_indice_by_type(tracks, type)
+        matching_tracks_indice = lookup.get_indice_by_type(type) if lookup is not None else get_tracks_indice_by_type(tracks, type)
     except Exception as e: pass
     
     forced_track_indice = list()
@@ -426,7 +851,7 @@ def get_best_forced_track_id_for_type(tracks: list, type: str):
             forced_track_indice.append(track_index)
 
     # Find the best of the "forced list"
-    track_id = get_best_track_id_from_indice(tracks, forced_track_indice)
+    track_id = get_best_track_id_from_indice(tracks, forced_track_indice, lookup)
     return track_id
 
 
@@ -486,6 +911,22 @@ def get_container_properties_title(json_obj: dict):
     return title
 
 
+def set_container_properties_title(json_obj: dict, title: str):
+    if not "container" in json_obj:
+        return False
+    container = json_obj['container']
+    
+    if not "properties" in container:
+        return False
+
+    # Set value
+    if (isinstance(json_obj, MediaInfoOverlay)):
+        json_obj.set_container_property('title', title)
+        return True
+    container['properties']['title'] = title
+    return True
+
+
 def get_container_property(json_obj: dict, property_name: str):
     if not "container" in json_obj:
         return None
@@ -554,11 +995,14 @@ def set_track_property_value(json_obj: dict, track_index: int, property_name: st
     properties = track['properties']
 
     # Set value
-    json_obj['tracks'][track_index]['properties'][property_name] = property_value
+    if (isinstance(json_obj, MediaInfoOverlay)):
+        json_obj.set_track_property(track_index, property_name, property_value)
+        return True
+    properties[property_name] = property_value
     return True
 
 
-def set_track_flag(json_obj: dict, track_index: int, flag_value: str):
+def set_track_flag(json_obj: dict, track_index: int, flag_value: str, lookup: TrackIndex = None):
     if not "tracks" in json_obj:
         return False
     tracks = json_obj['tracks']
@@ -574,7 +1018,7 @@ def set_track_flag(json_obj: dict, track_index: int, flag_value: str):
     properties = track['properties']
         
     # Force flag in track_name, if not present
-    existing_flags = get_track_name_flags(track)
+    existing_flags = lookup.get_track_flags(track_index) if lookup is not None else get_track_name_flags(track)
     if existing_flags == None or existing_flags.find(flag_value) == -1:
         # This flag is not already set in the track name
         # It might already be set through language properties, but the flag value is missing in the track name
@@ -617,6 +1061,8 @@ def set_track_flag(json_obj: dict, track_index: int, flag_value: str):
             print("Unknown track flag '" + flag_value + "' used in function 'set_track_flag()'.")
             pass
 
+    if (lookup is not None):
+        lookup.update_track(track_index)
     return True
 
 
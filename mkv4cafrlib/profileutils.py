@@ -0,0 +1,88 @@
+import os
+import re
+import io
+import pstats
+import cProfile
+
+# Constants
+DEFAULT_TOP_COUNT = 25
+BATCH_STATS_FILE_NAME = "batch.pstats"
+
+# Functions that wait for child processes (mkvmerge, mkvpropedit).
+# External commands are executed through subprocess.run(), directly or by check_output(),
+# except `mkvmerge -J` whose output is read while it runs. See mkvmergeutils.read_media_file_json().
+SUBPROCESS_WAIT_FUNCTIONS = [("subprocess.py", "run"), ("mkvmergeutils.py", "read_media_file_json")]
+
+
+def get_stats_file_name(index: int, file_path: str) -> str:
+    base_name = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.basename(file_path))
+    return "{0:05d}-{1}.pstats".format(index + 1, base_name)
+
+
+def get_subprocess_wait_time(stats: pstats.Stats) -> float:
+    # Time spent waiting for child processes. See SUBPROCESS_WAIT_FUNCTIONS.
+    wait_time = 0.0
+    for (file_name, line, function_name), (primitive_calls, total_calls, total_time, cumulative_time, callers) in stats.stats.items():
+        if ((os.path.basename(file_name), function_name) in SUBPROCESS_WAIT_FUNCTIONS):
+            wait_time += cumulative_time
+    return wait_time
+
+
+class RunProfiler:
+    # Profiles the processing of each file separately and writes one .pstats file per file.
+    # Only the thread that calls `profile()` is profiled. Files must be processed sequentially.
+    def __init__(self, dir_path: str, top_count: int = DEFAULT_TOP_COUNT):
+        self.dir_path = dir_path
+        self.top_count = top_count
+        self.stats_files = list()
+        os.makedirs(dir_path, exist_ok=True)
+
+    def profile(self, file_path: str, func, *args):
+        # Files are numbered in the order they are profiled, across all batches.
+        # In watch mode, a file processed again gets a new statistics file.
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            stats_file_path = os.path.join(self.dir_path, get_stats_file_name(len(self.stats_files), file_path))
+            profile.dump_stats(stats_file_path)
+            self.stats_files.append(stats_file_path)
+
+    def get_batch_stats(self):
+        if (len(self.stats_files) == 0):
+            return None
+        stats = pstats.Stats(self.stats_files[0], stream=io.StringIO())
+        for stats_file_path in self.stats_files[1:]:
+            stats.add(stats_file_path)
+        return stats
+
+    def print_summary(self):
+        # Writes the aggregated statistics of all files and prints the functions with the highest cumulative time
+        stats = self.get_batch_stats()
+        if (stats is None):
+            return
+        batch_stats_path = os.path.join(self.dir_path, BATCH_STATS_FILE_NAME)
+        stats.dump_stats(batch_stats_path)
+
+        wait_time = get_subprocess_wait_time(stats)
+        print("Profiled " + str(len(self.stats_files)) + " files. Statistics written to directory '" + self.dir_path + "'.")
+        print("  total time: {0:.3f}s".format(stats.total_tt))
+        print("  waiting for subprocesses: {0:.3f}s".format(wait_time))
+        print("  python: {0:.3f}s".format(max(0.0, stats.total_tt - wait_time)))
+
+        # Do not list the name of every statistics file
+        stats.files = []
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_count)
+        print(stream.getvalue())
+
+
+def open_profiler(dir_path: str, top_count: int = DEFAULT_TOP_COUNT):
+    try:
+        return RunProfiler(dir_path, top_count)
+    except Exception as e:
+        print("Failed to create profile directory '" + dir_path + "': " + str(e))
+        return None
@@ -0,0 +1,145 @@
+import time
+import shutil
+import threading
+from mkv4cafrlib import fileutils
+from mkv4cafrlib import jobsutils
+
+# Constants
+DEFAULT_MAX_REFRESH_RATE = 4.0 # redraws per second
+DEFAULT_TEXT_INTERVAL_SECONDS = 10.0
+
+
+def get_size_str(size: int) -> str:
+    for unit in ["bytes", "KB", "MB", "GB"]:
+        if (size < 1024):
+            return "{0} {1}".format(size, unit) if unit == "bytes" else "{0:.1f} {1}".format(size, unit)
+        size /= 1024
+    return "{0:.1f} TB".format(size)
+
+
+class ProgressTracker:
+    # Tracks the progress of all the files being copied, weighted by their size.
+    # On a terminal, a single status line is redrawn at most `max_refresh_rate` times per second.
+    # Otherwise, a plain text line is printed every `text_interval` seconds.
+    # All methods are thread safe.
+    def __init__(self, stream = None, max_refresh_rate: float = DEFAULT_MAX_REFRESH_RATE, text_interval: float = DEFAULT_TEXT_INTERVAL_SECONDS, clock = time.monotonic):
+        self.stream = stream
+        self.min_refresh_interval = 1.0 / max_refresh_rate
+        self.text_interval = text_interval
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.tasks = dict()
+        self.next_task_id = 0
+        self.last_render_time = None
+        self.last_text_time = None
+        self.line_length = 0
+
+    def get_stream(self):
+        # The console stream is resolved on every write. It changes while jobs are running.
+        if (self.stream is not None):
+            return self.stream
+        return jobsutils.get_console_stream()
+
+    def is_terminal(self) -> bool:
+        try:
+            return self.get_stream().isatty()
+        except Exception as e:
+            return False
+
+    def set_max_refresh_rate(self, max_refresh_rate: float):
+        with self.lock:
+            self.min_refresh_interval = 1.0 / max_refresh_rate
+
+    def begin_task(self, name: str, total: int) -> int:
+        with self.lock:
+            task_id = self.next_task_id
+            self.next_task_id += 1
+            self.tasks[task_id] = [name, 0, total]
+            if (self.last_text_time is None):
+                self.last_text_time = self.clock()
+            self.__render(False)
+            return task_id
+
+    def update_task(self, task_id: int, done: int):
+        with self.lock:
+            if (not task_id in self.tasks):
+                return
+            self.tasks[task_id][1] = done
+            self.__render(False)
+
+    def end_task(self, task_id: int):
+        with self.lock:
+            self.tasks.pop(task_id, None)
+            if (len(self.tasks) == 0):
+                self.__erase()
+                self.last_text_time = None
+            else:
+                self.__render(False)
+
+    def get_totals(self):
+        # Returns the number of bytes done, the total number of bytes and the number of tasks in flight
+        with self.lock:
+            done = sum(task[1] for task in self.tasks.values())
+            total = sum(task[2] for task in self.tasks.values())
+            return (done, total, len(self.tasks))
+
+    def write_output(self, text: str):
+        # Writes text without mixing it with the status line
+        with self.lock:
+            self.__erase()
+            stream = self.get_stream()
+            stream.write(text)
+            stream.flush()
+            if (len(self.tasks) > 0):
+                self.__render(True)
+
+    def get_status_str(self, max_length: int) -> str:
+        done, total, count = self.get_totals()
+        percent = int(done / total * 100.0) if total > 0 else 100
+        details = " " + format(percent, "3d") + "% " + get_size_str(done) + " of " + get_size_str(total)
+        if (count > 1):
+            details += " (" + str(count) + " files)"
+        if (max_length is None):
+            return "Copying:" + details
+        bar_length = max(10, max_length - len(details) - len("- [] "))
+        bar = fileutils.get_progress_bar_string(done, total, bar_length) if total > 0 else '>'*bar_length
+        return fileutils.get_spinning_cursor() + " [" + bar + "]" + details + " "
+
+    def __erase(self):
+        if (self.line_length > 0):
+            stream = self.get_stream()
+            stream.write("\r" + ' '*self.line_length + "\r")
+            stream.flush()
+            self.line_length = 0
+
+    def __render(self, force: bool):
+        if (len(self.tasks) == 0):
+            return
+        now = self.clock()
+        if (self.is_terminal()):
+            if (not force and self.last_render_time is not None and now - self.last_render_time < self.min_refresh_interval):
+                return
+            self.last_render_time = now
+            # The terminal size is only queried when actually redrawing. See fileutils.print_progress_bar()
+            max_length = shutil.get_terminal_size().columns - 1
+            line = self.get_status_str(max_length)
+            stream = self.get_stream()
+            padding = ' '*max(0, self.line_length - len(line))
+            stream.write("\r" + line + padding)
+            stream.flush()
+            self.line_length = len(line)
+        else:
+            if (now - self.last_text_time < self.text_interval):
+                return
+            self.last_text_time = now
+            stream = self.get_stream()
+            stream.write(self.get_status_str(None) + "\n")
+            stream.flush()
+
+
+# The progress of all copies is displayed by a single tracker
+progress_tracker = ProgressTracker()
+
+
+def get_progress_tracker() -> ProgressTracker:
+    return progress_tracker
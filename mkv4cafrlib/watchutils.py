@@ -0,0 +1,217 @@
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+from mkv4cafrlib import findutils
+
+# Constants
+DEFAULT_SETTLE_TIME_SECONDS = 5.0
+DEFAULT_POLLING_INTERVAL_SECONDS = 10.0
+
+# inotify events. See `man 7 inotify`.
+IN_MODIFY      = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ISDIR       = 0x40000000
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_matching_file_name(name: str, extension: str, ignore_case: bool) -> bool:
+    # Same rules as findutils.find_files_by_extension()
+    if (name.startswith('.')):
+        return False
+    if (ignore_case):
+        return name.lower().endswith(extension.lower())
+    return name.endswith(extension)
+
+
+class PollingWatcher:
+    # Detects new or modified files by scanning the directory at regular interval.
+    def __init__(self, dir_path: str, extension: str, recursive: bool, ignore_case: bool, interval: float = DEFAULT_POLLING_INTERVAL_SECONDS):
+        self.dir_path = dir_path
+        self.extension = extension
+        self.recursive = recursive
+        self.ignore_case = ignore_case
+        self.interval = interval
+        self.next_scan_time = 0.0
+        self.snapshot = self.__scan()
+
+    def __scan(self) -> dict:
+        snapshot = dict()
+        for file_path in findutils.find_files_by_extension(self.dir_path, self.extension, self.recursive, self.ignore_case):
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                continue
+            snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def get_changed_paths(self, timeout: float) -> list:
+        # Wait until the next scan, without waiting more than `timeout` seconds
+        now = time.monotonic()
+        if (now < self.next_scan_time):
+            time.sleep(min(timeout, self.next_scan_time - now))
+            if (time.monotonic() < self.next_scan_time):
+                return list()
+        self.next_scan_time = time.monotonic() + self.interval
+
+        snapshot = self.__scan()
+        changed_paths = list()
+        for file_path, file_state in snapshot.items():
+            if (not file_path in self.snapshot or self.snapshot[file_path] != file_state):
+                changed_paths.append(file_path)
+        self.snapshot = snapshot
+        return changed_paths
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # Detects new or modified files with Linux's inotify api. Only the files that changed are reported.
+    def __init__(self, dir_path: str, extension: str, recursive: bool, ignore_case: bool):
+        self.dir_path = dir_path
+        self.extension = extension
+        self.recursive = recursive
+        self.ignore_case = ignore_case
+        self.watched_dirs = dict()
+
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if (self.fd < 0):
+            errno = ctypes.get_errno()
+            raise OSError(errno, "inotify_init1() failed: " + os.strerror(errno))
+        try:
+            self.__add_watch_tree(dir_path)
+        except Exception as e:
+            os.close(self.fd)
+            raise e
+
+    def __add_watch(self, dir_path: str):
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), mask)
+        if (wd < 0):
+            errno = ctypes.get_errno()
+            raise OSError(errno, "inotify_add_watch() failed for directory '" + dir_path + "': " + os.strerror(errno))
+        self.watched_dirs[wd] = dir_path
+
+    def __add_watch_tree(self, dir_path: str):
+        self.__add_watch(dir_path)
+        if (not self.recursive):
+            return
+        pending_dirs = [dir_path]
+        while (len(pending_dirs) > 0):
+            current_dir = pending_dirs.pop()
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        if (not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False)):
+                            self.__add_watch(entry.path)
+                            pending_dirs.append(entry.path)
+            except PermissionError as e:
+                continue
+
+    def __get_files_in_tree(self, dir_path: str) -> list:
+        # Files of a directory that was created or moved into a watched directory did not generate any event on their own.
+        return list(findutils.find_files_by_extension(dir_path, self.extension, self.recursive, self.ignore_case))
+
+    def get_changed_paths(self, timeout: float) -> list:
+        readable, writable, exceptional = select.select([self.fd], [], [], timeout)
+        if (len(readable) == 0):
+            return list()
+
+        changed_paths = list()
+        try:
+            data = os.read(self.fd, 64*1024)
+        except BlockingIOError as e:
+            return changed_paths
+
+        offset = 0
+        while (offset + INOTIFY_EVENT_HEADER.size <= len(data)):
+            wd, mask, cookie, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset+name_length].rstrip(b'\0'))
+            offset += name_length
+
+            if (mask & IN_Q_OVERFLOW):
+                # Some events were lost. Report all files, the caller ignores the ones that did not change.
+                changed_paths.extend(self.__get_files_in_tree(self.dir_path))
+                continue
+            if (mask & IN_IGNORED):
+                self.watched_dirs.pop(wd, None)
+                continue
+            if (not wd in self.watched_dirs or name == ""):
+                continue
+            path = os.path.join(self.watched_dirs[wd], name)
+
+            if (mask & IN_ISDIR):
+                if (self.recursive and (mask & (IN_CREATE | IN_MOVED_TO)) and not name.startswith('.')):
+                    try:
+                        self.__add_watch_tree(path)
+                        changed_paths.extend(self.__get_files_in_tree(path))
+                    except OSError as e:
+                        print("Failed to watch directory '" + path + "': " + str(e))
+                continue
+
+            if (is_matching_file_name(name, self.extension, self.ignore_case) and not path in changed_paths):
+                changed_paths.append(path)
+        return changed_paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(dir_path: str, extension: str, recursive: bool, ignore_case: bool, polling_interval: float = DEFAULT_POLLING_INTERVAL_SECONDS):
+    # Use inotify on Linux. Fallback to polling the directory on other platforms
+    # or if inotify is not available (ie: too many watches).
+    if (sys.platform.startswith("linux")):
+        try:
+            return InotifyWatcher(dir_path, extension, recursive, ignore_case)
+        except Exception as e:
+            print("Failed to watch directory with inotify: " + str(e) + ". Polling directory instead.")
+    return PollingWatcher(dir_path, extension, recursive, ignore_case, polling_interval)
+
+
+class StabilityTracker:
+    # Tracks files that are still being written.
+    # A file is stable when its size and modification time did not change for `settle_time` seconds.
+    def __init__(self, settle_time: float = DEFAULT_SETTLE_TIME_SECONDS):
+        self.settle_time = settle_time
+        self.candidates = dict()
+
+    def add(self, file_path: str, now: float = None):
+        if (now is None):
+            now = time.monotonic()
+        # Adding a file again restarts its settle time
+        self.candidates[file_path] = (None, now)
+
+    def get_pending_count(self) -> int:
+        return len(self.candidates)
+
+    def pop_stable_paths(self, now: float = None) -> list:
+        if (now is None):
+            now = time.monotonic()
+        stable_paths = list()
+        for file_path in list(self.candidates.keys()):
+            previous_state, last_change_time = self.candidates[file_path]
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                # File was deleted or renamed
+                del self.candidates[file_path]
+                continue
+            state = (stat.st_size, stat.st_mtime_ns)
+            if (state != previous_state):
+                self.candidates[file_path] = (state, now)
+                continue
+            if (now - last_change_time >= self.settle_time):
+                del self.candidates[file_path]
+                stable_paths.append(file_path)
+        return stable_paths
@@ -1,6 +1,7 @@
 import pytest
 import os
 import tempfile
+import json
 from mkv4cafrlib import mkvtoolnixutils
 from mkv4cafrlib import mkvmergeutils
 from mkv4cafrlib import findutils
@@ -498,3 +499,251 @@ def test_input_dir_no_modification_required_success():
     # assert
     assert result['exit_code'] == 0
     
+
+
+def test_input_dir_with_jobs_success():
+    # arrange
+
+    # create a fake temp directory
+    temp_dir = tempfile.gettempdir()
+    temp_input_dir = os.path.join(temp_dir, "mkv4cafr.test_input_dir_with_jobs_success")
+    temp_output_dir = os.path.join(temp_dir, "mkv4cafr.test_input_dir_with_jobs_success.output")
+    for dir_path in [temp_input_dir, temp_output_dir]:
+        try:
+            os.mkdir(dir_path)
+        except FileExistsError as e:
+            pass
+
+    # create multiple mkv files in directory
+    file_names = ["file1.mkv", "file2.mkv", "file3.mkv"]
+    fileutils.copy_file("medias/test01.mkv", os.path.join(temp_input_dir, file_names[0]))
+    fileutils.copy_file("medias/test02.mkv", os.path.join(temp_input_dir, file_names[1]))
+    fileutils.copy_file("medias/test03.mkv", os.path.join(temp_input_dir, file_names[2]))
+
+    args = list()
+    args.append("--input-dir")
+    args.append(temp_input_dir)
+    args.append("--output-dir")
+    args.append(temp_output_dir)
+    args.append("--jobs")
+    args.append("2")
+
+    # act
+    result = testutils.run_mkv4cafr(args)
+    if (result['exit_code'] != 0):
+        testutils.print_mkv4cafr_call_result(result)
+
+    # assert
+    assert result['exit_code'] == 0
+    assert result['stdout'].count("Processing file ") == len(file_names)
+
+    # the output of each file must not be interleaved with other files
+    lines = result['stdout'].splitlines()
+    for i in range(len(lines)):
+        if (lines[i].startswith("Processing file ")):
+            assert lines[i+1] == "Getting media information..."
+
+    for file_name in file_names:
+        # assert output file was processed
+        output_file_path = os.path.join(temp_output_dir, file_name)
+        assert os.path.isfile(output_file_path)
+        json_obj = mkvmergeutils.get_media_file_info(output_file_path)
+        assert json_obj != None
+        assert mkvmergeutils.get_container_properties_title(json_obj) == None
+
+
+def test_invalid_jobs_value():
+    # arrange
+    temp_dir = tempfile.gettempdir()
+    args = list()
+    args.append("--input-dir")
+    args.append("medias")
+    args.append("--output-dir")
+    args.append(temp_dir)
+    args.append("--jobs")
+    args.append("0")
+
+    # act
+    result = testutils.run_mkv4cafr(args)
+
+    # assert
+    assert result['exit_code'] != 0
+
+
+def test_input_dir_resume_from_journal():
+    # arrange
+
+    # create a fake temp directory
+    temp_dir = tempfile.gettempdir()
+    temp_input_dir = os.path.join(temp_dir, "mkv4cafr.test_input_dir_resume_from_journal")
+    try:
+        os.mkdir(temp_input_dir)
+    except FileExistsError as e:
+        pass
+    journal_path = os.path.join(temp_dir, "mkv4cafr.test_input_dir_resume_from_journal.jsonl")
+    if (os.path.isfile(journal_path)):
+        os.remove(journal_path)
+
+    # create mkv files in directory
+    fileutils.copy_file("medias/test01.mkv", os.path.join(temp_input_dir, "file1.mkv"))
+    fileutils.copy_file("medias/test02.mkv", os.path.join(temp_input_dir, "file2.mkv"))
+
+    args = list()
+    args.append("--input-dir")
+    args.append(temp_input_dir)
+    args.append("--edit-in-place")
+    args.append("--journal")
+    args.append(journal_path)
+
+    # run a first time
+    result = testutils.run_mkv4cafr(args)
+    assert result['exit_code'] == 0
+    assert os.path.isfile(journal_path)
+
+    # act (run again)
+    args.append("--resume")
+    result = testutils.run_mkv4cafr(args)
+
+    # assert
+    assert result['exit_code'] == 0
+    assert result['stdout'].count("Processing file ") == 0
+    assert result['stdout'].count("File was already processed.") == 2
+
+
+def test_resume_without_journal():
+    # arrange
+    args = list()
+    args.append("--input-dir")
+    args.append("medias")
+    args.append("--edit-in-place")
+    args.append("--resume")
+
+    # act
+    result = testutils.run_mkv4cafr(args)
+
+    # assert
+    assert result['exit_code'] != 0
+
+
+def test_input_dir_keep_going_on_failure():
+    # arrange
+
+    # create a fake temp directory
+    temp_dir = tempfile.gettempdir()
+    temp_input_dir = os.path.join(temp_dir, "mkv4cafr.test_input_dir_keep_going_on_failure")
+    try:
+        os.mkdir(temp_input_dir)
+    except FileExistsError as e:
+        pass
+    failures_file_path = os.path.join(temp_dir, "mkv4cafr.test_input_dir_keep_going_on_failure.txt")
+
+    # create a valid and an invalid mkv file in directory
+    valid_file_path = os.path.join(temp_input_dir, "valid.mkv")
+    invalid_file_path = os.path.join(temp_input_dir, "invalid.mkv")
+    fileutils.copy_file("medias/test01.mkv", valid_file_path)
+    with open(invalid_file_path, "w") as text_file:
+        text_file.write("this is not a mkv file")
+
+    args = list()
+    args.append("--input-dir")
+    args.append(temp_input_dir)
+    args.append("--edit-in-place")
+    args.append("--keep-going")
+    args.append("--failures-file")
+    args.append(failures_file_path)
+
+    # act
+    result = testutils.run_mkv4cafr(args)
+
+    # assert
+    assert result['exit_code'] != 0
+    assert "  edited: 1" in result['stdout'] or "  unchanged: 1" in result['stdout']
+    assert "  failed: 1" in result['stdout']
+
+    # assert the valid file was processed
+    json_obj = mkvmergeutils.get_media_file_info(valid_file_path)
+    assert json_obj != None
+    assert mkvmergeutils.get_container_properties_title(json_obj) == None
+
+    # assert failures file lists the invalid file
+    with open(failures_file_path, "r", encoding="utf-8") as text_file:
+        failed_files = text_file.read().splitlines()
+    assert failed_files == [invalid_file_path]
+
+
+def test_input_list_success():
+    # arrange
+    temp_dir = tempfile.gettempdir()
+    input_list_path = os.path.join(temp_dir, "mkv4cafr.test_input_list_success.txt")
+    with open(input_list_path, "w", encoding="utf-8") as text_file:
+        text_file.write("# files to process\n")
+        text_file.write(os.path.abspath("medias/test01.mkv") + "\n")
+        text_file.write("\n")
+        text_file.write(os.path.abspath("medias/test02.mkv") + "\n")
+
+    args = list()
+    args.append("--input-list")
+    args.append(input_list_path)
+    args.append("--output-dir")
+    args.append(temp_dir)
+
+    # act
+    result = testutils.run_mkv4cafr(args)
+    if (result['exit_code'] != 0):
+        testutils.print_mkv4cafr_call_result(result)
+
+    # assert
+    assert result['exit_code'] == 0
+    assert "Processing file 2 of 2" in result['stdout']
+    assert os.path.isfile(os.path.join(temp_dir, "test01.mkv"))
+    assert os.path.isfile(os.path.join(temp_dir, "test02.mkv"))
+
+
+def test_input_dir_plan_only():
+    # arrange
+
+    # create a fake temp directory
+    temp_dir = tempfile.gettempdir()
+    temp_input_dir = os.path.join(temp_dir, "mkv4cafr.test_input_dir_plan_only")
+    try:
+        os.mkdir(temp_input_dir)
+    except FileExistsError as e:
+        pass
+    plan_file_path = os.path.join(temp_dir, "mkv4cafr.test_input_dir_plan_only.jsonl")
+
+    # create a mkv file in directory
+    temp_file_path = os.path.join(temp_input_dir, "file.mkv")
+    fileutils.copy_file("medias/test01.mkv", temp_file_path)
+    json_obj_before = mkvmergeutils.get_media_file_info(temp_file_path)
+
+    args = list()
+    args.append("--input-dir")
+    args.append(temp_input_dir)
+    args.append("--edit-in-place")
+    args.append("--plan-only")
+    args.append(plan_file_path)
+
+    # act
+    result = testutils.run_mkv4cafr(args)
+    if (result['exit_code'] != 0):
+        testutils.print_mkv4cafr_call_result(result)
+
+    # assert
+    assert result['exit_code'] == 0
+
+    # assert the file was not modified
+    json_obj_after = mkvmergeutils.get_media_file_info(temp_file_path)
+    assert json_obj_before == json_obj_after
+    assert not os.path.isfile(temp_file_path + ".backup.json")
+
+    # assert the plan
+    with open(plan_file_path, "r", encoding="utf-8") as text_file:
+        records = [json.loads(line) for line in text_file]
+    assert len(records) == 1
+    record = records[0]
+    assert record['path'] == temp_file_path
+    assert record['status'] == "edit"
+    assert record['diff']['container']['properties']['title'] == ""
+    assert record['mkvpropedit_args'][0] == "mkvpropedit"
+    assert record['mkvpropedit_args'][1] == temp_file_path
+    assert record['copy'] == False
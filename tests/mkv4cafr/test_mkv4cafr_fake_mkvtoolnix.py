@@ -0,0 +1,286 @@
+import pytest
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+from mkv4cafrlib import mkvmergeutils
+from tests import testutils
+
+# These tests run mkv4cafr with the fake MKVToolNix tools of `tools/fake_mkvtoolnix`.
+# They do not require MKVToolNix or real media files.
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="the fake MKVToolNix tools are python scripts without the .exe extension")
+
+
+def create_fake_media_file(file_path: str, test_file_name: str):
+    # A fake media file contains the output of `mkvmerge -J` for the file
+    test_file_path = os.path.join(testutils.get_test_files_dir_path(), test_file_name)
+    with open(test_file_path, "r", encoding="utf-8") as file:
+        json_obj = json.load(file)
+    json_obj['container']['properties']['title'] = "Movie Title (2021)"
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(json_obj, file, indent=2)
+
+
+def load_fake_media_file(file_path: str) -> dict:
+    with open(file_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def get_fake_mkvtoolnix_env(log_file_path: str, variables: dict = None):
+    env = os.environ.copy()
+    env['PATH'] = testutils.get_fake_mkvtoolnix_dir_path() + os.pathsep + env['PATH']
+    env['FAKE_MKVTOOLNIX_LOG'] = log_file_path
+    if (variables is not None):
+        env.update(variables)
+    return env
+
+
+def read_log(log_file_path: str) -> list:
+    if (not os.path.isfile(log_file_path)):
+        return list()
+    with open(log_file_path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file.read().splitlines()]
+
+
+def test_fake_mkvtoolnix_input_dir_with_jobs():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_input_dir_with_jobs")
+    temp_input_dir = os.path.join(temp_dir, "input")
+    temp_output_dir = os.path.join(temp_dir, "output")
+    os.mkdir(temp_input_dir)
+    os.mkdir(temp_output_dir)
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+
+    file_names = ["file1.mkv", "file2.mkv", "file3.mkv"]
+    for file_name in file_names:
+        create_fake_media_file(os.path.join(temp_input_dir, file_name), "test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    args = list()
+    args.append("--input-dir")
+    args.append(temp_input_dir)
+    args.append("--output-dir")
+    args.append(temp_output_dir)
+    args.append("--jobs")
+    args.append("2")
+    args.append("--no-probe-cache")
+    env = get_fake_mkvtoolnix_env(log_file_path, { "FAKE_MKVTOOLNIX_LATENCY": "0.05", "FAKE_MKVTOOLNIX_JITTER": "0.05" })
+
+    # act
+    result = testutils.run_mkv4cafr_env(args, env)
+    if (result['exit_code'] != 0):
+        testutils.print_mkv4cafr_call_result(result)
+
+    # assert
+    assert result['exit_code'] == 0
+    assert result['stdout'].count("Processing file ") == len(file_names)
+
+    # assert each file was probed and edited once
+    log = read_log(log_file_path)
+    assert len([record for record in log if record['tool'] == "mkvmerge"]) == len(file_names)
+    assert len([record for record in log if record['tool'] == "mkvpropedit"]) == len(file_names)
+    for record in log:
+        assert record['exit_code'] == 0
+
+    # assert the edits were applied to the copies only
+    for file_name in file_names:
+        json_obj = load_fake_media_file(os.path.join(temp_output_dir, file_name))
+        assert mkvmergeutils.get_container_properties_title(json_obj) == None
+        json_obj = load_fake_media_file(os.path.join(temp_input_dir, file_name))
+        assert mkvmergeutils.get_container_properties_title(json_obj) == "Movie Title (2021)"
+
+
+def test_fake_mkvtoolnix_keep_going_on_injected_failure():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_keep_going_on_injected_failure")
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+
+    file_names = ["file1.mkv", "file2.mkv", "file3.mkv"]
+    for file_name in file_names:
+        create_fake_media_file(os.path.join(temp_dir, file_name), "test_get_best_track_id_from_indice_vff_has_priority_over_default_and_fr.json")
+
+    args = list()
+    args.append("--input-dir")
+    args.append(temp_dir)
+    args.append("--edit-in-place")
+    args.append("--keep-going")
+    args.append("--no-probe-cache")
+    env = get_fake_mkvtoolnix_env(log_file_path, { "FAKE_MKVTOOLNIX_FAIL_PATTERN": "file2" })
+
+    # act
+    result = testutils.run_mkv4cafr_env(args, env)
+
+    # assert
+    assert result['exit_code'] != 0
+    assert "  edited: 2" in result['stdout']
+    assert "  failed: 1" in result['stdout']
+    assert "file2.mkv': mkvmerge failed with error code 2" in result['stdout']
+
+    # assert the other files were edited
+    for file_name in ["file1.mkv", "file3.mkv"]:
+        json_obj = load_fake_media_file(os.path.join(temp_dir, file_name))
+        assert mkvmergeutils.get_container_properties_title(json_obj) == None
+
+
+def test_fake_mkvtoolnix_no_modification_required_after_edit():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_no_modification_required_after_edit")
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+    temp_file_path = os.path.join(temp_dir, "file.mkv")
+    create_fake_media_file(temp_file_path, "test_get_best_forced_track_id_for_type_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    args = list()
+    args.append("--input-file")
+    args.append(temp_file_path)
+    args.append("--edit-in-place")
+    args.append("--no-probe-cache")
+    env = get_fake_mkvtoolnix_env(log_file_path)
+
+    # run a first time
+    result = testutils.run_mkv4cafr_env(args, env)
+    assert result['exit_code'] == 0
+    assert len([record for record in read_log(log_file_path) if record['tool'] == "mkvpropedit"]) == 1
+
+    # act (run again)
+    result = testutils.run_mkv4cafr_env(args, env)
+
+    # assert
+    assert result['exit_code'] == 0
+    assert "No modification required in input file metadata." in result['stdout']
+    assert len([record for record in read_log(log_file_path) if record['tool'] == "mkvpropedit"]) == 1
+
+
+def test_fake_mkvtoolnix_backup_sidecar_only_when_editing_in_place():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_backup_sidecar_only_when_editing_in_place")
+    temp_output_dir = os.path.join(temp_dir, "output")
+    os.mkdir(temp_output_dir)
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+    temp_file_path = os.path.join(temp_dir, "file.mkv")
+    create_fake_media_file(temp_file_path, "test_get_best_track_id_from_indice_vff_has_priority_over_default_and_fr.json")
+    expected = load_fake_media_file(temp_file_path)
+    env = get_fake_mkvtoolnix_env(log_file_path)
+
+    # act (copy to an output directory)
+    result = testutils.run_mkv4cafr_env(["--input-file", temp_file_path, "--output-dir", temp_output_dir, "--no-probe-cache"], env)
+
+    # assert
+    assert result['exit_code'] == 0
+    assert not os.path.isfile(temp_file_path + ".backup.json")
+    assert not os.path.isfile(os.path.join(temp_output_dir, "file.mkv.backup.json"))
+
+    # act (edit in place)
+    result = testutils.run_mkv4cafr_env(["--input-file", temp_file_path, "--edit-in-place", "--no-probe-cache"], env)
+
+    # assert the backup is the output of mkvmerge before the edit
+    assert result['exit_code'] == 0
+    json_obj = load_fake_media_file(temp_file_path + ".backup.json")
+    assert json_obj['file_name'] == temp_file_path
+    del json_obj['file_name']
+    del expected['file_name']
+    assert json_obj == expected
+    assert mkvmergeutils.get_container_properties_title(load_fake_media_file(temp_file_path)) == None
+
+
+def test_fake_mkvtoolnix_fix_sidecar_keeps_unused_sections():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_fix_sidecar_keeps_unused_sections")
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+    temp_file_path = os.path.join(temp_dir, "file.mkv")
+    create_fake_media_file(temp_file_path, "test_get_best_track_id_from_indice_vff_has_priority_over_default_and_fr.json")
+    json_obj = load_fake_media_file(temp_file_path)
+    json_obj['attachments'] = [ { "content_type": "font/ttf", "description": "", "file_name": "arial.ttf", "id": 1, "properties": { "uid": 1234 }, "size": 367112 } ]
+    json_obj['chapters'] = [ { "num_entries": 12 } ]
+    json_obj['track_tags'] = [ { "num_entries": 7, "track_id": 0 } ]
+    with open(temp_file_path, "w", encoding="utf-8") as file:
+        json.dump(json_obj, file, indent=2)
+    env = get_fake_mkvtoolnix_env(log_file_path)
+
+    # act
+    result = testutils.run_mkv4cafr_env(["--input-file", temp_file_path, "--edit-in-place", "--no-probe-cache"], env)
+
+    # assert the sections that the rules do not use are written as they are
+    assert result['exit_code'] == 0
+    json_fix = load_fake_media_file(temp_file_path + ".fix.json")
+    assert json_fix['attachments'] == json_obj['attachments']
+    assert json_fix['chapters'] == json_obj['chapters']
+    assert json_fix['track_tags'] == json_obj['track_tags']
+    assert json_fix['container']['properties']['title'] == ""
+
+
+def test_fake_mkvtoolnix_watch_keeps_going_on_failure():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_watch_keeps_going_on_failure")
+    temp_input_dir = os.path.join(temp_dir, "input")
+    os.mkdir(temp_input_dir)
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+    env = get_fake_mkvtoolnix_env(log_file_path, { "FAKE_MKVTOOLNIX_FAIL_PATTERN": "file1" })
+    args = ["python", "-m", "mkv4cafr.mkv4cafr", "--input-dir", temp_input_dir, "--edit-in-place", "--watch", "--watch-settle", "0.5", "--no-probe-cache"]
+    process = subprocess.Popen(args, cwd=testutils.get_project_root_dir_path(), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        # wait for the watch to start
+        for line in process.stdout:
+            if (line.startswith(b"Watching directory")):
+                break
+
+        # act (without --keep-going)
+        file_names = ["file1.mkv", "file2.mkv", "file3.mkv"]
+        for file_name in file_names:
+            create_fake_media_file(os.path.join(temp_input_dir, file_name), "test_get_best_track_id_from_indice_vff_has_priority_over_default_and_fr.json")
+        deadline = time.monotonic() + 20
+        while (time.monotonic() < deadline and len([record for record in read_log(log_file_path) if record['tool'] == "mkvpropedit"]) < 2):
+            time.sleep(0.1)
+    finally:
+        process.send_signal(signal.SIGINT)
+        output = process.communicate(timeout=20)[0].decode("utf-8")
+
+    # assert the failure of the first file did not stop the processing of the others
+    assert "Watch stopped." in output
+    assert "  failed: 1" in output
+    for file_name in ["file2.mkv", "file3.mkv"]:
+        json_obj = load_fake_media_file(os.path.join(temp_input_dir, file_name))
+        assert mkvmergeutils.get_container_properties_title(json_obj) == None
+
+
+def test_fake_mkvtoolnix_recursive_output_dir_keeps_subdirectories():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_recursive_output_dir_keeps_subdirectories")
+    temp_input_dir = os.path.join(temp_dir, "input")
+    temp_output_dir = os.path.join(temp_dir, "output")
+    os.mkdir(temp_output_dir)
+    log_file_path = os.path.join(temp_dir, "argv.jsonl")
+    file_paths = [os.path.join("Show", "Season 01", "Episode 01.mkv"), os.path.join("Show", "Season 02", "Episode 01.mkv")]
+    test_file_names = ["test_get_best_track_id_from_indice_vff_has_priority_over_default_and_fr.json", "test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json"]
+    for file_path, test_file_name in zip(file_paths, test_file_names):
+        os.makedirs(os.path.dirname(os.path.join(temp_input_dir, file_path)), exist_ok=True)
+        create_fake_media_file(os.path.join(temp_input_dir, file_path), test_file_name)
+    env = get_fake_mkvtoolnix_env(log_file_path)
+
+    # act
+    result = testutils.run_mkv4cafr_env(["--input-dir", temp_input_dir, "--recursive", "--output-dir", temp_output_dir, "--jobs", "2", "--no-probe-cache"], env)
+
+    # assert each file is copied to the same subdirectory of the output directory
+    assert result['exit_code'] == 0
+    for file_path, test_file_name in zip(file_paths, test_file_names):
+        json_obj = load_fake_media_file(os.path.join(temp_output_dir, file_path))
+        assert mkvmergeutils.get_container_properties_title(json_obj) == None
+        expected = load_fake_media_file(os.path.join(testutils.get_test_files_dir_path(), test_file_name))
+        assert len(json_obj['tracks']) == len(expected['tracks'])
+        assert [track['properties']['uid'] for track in json_obj['tracks']] == [track['properties']['uid'] for track in expected['tracks']]
+
+
+def test_fake_mkvtoolnix_recursive_output_dir_in_input_dir():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_fake_mkvtoolnix_recursive_output_dir_in_input_dir")
+    temp_output_dir = os.path.join(temp_dir, "output")
+    os.mkdir(temp_output_dir)
+    env = get_fake_mkvtoolnix_env(os.path.join(temp_dir, "argv.jsonl"))
+
+    # act
+    result = testutils.run_mkv4cafr_env(["--input-dir", temp_dir, "--recursive", "--output-dir", temp_output_dir, "--no-probe-cache"], env)
+
+    # assert
+    assert result['exit_code'] != 0
+    assert "<output directory> must not be inside <input directory>" in result['stdout']
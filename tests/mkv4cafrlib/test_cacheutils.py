@@ -0,0 +1,113 @@
+import pytest
+import os
+import sqlite3
+from tests import testutils
+from mkv4cafrlib import cacheutils
+
+
+def test_get_file_identity():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_get_file_identity")
+    file_path = os.path.join(temp_dir, "file.mkv")
+    with open(file_path, "wb") as binary_file:
+        binary_file.write(b"0123456789")
+
+    # act
+    identity1 = cacheutils.get_file_identity(file_path)
+    identity2 = cacheutils.get_file_identity(file_path)
+    with open(file_path, "ab") as binary_file:
+        binary_file.write(b"0123456789")
+    identity3 = cacheutils.get_file_identity(file_path)
+
+    # assert
+    assert identity1 == identity2
+    assert identity1[2] == 10 # file size
+    assert identity1 != identity3
+
+
+def test_probe_cache_get_put():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_probe_cache_get_put")
+    cache = cacheutils.open_probe_cache(temp_dir, 1024*1024)
+    assert cache != None
+    identity1 = (1, 2, 3, 4)
+    identity2 = (1, 2, 3, 5) # same file, modified
+    data = b'{"tracks": []}'
+
+    # act
+    missing_data = cache.get(identity1)
+    cache.put(identity1, "/foo/file.mkv", data)
+    cached_data = cache.get(identity1)
+    modified_data = cache.get(identity2)
+
+    # assert
+    assert missing_data is None
+    assert cached_data == data
+    assert modified_data is None
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+    # assert cache is persistent
+    cache.close()
+    cache = cacheutils.open_probe_cache(temp_dir, 1024*1024)
+    assert cache.get(identity1) == data
+
+    # assert a new version of the same file replaces the previous entry
+    cache.put(identity2, "/foo/file.mkv", data)
+    assert cache.get(identity1) is None
+    assert cache.get(identity2) == data
+    cache.close()
+
+
+def test_probe_cache_eviction():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_probe_cache_eviction")
+    max_size = 4096
+    cache = cacheutils.open_probe_cache(temp_dir, max_size)
+    assert cache != None
+
+    # act
+    # random data does not compress
+    for i in range(10):
+        cache.put((1, i, 1000, 0), "/foo/file" + str(i) + ".mkv", os.urandom(1000))
+
+        # keep the first entry alive
+        assert cache.get((1, 0, 1000, 0)) != None
+
+    # assert
+    assert cache.get_size() <= max_size
+    assert cache.get((1, 0, 1000, 0)) != None # most recently used
+    assert cache.get((1, 1, 1000, 0)) is None # least recently used
+    assert cache.get((1, 9, 1000, 0)) != None # last inserted
+    cache.close()
+
+
+def test_probe_cache_database_errors():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_probe_cache_database_errors")
+    cache = cacheutils.open_probe_cache(temp_dir, 1024*1024)
+    assert cache != None
+    cache.connection.execute("PRAGMA busy_timeout = 10")
+    data = b'{"tracks": []}'
+    cache.put((1, 2, 3, 4), "/foo/file1.mkv", data)
+    size = cache.get_size()
+
+    # act (another run holds the write lock of the database)
+    other_connection = sqlite3.connect(os.path.join(temp_dir, cacheutils.PROBE_CACHE_FILE_NAME), isolation_level=None)
+    other_connection.execute("BEGIN EXCLUSIVE")
+    cached_data = cache.get((1, 2, 3, 4))
+    cache.put((1, 2, 3, 5), "/foo/file2.mkv", data)
+
+    # assert entries can still be read, and failed writes are ignored
+    assert cached_data == data
+    assert cache.get_size() == size
+    other_connection.execute("ROLLBACK")
+    other_connection.close()
+    assert cache.get((1, 2, 3, 5)) is None
+    cache.put((1, 2, 3, 5), "/foo/file2.mkv", data)
+    assert cache.get((1, 2, 3, 5)) == data
+
+    # assert read errors are misses
+    cache.close()
+    assert cache.get((1, 2, 3, 4)) is None
+    cache.put((1, 2, 3, 6), "/foo/file3.mkv", data)
@@ -0,0 +1,222 @@
+import pytest
+import os
+import struct
+import zlib
+import tempfile
+from mkv4cafrlib import ebmlutils
+from mkv4cafrlib import mkvmergeutils
+
+
+def encode_element(element_id: int, payload: bytes) -> bytes:
+    # Sizes are stored on 8 bytes so that the offset of elements does not depend on their content
+    return ebmlutils.encode_element(element_id, payload, 8)
+
+
+def encode_uint(element_id: int, value: int, length: int = 8) -> bytes:
+    return encode_element(element_id, value.to_bytes(length, "big"))
+
+
+def encode_string(element_id: int, value: str) -> bytes:
+    return encode_element(element_id, value.encode("utf-8"))
+
+
+def create_test_file(file_path: str, void_size: int = 0, crc: bool = False, audio_codec_id: str = "A_AC3"):
+    ebml_header = encode_element(ebmlutils.EBML_ID, encode_string(ebmlutils.EBML_DOCTYPE_ID, "matroska"))
+    info = encode_element(ebmlutils.INFO_ID,
+        encode_uint(ebmlutils.TIMESTAMP_SCALE_ID, 1000000) +
+        encode_element(ebmlutils.DURATION_ID, struct.pack(">d", 60000.0)) +
+        encode_string(ebmlutils.TITLE_ID, "Foo"))
+    video_track = encode_element(ebmlutils.TRACK_ENTRY_ID,
+        encode_uint(ebmlutils.TRACK_NUMBER_ID, 1) +
+        encode_uint(ebmlutils.TRACK_UID_ID, 11) +
+        encode_uint(ebmlutils.TRACK_TYPE_ID, 1) +
+        encode_string(ebmlutils.CODEC_ID_ID, "V_MPEG4/ISO/AVC") +
+        encode_element(ebmlutils.VIDEO_ID, encode_uint(ebmlutils.PIXEL_WIDTH_ID, 320) + encode_uint(ebmlutils.PIXEL_HEIGHT_ID, 240)))
+    audio_track = encode_element(ebmlutils.TRACK_ENTRY_ID,
+        encode_uint(ebmlutils.TRACK_NUMBER_ID, 2) +
+        encode_uint(ebmlutils.TRACK_UID_ID, 22) +
+        encode_uint(ebmlutils.TRACK_TYPE_ID, 2) +
+        encode_uint(ebmlutils.FLAG_DEFAULT_ID, 0) +
+        encode_string(ebmlutils.NAME_ID, "VFQ") +
+        encode_string(ebmlutils.LANGUAGE_ID, "fre") +
+        encode_string(ebmlutils.CODEC_ID_ID, audio_codec_id) +
+        encode_element(ebmlutils.AUDIO_ID, encode_uint(ebmlutils.CHANNELS_ID, 6) + encode_element(ebmlutils.SAMPLING_FREQUENCY_ID, struct.pack(">f", 48000.0))))
+    subtitles_track = encode_element(ebmlutils.TRACK_ENTRY_ID,
+        encode_uint(ebmlutils.TRACK_NUMBER_ID, 3) +
+        encode_uint(ebmlutils.TRACK_UID_ID, 33) +
+        encode_uint(ebmlutils.TRACK_TYPE_ID, 17) +
+        encode_uint(ebmlutils.FLAG_FORCED_ID, 1) +
+        encode_string(ebmlutils.LANGUAGE_BCP47_ID, "fr-CA") +
+        encode_string(ebmlutils.CODEC_ID_ID, "S_TEXT/UTF8"))
+    tracks_payload = video_track + audio_track + subtitles_track
+    if (crc):
+        tracks_payload = encode_element(ebmlutils.CRC32_ID, zlib.crc32(tracks_payload).to_bytes(4, "little")) + tracks_payload
+    tracks = encode_element(ebmlutils.TRACKS_ID, tracks_payload)
+    if (void_size > 0):
+        tracks += ebmlutils.encode_void_element(void_size)
+    cluster = encode_element(ebmlutils.CLUSTER_ID, b'\0' * 1000)
+    tags = encode_element(ebmlutils.TAGS_ID, encode_element(ebmlutils.TAG_ID,
+        encode_element(ebmlutils.TARGETS_ID, encode_uint(ebmlutils.TAG_TRACK_UID_ID, 33)) +
+        encode_element(ebmlutils.SIMPLE_TAG_ID, encode_string(ebmlutils.TAG_NAME_ID, "_STATISTICS_TAGS") + encode_string(ebmlutils.TAG_STRING_ID, "NUMBER_OF_FRAMES")) +
+        encode_element(ebmlutils.SIMPLE_TAG_ID, encode_string(ebmlutils.TAG_NAME_ID, "NUMBER_OF_FRAMES") + encode_string(ebmlutils.TAG_STRING_ID, "42"))))
+
+    # The tags are located after the cluster. They can only be found with the SeekHead.
+    def encode_seekhead(info_position, tracks_position, tags_position):
+        seeks = bytes()
+        for element_id, position in [(ebmlutils.INFO_ID, info_position), (ebmlutils.TRACKS_ID, tracks_position), (ebmlutils.TAGS_ID, tags_position)]:
+            seeks += encode_element(ebmlutils.SEEK_ID, encode_uint(ebmlutils.SEEK_ID_ID, element_id, 4) + encode_uint(ebmlutils.SEEK_POSITION_ID, position))
+        return encode_element(ebmlutils.SEEKHEAD_ID, seeks)
+    void = encode_element(ebmlutils.VOID_ID, b'\0' * 100)
+    info_position = len(encode_seekhead(0, 0, 0)) + len(void)
+    tracks_position = info_position + len(info)
+    tags_position = tracks_position + len(tracks) + len(cluster)
+    segment = encode_element(ebmlutils.SEGMENT_ID, encode_seekhead(info_position, tracks_position, tags_position) + void + info + tracks + cluster + tags)
+
+    with open(file_path, "wb") as file:
+        file.write(ebml_header + segment)
+
+
+def test_read_vint():
+    assert ebmlutils.read_vint(b'\x81', 0, False) == (1, 1)
+    assert ebmlutils.read_vint(b'\x40\x02', 0, False) == (2, 2)
+    assert ebmlutils.read_vint(b'\xFF', 0, False) == (ebmlutils.UNKNOWN_SIZE, 1)
+    assert ebmlutils.read_vint(b'\x1A\x45\xDF\xA3', 0, True) == (ebmlutils.EBML_ID, 4)
+    with pytest.raises(ebmlutils.EbmlError):
+        ebmlutils.read_vint(b'\x00', 0, False)
+    with pytest.raises(ebmlutils.EbmlError):
+        ebmlutils.read_vint(b'\x40', 0, False)
+
+
+def test_read_media_file_info():
+    # arrange
+    file_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_read_media_file_info.mkv")
+    create_test_file(file_path)
+
+    # act
+    json_obj = ebmlutils.read_media_file_info(file_path)
+
+    # assert
+    container_properties = json_obj['container']['properties']
+    assert container_properties['duration'] == 60000000000
+    assert container_properties['title'] == "Foo"
+    tracks = json_obj['tracks']
+    assert len(tracks) == 3
+    assert tracks[0]['id'] == 0
+    assert tracks[0]['type'] == "video"
+    assert tracks[0]['codec'] == "AVC/H.264/MPEG-4p10"
+    assert tracks[0]['properties']['pixel_dimensions'] == "320x240"
+    assert tracks[0]['properties']['language'] == "eng"
+    assert tracks[0]['properties']['language_ietf'] == "en"
+    assert tracks[0]['properties']['default_track'] == True
+    assert tracks[1]['type'] == "audio"
+    assert tracks[1]['codec'] == "AC-3"
+    assert tracks[1]['properties']['track_name'] == "VFQ"
+    assert tracks[1]['properties']['language'] == "fre"
+    assert tracks[1]['properties']['language_ietf'] == "fr"
+    assert tracks[1]['properties']['default_track'] == False
+    assert tracks[1]['properties']['audio_channels'] == 6
+    assert tracks[1]['properties']['audio_sampling_frequency'] == 48000
+    assert tracks[2]['type'] == "subtitles"
+    assert tracks[2]['codec'] == "SubRip/SRT"
+    assert tracks[2]['properties']['language'] == "fre"
+    assert tracks[2]['properties']['language_ietf'] == "fr-CA"
+    assert tracks[2]['properties']['forced_track'] == True
+    assert tracks[2]['properties']['tag_number_of_frames'] == "42"
+    assert json_obj['track_tags'] == []
+    assert json_obj['file_name'] == file_path
+
+
+def test_get_native_media_file_info():
+    # arrange
+    file_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_get_native_media_file_info.mkv")
+    create_test_file(file_path, audio_codec_id="A_AAC")
+
+    # act
+    json_obj = mkvmergeutils.get_native_media_file_info(file_path)
+
+    # assert
+    assert json_obj is not None
+    assert ebmlutils.get_bitstream_codec_ids(json_obj) == []
+    assert json_obj['tracks'][1]['codec'] == "AAC"
+    assert json_obj['file_name'] == file_path
+
+
+def test_get_native_media_file_info_bitstream_codec():
+    # arrange
+    file_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_get_native_media_file_info_bitstream_codec.mkv")
+    for codec_id in ["A_AC3", "A_DTS", "A_TRUEHD", "A_FOO"]:
+        create_test_file(file_path, audio_codec_id=codec_id)
+
+        # act
+        json_obj = mkvmergeutils.get_native_media_file_info(file_path)
+
+        # assert files whose codec names are read by mkvmerge from the track content must be probed with mkvmerge
+        assert json_obj is None
+        assert ebmlutils.get_bitstream_codec_ids(ebmlutils.read_media_file_info(file_path)) == [codec_id]
+
+
+def test_read_media_file_info_invalid_file():
+    # arrange
+    file_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_read_media_file_info_invalid_file.mkv")
+    with open(file_path, "wb") as file:
+        file.write(b'{"foo": "bar"}')
+
+    # act, assert
+    with pytest.raises(ebmlutils.EbmlError):
+        ebmlutils.read_media_file_info(file_path)
+
+
+def test_edit_media_file():
+    # arrange
+    file_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_edit_media_file.mkv")
+    create_test_file(file_path, 64, True)
+    file_size = os.path.getsize(file_path)
+    json_diff = {
+        'container': {'properties': {'title': ""}},
+        'tracks': [
+            {},
+            {'properties': {'default_track': True, 'track_name': "AC3 5.1", 'language_ietf': "fr-CA"}},
+            {'properties': {'forced_track': False}},
+        ]
+    }
+
+    # act
+    success = ebmlutils.edit_media_file(file_path, json_diff)
+
+    # assert
+    assert success
+    assert os.path.getsize(file_path) == file_size
+    json_obj = ebmlutils.read_media_file_info(file_path)
+    assert not 'title' in json_obj['container']['properties']
+    assert json_obj['tracks'][1]['properties']['default_track'] == True
+    assert json_obj['tracks'][1]['properties']['track_name'] == "AC3 5.1"
+    assert json_obj['tracks'][1]['properties']['language'] == "fre"
+    assert json_obj['tracks'][1]['properties']['language_ietf'] == "fr-CA"
+    assert json_obj['tracks'][2]['properties']['forced_track'] == False
+    assert json_obj['tracks'][2]['properties']['tag_number_of_frames'] == "42"
+
+    # assert the CRC-32 of the tracks was updated
+    with open(file_path, "rb") as file:
+        reader = ebmlutils.MatroskaReader(file)
+        segment_offset, element_offsets = reader.read_segment_offsets()
+        tracks = reader.read_level1_element(element_offsets, ebmlutils.TRACKS_ID)
+    crc_id, crc_start, crc_end = next(ebmlutils.iter_elements(tracks))
+    assert crc_id == ebmlutils.CRC32_ID
+    assert tracks[crc_start:crc_end] == zlib.crc32(tracks[crc_end:]).to_bytes(4, "little")
+
+
+def test_edit_media_file_not_enough_space():
+    # arrange
+    file_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_edit_media_file_not_enough_space.mkv")
+    create_test_file(file_path)
+    with open(file_path, "rb") as file:
+        original_data = file.read()
+    json_diff = {'tracks': [{'properties': {'track_name': "H264 1080p"}}]}
+
+    # act
+    success = ebmlutils.edit_media_file(file_path, json_diff)
+
+    # assert the file is not modified
+    assert not success
+    with open(file_path, "rb") as file:
+        assert file.read() == original_data
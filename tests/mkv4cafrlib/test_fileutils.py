@@ -0,0 +1,101 @@
+import pytest
+import os
+import tempfile
+from mkv4cafrlib import fileutils
+
+
+def create_test_file(name: str, size: int) -> str:
+    file_path = os.path.join(tempfile.gettempdir(), name)
+    with open(file_path, "wb") as file:
+        file.write(os.urandom(size))
+    return file_path
+
+
+def test_copy_file_contents():
+    # arrange
+    input_size = fileutils.COPY_CHUNK_SIZE * 2 + 123
+    input_path = create_test_file("mkv4cafr.test_copy_file_contents.input.mkv", input_size)
+    output_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_copy_file_contents.output.mkv")
+    progress = list()
+
+    # act
+    copy_strategy = fileutils.copy_file_contents(input_path, output_path, lambda actual, total: progress.append((actual, total)))
+
+    # assert
+    assert copy_strategy in [fileutils.COPY_STRATEGY_REFLINK, fileutils.COPY_STRATEGY_COPY_FILE_RANGE, fileutils.COPY_STRATEGY_SENDFILE, fileutils.COPY_STRATEGY_READINTO]
+    with open(input_path, "rb") as input_file:
+        with open(output_path, "rb") as output_file:
+            assert input_file.read() == output_file.read()
+    assert progress[-1] == (input_size, input_size)
+
+
+def test_readinto_loop():
+    # arrange
+    input_size = fileutils.COPY_CHUNK_SIZE + 1
+    input_path = create_test_file("mkv4cafr.test_readinto_loop.input.mkv", input_size)
+    output_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_readinto_loop.output.mkv")
+    progress = list()
+
+    # act
+    with open(input_path, "rb", buffering=0) as fin:
+        with open(output_path, "wb", buffering=0) as fout:
+            fileutils.readinto_loop(fin, fout, input_size, lambda actual, total: progress.append(actual))
+
+    # assert
+    with open(input_path, "rb") as input_file:
+        with open(output_path, "rb") as output_file:
+            assert input_file.read() == output_file.read()
+    assert progress == [fileutils.COPY_CHUNK_SIZE, input_size]
+
+
+def test_get_output_dir_for_input_file():
+    input_dir = os.path.join(tempfile.gettempdir(), "input")
+    output_dir = os.path.join(tempfile.gettempdir(), "output")
+    assert fileutils.get_output_dir_for_input_file(os.path.join(input_dir, "Movie.mkv"), input_dir, output_dir) == output_dir
+    assert fileutils.get_output_dir_for_input_file(os.path.join(input_dir, "Show", "Season 01", "Episode 01.mkv"), input_dir, output_dir) == os.path.join(output_dir, "Show", "Season 01")
+    assert fileutils.get_output_dir_for_input_file(os.path.join(tempfile.gettempdir(), "Movie.mkv"), input_dir, output_dir) == output_dir
+
+
+def test_is_path_in_directory():
+    input_dir = os.path.join(tempfile.gettempdir(), "input")
+    assert fileutils.is_path_in_directory(input_dir, input_dir) == True
+    assert fileutils.is_path_in_directory(os.path.join(input_dir, "output"), input_dir) == True
+    assert fileutils.is_path_in_directory(os.path.join(tempfile.gettempdir(), "input2"), input_dir) == False
+    assert fileutils.is_path_in_directory(tempfile.gettempdir(), input_dir) == False
+
+
+def test_readinto_loop_truncated_input():
+    # arrange
+    input_size = 1000
+    input_path = create_test_file("mkv4cafr.test_readinto_loop_truncated_input.input.mkv", input_size)
+    output_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_readinto_loop_truncated_input.output.mkv")
+
+    # act, assert a file shorter than expected is an error
+    with open(input_path, "rb", buffering=0) as fin:
+        with open(output_path, "wb", buffering=0) as fout:
+            with pytest.raises(OSError) as e_info:
+                fileutils.readinto_loop(fin, fout, input_size + 1, lambda actual, total: None)
+
+
+@pytest.mark.parametrize("loop_name, function_name", [("copy_file_range_loop", "copy_file_range"), ("sendfile_loop", "sendfile")])
+def test_copy_loop_returns_zero(monkeypatch, loop_name, function_name):
+    # arrange
+    input_size = 1000
+    input_path = create_test_file("mkv4cafr.test_copy_loop_returns_zero.input.mkv", input_size)
+    output_path = os.path.join(tempfile.gettempdir(), "mkv4cafr.test_copy_loop_returns_zero.output.mkv")
+    copy_loop = getattr(fileutils, loop_name)
+    sizes = list()
+    monkeypatch.setattr(os, function_name, lambda *args: sizes.pop(0), raising=False)
+
+    # act, assert nothing copied at the start of the file means the copy is not supported
+    sizes = [0]
+    with open(input_path, "rb", buffering=0) as fin:
+        with open(output_path, "wb", buffering=0) as fout:
+            assert copy_loop(fin, fout, input_size, lambda actual, total: None) == False
+
+    # act, assert nothing copied before the end of the file is an error
+    sizes = [400, 0]
+    with open(input_path, "rb", buffering=0) as fin:
+        with open(output_path, "wb", buffering=0) as fout:
+            with pytest.raises(OSError) as e_info:
+                copy_loop(fin, fout, input_size, lambda actual, total: None)
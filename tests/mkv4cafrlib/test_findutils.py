@@ -1,5 +1,7 @@
 import pytest
 import os
+import shutil
+import tempfile
 from mkv4cafrlib import findutils
 
 def test_find_exec_in_path():
@@ -59,3 +61,54 @@ def test_is_absolute_file_in_path():
     bad_file_path = os.path.join(bad_dir, file_name)
     found = findutils.is_absolute_file_in_path(bad_file_path)
     assert (found == False)
+
+
+def test_find_files_by_extension():
+    # arrange
+    # create a fake directory tree
+    temp_dir = tempfile.gettempdir()
+    root_dir = os.path.join(temp_dir, "mkv4cafr.test_find_files_by_extension")
+    shutil.rmtree(root_dir, ignore_errors=True)
+    os.makedirs(os.path.join(root_dir, "Show", "Season 01"))
+    os.makedirs(os.path.join(root_dir, ".hidden"))
+    file_names = [
+        "movie.mkv",
+        "MOVIE2.MKV",
+        "notes.txt",
+        "._movie.mkv",
+        os.path.join("Show", "Season 01", "episode01.mkv"),
+        os.path.join("Show", "Season 01", "episode02.Mkv"),
+        os.path.join(".hidden", "hidden.mkv"),
+    ]
+    for file_name in file_names:
+        with open(os.path.join(root_dir, file_name), "w") as text_file:
+            text_file.write("")
+
+    # act
+    flat_files = list(findutils.find_files_by_extension(root_dir, ".mkv"))
+    flat_files_ignore_case = list(findutils.find_files_by_extension(root_dir, ".mkv", False, True))
+    recursive_files = list(findutils.find_files_by_extension(root_dir, ".mkv", True))
+    recursive_files_ignore_case = list(findutils.find_files_by_extension(root_dir, ".mkv", True, True))
+
+    # assert
+    def as_relative_set(file_paths: list):
+        return set(os.path.relpath(file_path, root_dir) for file_path in file_paths)
+    assert as_relative_set(flat_files) == {"movie.mkv"}
+    assert as_relative_set(flat_files_ignore_case) == {"movie.mkv", "MOVIE2.MKV"}
+    assert as_relative_set(recursive_files) == {"movie.mkv", os.path.join("Show", "Season 01", "episode01.mkv")}
+    assert as_relative_set(recursive_files_ignore_case) == {
+        "movie.mkv",
+        "MOVIE2.MKV",
+        os.path.join("Show", "Season 01", "episode01.mkv"),
+        os.path.join("Show", "Season 01", "episode02.Mkv"),
+    }
+
+    # assert files are yielded lazily
+    generator = findutils.find_files_by_extension(root_dir, ".mkv", True)
+    assert next(generator) != None
+
+
+def test_find_files_by_extension_invalid_directory():
+    # assert an exception is thrown
+    with pytest.raises(Exception) as e_info:
+        list(findutils.find_files_by_extension("i-do-not-exists", ".mkv"))
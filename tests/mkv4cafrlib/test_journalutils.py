@@ -0,0 +1,78 @@
+import pytest
+import os
+from tests import testutils
+from mkv4cafrlib import journalutils
+
+
+def test_load_completed_files():
+    # arrange
+    journal_path = testutils.get_temp_file_path("mkv4cafr.test_load_completed_files.jsonl")
+    journal = journalutils.RunJournal(journal_path)
+    journal.record("/foo/unchanged.mkv", journalutils.OUTCOME_UNCHANGED, (1, 2, 3, 4))
+    journal.record("/foo/edited.mkv", journalutils.OUTCOME_EDITED, (1, 3, 3, 4))
+    journal.record("/foo/failed.mkv", journalutils.OUTCOME_FAILED, (1, 4, 3, 4))
+    journal.record("/foo/failed-then-edited.mkv", journalutils.OUTCOME_FAILED, (1, 5, 3, 4))
+    journal.record("/foo/failed-then-edited.mkv", journalutils.OUTCOME_EDITED, (1, 5, 3, 5))
+    journal.record("/foo/edited-then-failed.mkv", journalutils.OUTCOME_EDITED, (1, 6, 3, 4))
+    journal.record("/foo/edited-then-failed.mkv", journalutils.OUTCOME_FAILED, (1, 6, 3, 5))
+    journal.close()
+
+    # act
+    completed_files = journalutils.load_completed_files(journal_path)
+
+    # assert
+    assert len(completed_files) == 3
+    assert journalutils.is_file_completed(completed_files, "/foo/unchanged.mkv", (1, 2, 3, 4))
+    assert journalutils.is_file_completed(completed_files, "/foo/edited.mkv", (1, 3, 3, 4))
+    assert journalutils.is_file_completed(completed_files, "/foo/failed-then-edited.mkv", (1, 5, 3, 5))
+    assert not journalutils.is_file_completed(completed_files, "/foo/failed.mkv", (1, 4, 3, 4))
+    assert not journalutils.is_file_completed(completed_files, "/foo/edited-then-failed.mkv", (1, 6, 3, 5))
+
+    # assert a file modified since it was processed is not completed
+    assert not journalutils.is_file_completed(completed_files, "/foo/unchanged.mkv", (1, 2, 3, 5))
+
+
+def test_load_completed_files_interrupted_write():
+    # arrange
+    journal_path = testutils.get_temp_file_path("mkv4cafr.test_load_completed_files_interrupted_write.jsonl")
+    journal = journalutils.RunJournal(journal_path)
+    journal.record("/foo/edited.mkv", journalutils.OUTCOME_EDITED, (1, 3, 3, 4))
+    journal.close()
+    with open(journal_path, "ab") as binary_file:
+        binary_file.write(b'{"path": "/foo/unchanged.mkv", "outc')
+
+    # act
+    completed_files = journalutils.load_completed_files(journal_path)
+
+    # assert
+    assert len(completed_files) == 1
+    assert journalutils.is_file_completed(completed_files, "/foo/edited.mkv", (1, 3, 3, 4))
+
+
+def test_load_completed_files_missing_journal():
+    # act
+    completed_files = journalutils.load_completed_files("i-do-not-exists.jsonl")
+
+    # assert
+    assert len(completed_files) == 0
+
+
+def test_run_journal_after_interrupted_write():
+    # arrange
+    journal_path = testutils.get_temp_file_path("mkv4cafr.test_run_journal_after_interrupted_write.jsonl")
+    journal = journalutils.RunJournal(journal_path)
+    journal.record("/foo/a.mkv", journalutils.OUTCOME_EDITED, (1, 2, 3, 4))
+    journal.close()
+    with open(journal_path, "ab") as binary_file:
+        binary_file.write(b'{"path": "/foo/b.mkv", "outc')
+
+    # act (next run)
+    journal = journalutils.RunJournal(journal_path)
+    journal.record("/foo/c.mkv", journalutils.OUTCOME_UNCHANGED, (5, 6, 7, 8))
+    journal.close()
+    completed_files = journalutils.load_completed_files(journal_path)
+
+    # assert the entry recorded after the incomplete line is not lost
+    assert len(completed_files) == 2
+    assert journalutils.is_file_completed(completed_files, "/foo/a.mkv", (1, 2, 3, 4))
+    assert journalutils.is_file_completed(completed_files, "/foo/c.mkv", (5, 6, 7, 8))
@@ -0,0 +1,147 @@
+import pytest
+import os
+import glob
+import json
+from tests import testutils
+from mkv4cafrlib import mediainfoutils
+from mkv4cafrlib import mkvmergeutils
+from mkv4cafrlib import mkv4cafrlib
+
+
+def load_test_file(file_name: str) -> dict:
+    file_path = os.path.join(testutils.get_test_files_dir_path(), file_name)
+    json_obj = mkvmergeutils.load_media_file_info(file_path)
+    assert json_obj != None
+    return json_obj
+
+
+def test_media_info_to_dict():
+    file_paths = glob.glob(os.path.join(testutils.get_test_files_dir_path(), "*.json"))
+    assert len(file_paths) > 0
+    for file_path in file_paths:
+        # arrange
+        json_obj = mkvmergeutils.load_media_file_info(file_path)
+
+        # act
+        media_info = mediainfoutils.MediaInfo(json_obj)
+
+        # assert the conversion is lossless, including the order of the keys
+        assert media_info.to_dict() == json_obj
+        assert json.dumps(media_info.to_dict()) == json.dumps(json_obj)
+
+
+def test_media_info_to_dict_missing_and_unknown_keys():
+    # arrange
+    json_obj = {
+        "tracks": [
+            { "type": "audio", "id": 1 },
+            { "id": 2, "properties": None, "type": "audio" },
+            { "properties": { "foo": [1, 2], "track_name": None, "language": "fre" }, "bar": True },
+        ],
+        "container": { "properties": { "title": "Foo" } },
+        "foo": "bar",
+    }
+
+    # act
+    media_info = mediainfoutils.MediaInfo(json_obj)
+
+    # assert
+    assert json.dumps(media_info.to_dict()) == json.dumps(json_obj)
+    assert media_info.tracks[0].has_property("language") == False
+    assert media_info.tracks[2].get_property("foo") == [1, 2]
+    assert media_info.tracks[2].has_property("track_name") == True
+    assert media_info.tracks[2].get_property("track_name") == None
+
+
+def test_media_info_derived_fields():
+    # arrange
+    json_obj = load_test_file("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    # act
+    media_info = mediainfoutils.MediaInfo(json_obj)
+
+    # assert
+    assert media_info.container.duration_ms == mkvmergeutils.get_container_duration_ms(json_obj)
+    assert len(media_info.tracks) == len(json_obj['tracks'])
+    for track, track_dict in zip(media_info.tracks, json_obj['tracks']):
+        assert track.normalized_type == track_dict['type']
+        assert track.get_flags_array() == mkvmergeutils.get_track_name_flags_array(track_dict)
+        assert track.codec_friendly_name == mkvmergeutils.get_codec_friendly_name(track_dict['codec'])
+        if (track.normalized_type == "subtitles"):
+            assert track.subtitles_count == mkvmergeutils.get_track_subtitles_count(track_dict)
+        else:
+            assert track.subtitles_count == None
+    assert len(media_info.get_tracks_of_type("audio")) == len(mkvmergeutils.get_tracks_indice_by_type(json_obj['tracks'], ["audio"]))
+
+
+def test_track_set_property():
+    # arrange
+    track = mediainfoutils.Track({ "id": 1, "type": "audio", "properties": { "language": "fre", "track_name": "French" } })
+    assert track.flags == 0
+    assert track.normalized_language == "fre"
+
+    # act
+    track.set_property("track_name", "French (VFQ)")
+    track.set_property("language_ietf", "fr-CA")
+
+    # assert the derived fields are updated
+    assert track.get_flags_array() == ["VFQ"]
+    assert track.flags == mediainfoutils.TRACK_FLAG_BITS["VFQ"]
+    assert track.normalized_language == "fr-CA"
+    assert track.to_dict() == { "id": 1, "type": "audio", "properties": { "language": "fre", "track_name": "French (VFQ)", "language_ietf": "fr-CA" } }
+
+    # assert tracks without properties are not modified
+    track = mediainfoutils.Track({ "id": 1, "type": "audio" })
+    assert track.set_property("track_name", "foo") == False
+    assert track.to_dict() == { "id": 1, "type": "audio" }
+
+
+def test_update_properties_as_per_preferences_media_info():
+    # arrange
+    json_obj = load_test_file("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+    media_info = mediainfoutils.MediaInfo(json_obj)
+    input_file_path = "Movie (2021) VF2.mkv"
+
+    # act
+    media_info_copy = mkv4cafrlib.update_properties_as_per_preferences(media_info, input_file_path)
+
+    # assert the rules give the same result as with the json data
+    json_copy = mkv4cafrlib.update_properties_as_per_preferences(json_obj, input_file_path)
+    assert isinstance(media_info_copy, mediainfoutils.MediaInfo)
+    assert media_info_copy.to_dict() == json_copy
+    assert media_info.to_dict() == json_obj
+    assert mkv4cafrlib.validate_inconsistencies(media_info_copy, input_file_path) == mkv4cafrlib.validate_inconsistencies(json_copy, input_file_path)
+    assert mkv4cafrlib.compute_json_differences(media_info, media_info_copy) == mkv4cafrlib.compute_json_differences(json_obj, json_copy)
+
+
+def test_track_index_from_media_info_flags():
+    # arrange
+    json_obj = load_test_file("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+    media_info = mediainfoutils.MediaInfo(json_obj)
+    mkvmergeutils.clear_track_name_flags_cache()
+
+    # act
+    lookup = mkvmergeutils.TrackIndex(json_obj['tracks'], media_info.get_tracks_flags_arrays())
+    all_indices = lookup.get_indice_by_type(["audio", "subtitles"])
+
+    # assert the flags of the MediaInfo are used instead of being extracted again from the track names
+    assert lookup.filter_indice_by_flag(all_indices, ['VFQ']) == [3, 6]
+    assert lookup.filter_indice_by_flag(all_indices, ['VFF']) == [1, 4]
+    assert lookup.get_track_flags(6) == "VFQ"
+    assert mkvmergeutils.get_track_name_flags_cache_info()['misses'] == 0
+
+
+def test_update_properties_as_per_preferences_media_info_flags():
+    # arrange
+    json_obj = load_test_file("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+    media_info = mediainfoutils.MediaInfo(json_obj)
+    mkvmergeutils.clear_track_name_flags_cache()
+
+    # act
+    mkv4cafrlib.update_properties_as_per_preferences(media_info, "Movie (2021).mkv")
+
+    # assert the flags are only extracted from the track names the rules have renamed
+    renamed_count = mkvmergeutils.get_track_name_flags_cache_info()['misses']
+    mkvmergeutils.clear_track_name_flags_cache()
+    mkv4cafrlib.update_properties_as_per_preferences(json_obj, "Movie (2021).mkv")
+    assert renamed_count < mkvmergeutils.get_track_name_flags_cache_info()['misses']
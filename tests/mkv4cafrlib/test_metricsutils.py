@@ -0,0 +1,59 @@
+import pytest
+import os
+import json
+from tests import testutils
+from mkv4cafrlib import metricsutils
+
+
+def test_measure_stage():
+    # arrange
+    stages = list()
+
+    # act
+    with metricsutils.measure_stage(stages, "probe") as stage:
+        stage['bytes'] = 123
+    with pytest.raises(ValueError):
+        with metricsutils.measure_stage(stages, "parse") as stage:
+            raise ValueError("foo")
+
+    # assert
+    assert len(stages) == 2
+    assert stages[0]['stage'] == "probe"
+    assert stages[0]['outcome'] == metricsutils.STAGE_OUTCOME_OK
+    assert stages[0]['bytes'] == 123
+    assert stages[0]['duration'] >= 0
+    assert stages[1]['outcome'] == metricsutils.STAGE_OUTCOME_ERROR
+
+
+def test_get_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert metricsutils.get_percentile(values, 50) == 50.0
+    assert metricsutils.get_percentile(values, 95) == 95.0
+    assert metricsutils.get_percentile(values, 100) == 100.0
+    assert metricsutils.get_percentile([4.0], 95) == 4.0
+    assert metricsutils.get_percentile([], 50) is None
+
+
+def test_metrics_recorder():
+    # arrange
+    file_path = testutils.get_temp_file_path("mkv4cafr.test_metrics_recorder.jsonl")
+    recorder = metricsutils.MetricsRecorder(file_path)
+
+    # act
+    recorder.record_file("/foo/a.mkv", "edited", 3.0, [{'stage': "probe", 'outcome': "ok", 'duration': 1.0, 'bytes': 10}, {'stage': "copy", 'outcome': "ok", 'duration': 2.0, 'bytes': 1000}])
+    recorder.record_file("/foo/b.mkv", "failed", 3.0, [{'stage': "probe", 'outcome': "failed", 'duration': 3.0}])
+    summary = recorder.write_summary()
+    recorder.close()
+
+    # assert
+    assert list(summary.keys()) == ["probe", "copy"]
+    assert summary['probe']['count'] == 2
+    assert summary['probe']['p50'] == 1.0
+    assert summary['probe']['max'] == 3.0
+    assert summary['probe']['bytes'] == 10
+    assert summary['copy']['bytes'] == 1000
+    with open(file_path, "r", encoding="utf-8") as file:
+        events = [json.loads(line) for line in file]
+    assert [event['event'] for event in events] == ["stage", "stage", "file", "stage", "file", "summary"]
+    assert events[4]['path'] == "/foo/b.mkv"
+    assert events[4]['outcome'] == "failed"
@@ -0,0 +1,103 @@
+import pytest
+import os
+import copy
+from tests import testutils
+from mkv4cafrlib import mkv4cafrlib
+from mkv4cafrlib import mkvmergeutils
+
+
+def load_test_file(file_name: str) -> dict:
+    file_path = os.path.join(testutils.get_test_files_dir_path(), file_name)
+    json_obj = mkvmergeutils.load_media_file_info(file_path)
+    assert json_obj != None
+    return json_obj
+
+
+def update_properties_sequentially(json_obj: dict, input_file_path: str) -> dict:
+    # Runs each rule over all tracks, one rule after the other
+    json_copy = copy.deepcopy(json_obj)
+    mkvmergeutils.set_container_properties_title(json_copy, "")
+    mkv4cafrlib.update_video_tracks_set_default_track_flag(json_copy)
+    mkv4cafrlib.update_video_tracks_remove_track_name(json_copy)
+    mkv4cafrlib.update_set_language_from_track_name_hints(json_copy)
+    mkv4cafrlib.update_audio_tracks_language_or_track_name_from_input_file_name(json_copy, input_file_path)
+    mkv4cafrlib.update_audio_tracks_rename_all_track_names(json_copy)
+    mkv4cafrlib.update_audio_tracks_default_track(json_copy)
+    mkv4cafrlib.update_subtitle_tracks_set_forced_flag_if_required(json_copy)
+    mkv4cafrlib.update_subtitle_tracks_default_track_from_forced_flag(json_copy)
+    return json_copy
+
+
+def test_get_rule_passes():
+    # act
+    passes = mkv4cafrlib.get_rule_passes(mkv4cafrlib.RULES)
+
+    # assert all rules are run once, in order for each track type
+    names = [rule['name'] for rule_pass in passes for rule in rule_pass['rules']]
+    assert sorted(names) == sorted(rule['name'] for rule in mkv4cafrlib.RULES)
+    assert names.index("language_from_track_name") < names.index("audio_flags_from_file_name") < names.index("audio_track_name") < names.index("audio_default_track")
+    assert names.index("language_from_track_name") < names.index("subtitles_forced_track") < names.index("subtitles_default_track")
+
+    # assert the video rules and the language rule are fused in a single pass over the tracks
+    assert passes[0]['scope'] == mkv4cafrlib.RULE_SCOPE_TRACK
+    assert [rule['name'] for rule in passes[0]['rules']] == ["video_default_track", "video_track_name", "language_from_track_name"]
+
+    # assert a subtitles rule is fused with an audio rule over document rules on audio tracks
+    assert passes[2]['scope'] == mkv4cafrlib.RULE_SCOPE_TRACK
+    assert [rule['name'] for rule in passes[2]['rules']] == ["audio_track_name", "subtitles_forced_track"]
+    assert len(passes) == 5
+
+
+def test_update_properties_as_per_preferences_same_as_sequential_rules():
+    file_names = ["test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json",
+                  "test_get_best_track_id_from_indice_vff_has_priority_over_default_and_fr.json",
+                  "test_get_best_forced_track_id_for_type_french_has_priority_over_default_and_english.json",
+                  "test_get_first_default_track_id_for_type_id025.json"]
+    for file_name in file_names:
+        for input_file_path in ["Movie (2021) VF2.mkv", "Movie (2021) VFQ.mkv", "Movie (2021).mkv"]:
+            # arrange
+            json_obj = load_test_file(file_name)
+            expected = update_properties_sequentially(json_obj, input_file_path)
+
+            # act
+            json_copy = mkv4cafrlib.update_properties_as_per_preferences(json_obj, input_file_path)
+
+            # assert
+            assert json_copy == expected
+
+
+def test_update_properties_as_per_preferences_rule_timings():
+    # arrange
+    json_obj = load_test_file("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+    json_obj['tracks'] = [track for track in json_obj['tracks'] if track['type'] != "subtitles"]
+    rule_timings = dict()
+
+    # act
+    mkv4cafrlib.update_properties_as_per_preferences(json_obj, "Movie (2021).mkv", rule_timings)
+
+    # assert the subtitles rules are skipped on files without subtitles
+    assert "audio_default_track" in rule_timings
+    assert "audio_flags_from_file_name" in rule_timings
+    assert not "subtitles_forced_track" in rule_timings
+    assert not "subtitles_default_track" in rule_timings
+    for name, duration in rule_timings.items():
+        assert duration >= 0
+
+
+def test_compute_json_differences_from_journal():
+    file_names = ["test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json",
+                  "test_get_best_forced_track_id_for_type_vff_has_priority_over_default_and_fr.json",
+                  "test_get_first_default_track_id_for_type_none.json"]
+    for file_name in file_names:
+        # arrange
+        json_obj = load_test_file(file_name)
+        json_copy = mkv4cafrlib.update_properties_as_per_preferences(json_obj, "Movie (2021) VF2.mkv")
+
+        # act
+        json_diff = mkv4cafrlib.compute_json_differences(json_obj, json_copy)
+
+        # assert the journal gives the same differences as comparing all the properties of all tracks
+        expected = mkv4cafrlib.compute_json_differences(json_obj, copy.deepcopy(dict(json_copy)))
+        assert json_diff == expected
+        assert list(json_diff.keys()) == list(expected.keys())
+        assert mkv4cafrlib.get_mkvpropedit_args_for_diff(json_diff, "foo.mkv") == mkv4cafrlib.get_mkvpropedit_args_for_diff(expected, "foo.mkv")
@@ -1,9 +1,13 @@
 import pytest
 import os
+import json
+import sys
+import subprocess
 from tests import testutils
 from mkv4cafrlib import mkvmergeutils
 from mkv4cafrlib import mkvtoolnixutils
 from mkv4cafrlib import findutils
+from mkv4cafrlib import cacheutils
 
 
 # Globals
@@ -937,6 +941,21 @@ def test_get_first_video_track_codec_friendly_name():
     assert codec == "HEVC"
 
 
+def test_get_flag_tokens():
+    assert mkvmergeutils.get_flag_tokens("") == set()
+    assert mkvmergeutils.get_flag_tokens("French (VFQ) sdh") == {"FRENCH", "VFQ", "SDH"}
+    assert mkvmergeutils.get_flag_tokens("a.vo,b-c d") == {"A", "VO", "B", "C", "D"}
+
+    # assert parenthesis and brackets need their counterpart character
+    assert mkvmergeutils.get_flag_tokens("a(foo(b") == {"B"}
+    assert mkvmergeutils.get_flag_tokens("a)foo)b") == {"A"}
+    assert mkvmergeutils.get_flag_tokens("a[foo]b") == {"FOO"}
+
+    # assert long names without delimiters are a single word
+    name = "x" * 4092 + "SDHx"
+    assert mkvmergeutils.get_flag_tokens(name) == {name.upper()}
+
+
 def test_get_track_name_flags_from_filename():
     assert mkvmergeutils.get_track_name_flags_from_filename('Star Wars: Episode IV A New Hope (1977) - VF2') == 'VF2'
     assert mkvmergeutils.get_track_name_flags_from_filename('Star Wars: Episode V The Empire Strikes Back (1980) VFF.H264') == 'VFF'
@@ -947,3 +966,257 @@ def test_get_track_name_flags_from_filename():
     # assert VF2 has priority over VFQ and VFF.
     flags = mkvmergeutils.get_track_name_flags_from_filename('Star Wars: Episode III Revenge of the Sith (2005)  - VF2,VFF,VFQ,VFI,VO')
     assert flags == "VF2"
+
+
+def test_track_index():
+    # Check file dependencies
+    file_path = get_test_file_path("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    # arrange
+    json_obj = mkvmergeutils.load_media_file_info(file_path)
+    assert json_obj != None
+    tracks = json_obj['tracks']
+
+    # act
+    lookup = mkvmergeutils.TrackIndex(tracks)
+    audio_indices = lookup.get_indice_by_type("audio")
+    all_indices = lookup.get_indice_by_type(["audio", "subtitles"])
+
+    # assert
+    assert audio_indices == [1, 2, 3]
+    assert all_indices == [1, 2, 3, 4, 5, 6]
+    assert lookup.filter_indice_by_language(audio_indices, ['fre']) == [1, 2, 3]
+    assert lookup.filter_indice_by_language(all_indices, ['fr-CA']) == [3]
+    assert lookup.filter_indice_by_flag(all_indices, ['VFQ']) == [3, 6]
+    assert lookup.filter_indice_by_flag(all_indices, ['VFF']) == [1, 4]
+    assert lookup.get_index_from_id(5) == 5
+    assert lookup.get_index_from_id(99) == mkvmergeutils.INVALID_TRACK_INDEX
+    assert lookup.get_track_flags(6) == mkvmergeutils.get_track_name_flags(tracks[6])
+
+    # assert the index matches the linear scans
+    assert audio_indices == mkvmergeutils.get_tracks_indice_by_type(tracks, ["audio"])
+    assert lookup.filter_indice_by_flag(all_indices, ['VFQ', 'VFF']) == mkvmergeutils.filter_tracks_indice_by_flag(tracks, all_indices, ['VFQ', 'VFF'])
+
+    # assert the index is updated by set_track_flag()
+    # act
+    mkvmergeutils.set_track_flag(json_obj, 2, 'VFQ', lookup)
+    # assert
+    assert lookup.filter_indice_by_flag(audio_indices, ['VFQ']) == [2, 3]
+    assert lookup.filter_indice_by_language(audio_indices, ['fr-CA']) == [2, 3]
+
+    # assert the index is updated by update_track()
+    # act
+    mkvmergeutils.set_track_property_value(json_obj, 2, 'track_name', 'English')
+    mkvmergeutils.set_track_property_value(json_obj, 2, 'language', 'eng')
+    mkvmergeutils.set_track_property_value(json_obj, 2, 'language_ietf', 'en')
+    lookup.update_track(2)
+    # assert
+    assert lookup.filter_indice_by_language(audio_indices, ['fre']) == [1, 3]
+    assert lookup.filter_indice_by_flag(audio_indices, ['VFQ']) == [3]
+
+    # assert a track can be updated again after its flags were extracted but before they were indexed
+    # act
+    mkvmergeutils.set_track_property_value(json_obj, 1, 'track_name', '(DVD)')
+    lookup.update_track(1)
+    assert lookup.get_track_flags(1) == "VFF,DVD"
+    mkvmergeutils.set_track_property_value(json_obj, 1, 'track_name', '(VFI)')
+    lookup.update_track(1)
+    # assert
+    assert lookup.filter_indice_by_flag(audio_indices, ['DVD']) == []
+    assert lookup.filter_indice_by_flag(audio_indices, ['VFI']) == [1]
+    assert lookup.filter_indice_by_flag(audio_indices, ['VFF']) == [1]
+
+
+def test_get_track_name_flags_cache():
+    # arrange
+    track = dict()
+    track['properties'] = dict()
+    track['properties']['track_name'] = "French (VFQ) SDH"
+    track['properties']['language_ietf'] = "fr-CA"
+    mkvmergeutils.clear_track_name_flags_cache()
+
+    # act
+    flags1 = mkvmergeutils.get_track_name_flags_array(track)
+    flags2 = mkvmergeutils.get_track_name_flags_array(track)
+
+    # assert
+    assert flags1 == ['VFQ', 'SDH']
+    assert flags2 == flags1
+    info = mkvmergeutils.get_track_name_flags_cache_info()
+    assert info['misses'] == 1
+    assert info['hits'] == 1
+    assert info['size'] == 1
+
+    # assert modifying the returned flags does not modify the cache
+    flags1.append('CC')
+    assert mkvmergeutils.get_track_name_flags_array(track) == ['VFQ', 'SDH']
+
+    # assert modifying the track name or language invalidates the cached flags
+    # act
+    track['properties']['track_name'] = "French (VFF)"
+    flags3 = mkvmergeutils.get_track_name_flags_array(track)
+    track['properties']['language_ietf'] = "fr-FR"
+    flags4 = mkvmergeutils.get_track_name_flags_array(track)
+
+    # assert
+    assert flags3 == ['VFF', 'VFQ'] # fr-CA implies VFQ
+    assert flags4 == ['VFF']
+    info = mkvmergeutils.get_track_name_flags_cache_info()
+    assert info['misses'] == 3
+    assert info['hits'] == 2
+
+
+def test_media_info_overlay():
+    # Check file dependencies
+    file_path = get_test_file_path("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    # arrange
+    json_obj = mkvmergeutils.load_media_file_info(file_path)
+    assert json_obj != None
+    json_obj['attachments'] = [ { "file_name": "font.ttf", "size": 123456 } ]
+    track_name = mkvmergeutils.get_track_property_value(json_obj, 2, 'track_name')
+
+    # act
+    json_copy = mkvmergeutils.MediaInfoOverlay(json_obj)
+    mkvmergeutils.set_track_property_value(json_copy, 2, 'track_name', 'English')
+    mkvmergeutils.set_container_properties_title(json_copy, "")
+
+    # assert the copy is modified
+    assert mkvmergeutils.get_track_property_value(json_copy, 2, 'track_name') == 'English'
+    assert mkvmergeutils.get_container_properties_title(json_copy) == ""
+
+    # assert the base document is not modified
+    assert mkvmergeutils.get_track_property_value(json_obj, 2, 'track_name') == track_name
+    assert mkvmergeutils.get_container_properties_title(json_obj) != ""
+
+    # assert unmodified sections and tracks are shared
+    assert json_copy['attachments'] is json_obj['attachments']
+    assert json_copy['tracks'][1]['properties'] is json_obj['tracks'][1]['properties']
+    assert not json_copy['tracks'][2]['properties'] is json_obj['tracks'][2]['properties']
+    assert json_copy.modified_tracks_indice == {2}
+
+
+def test_media_info_overlay_change_journal():
+    # Check file dependencies
+    file_path = get_test_file_path("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    # arrange
+    json_obj = mkvmergeutils.load_media_file_info(file_path)
+    assert json_obj != None
+    json_copy = mkvmergeutils.MediaInfoOverlay(json_obj)
+    track_name = mkvmergeutils.get_track_property_value(json_obj, 6, 'track_name')
+    assert track_name == "VFQ"
+
+    # act
+    mkvmergeutils.set_track_property_value(json_copy, 1, 'track_name', 'English')
+    mkvmergeutils.set_track_property_value(json_copy, 1, 'track_name', 'Anglais')
+    mkvmergeutils.set_track_property_value(json_copy, 6, 'track_name', 'English')
+    mkvmergeutils.set_track_property_value(json_copy, 6, 'track_name', track_name)
+    mkvmergeutils.set_track_property_value(json_copy, 3, 'forced_track', True)
+    mkvmergeutils.set_container_properties_title(json_copy, "")
+
+    # assert repeated writes are collapsed and restored values are removed
+    assert json_copy.track_changes == { 1: { 'track_name': 'Anglais' }, 3: { 'forced_track': True } }
+    assert json_copy.container_changes == { 'title': "" }
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="the fake MKVToolNix tools are python scripts without the .exe extension")
+def test_read_media_file_json(monkeypatch):
+    # arrange
+    monkeypatch.setenv("PATH", testutils.get_fake_mkvtoolnix_dir_path() + os.pathsep + os.environ['PATH'])
+    file_path = get_test_file_path("test_get_best_track_id_from_indice_vfq_has_priority_over_default_and_vff_and_fr.json")
+
+    # act
+    media_json_bytes = mkvmergeutils.read_media_file_json(file_path)
+
+    # assert
+    assert isinstance(media_json_bytes, bytearray)
+    json_obj = json.loads(media_json_bytes)
+    assert json_obj['tracks'] == mkvmergeutils.load_media_file_info(file_path)['tracks']
+
+    # assert the errors of mkvmerge are reported like subprocess.check_output()
+    with pytest.raises(subprocess.CalledProcessError) as e_info:
+        mkvmergeutils.read_media_file_json("i-do-not-exists.mkv")
+    assert e_info.value.returncode != 0
+
+
+def test_split_media_json():
+    # arrange
+    json_obj = {
+        "attachments": [ { "file_name": "font \"]},\n  \"x.ttf", "id": 1 } ],
+        "chapters": [],
+        "container": { "properties": { "title": "Foo" } },
+        "tracks": [ { "id": 0, "properties": { "track_name": "Français" }, "type": "audio" } ],
+        "track_tags": [ { "num_entries": 2, "track_id": 0 } ],
+    }
+    media_json_bytes = (json.dumps(json_obj, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+    # act
+    media_json_text, raw_values = mkvmergeutils.split_media_json(media_json_bytes)
+    json_obj_partial = mkvmergeutils.decode_media_json_text(media_json_text, raw_values)
+
+    # assert the unused sections are kept as raw json, in place
+    assert sorted(raw_values.keys()) == ["attachments", "chapters", "track_tags"]
+    assert json.loads(media_json_text)['attachments'] == None
+    assert list(json_obj_partial.keys()) == list(json_obj.keys())
+    assert isinstance(json_obj_partial['attachments'], mkvmergeutils.RawJsonValue)
+    assert json_obj_partial['attachments'].decode() == json_obj['attachments']
+    assert json_obj_partial['tracks'] == json_obj['tracks']
+    assert json_obj_partial == json_obj
+    assert json.dumps(json_obj_partial, default=mkvmergeutils.get_json_serializable_value) == json.dumps(json_obj)
+
+
+def test_split_media_json_other_layout():
+    # arrange
+    json_obj = { "attachments": [ { "id": 1 } ], "tracks": [] }
+    media_json_bytes = json.dumps(json_obj).encode("utf-8")
+
+    # act
+    media_json_text, raw_values = mkvmergeutils.split_media_json(media_json_bytes)
+
+    # assert documents that are not indented like mkvmerge output are fully decoded
+    assert raw_values == dict()
+    assert mkvmergeutils.decode_media_json(media_json_bytes, mkvmergeutils.MEDIA_JSON_RAW_KEYS) == json_obj
+    assert isinstance(mkvmergeutils.decode_media_json(media_json_bytes, mkvmergeutils.MEDIA_JSON_RAW_KEYS)['attachments'], list)
+
+
+def test_set_media_json_file_name():
+    # arrange
+    json_obj = { "container": { "type": "Matroska" }, "file_name": "/foo/old.mkv", "tracks": [] }
+    media_json_bytes = json.dumps(json_obj, indent=2).encode("utf-8")
+
+    # act
+    new_media_json_bytes = mkvmergeutils.set_media_json_file_name(media_json_bytes, "/bar/Élément \"new\".mkv")
+
+    # assert
+    json_obj['file_name'] = "/bar/Élément \"new\".mkv"
+    assert new_media_json_bytes == json.dumps(json_obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+    # assert the last key of the document
+    json_obj = { "container": { "type": "Matroska" }, "file_name": "/foo/old.mkv" }
+    media_json_bytes = json.dumps(json_obj, indent=2).encode("utf-8")
+    assert json.loads(mkvmergeutils.set_media_json_file_name(media_json_bytes, "/bar/new.mkv")) == { "container": { "type": "Matroska" }, "file_name": "/bar/new.mkv" }
+
+    # assert documents with another layout
+    assert mkvmergeutils.set_media_json_file_name(json.dumps(json_obj).encode("utf-8"), "/bar/new.mkv") == None
+
+
+def test_get_media_file_json_bytes_cache_hit_after_rename():
+    # arrange
+    temp_dir = testutils.get_empty_temp_dir_path("mkv4cafr.test_get_media_file_json_bytes_cache_hit_after_rename")
+    old_file_path = os.path.join(temp_dir, "old.mkv")
+    new_file_path = os.path.join(temp_dir, "new.mkv")
+    with open(old_file_path, "wb") as binary_file:
+        binary_file.write(b"0123456789")
+    probe_cache = cacheutils.open_probe_cache(temp_dir, 1024*1024)
+    json_obj = { "container": { "type": "Matroska" }, "file_name": old_file_path, "tracks": [] }
+    probe_cache.put(cacheutils.get_file_identity(old_file_path), old_file_path, json.dumps(json_obj, indent=2).encode("utf-8"))
+    os.rename(old_file_path, new_file_path)
+
+    # act
+    media_json_bytes = mkvmergeutils.get_media_file_json_bytes(new_file_path, probe_cache)
+    probe_cache.close()
+
+    # assert the cached output is used, with the path of the renamed file
+    json_obj['file_name'] = new_file_path
+    assert json.loads(media_json_bytes) == json_obj
@@ -0,0 +1,56 @@
+import pytest
+import os
+import sys
+import subprocess
+from tests import testutils
+from mkv4cafrlib import profileutils
+
+
+def test_get_stats_file_name():
+    assert profileutils.get_stats_file_name(0, "/foo/bar VFQ.mkv") == "00001-bar_VFQ.mkv.pstats"
+
+
+def test_run_profiler(capsys):
+    # arrange
+    dir_path = testutils.get_empty_temp_dir_path("mkv4cafr.test_run_profiler")
+    profiler = profileutils.RunProfiler(dir_path, 5)
+
+    def process(value: int) -> int:
+        subprocess.check_output([sys.executable, "-c", "pass"])
+        return value * 2
+
+    # act
+    result1 = profiler.profile("/foo/a.mkv", process, 1)
+    result2 = profiler.profile("/foo/b.mkv", process, 2)
+    profiler.print_summary()
+
+    # assert
+    assert result1 == 2
+    assert result2 == 4
+    assert sorted(os.listdir(dir_path)) == ["00001-a.mkv.pstats", "00002-b.mkv.pstats", profileutils.BATCH_STATS_FILE_NAME]
+    stats = profiler.get_batch_stats()
+    assert profileutils.get_subprocess_wait_time(stats) > 0
+    output = capsys.readouterr().out
+    assert "Profiled 2 files." in output
+    assert "waiting for subprocesses:" in output
+
+
+def test_run_profiler_same_file_profiled_again():
+    # arrange
+    dir_path = testutils.get_empty_temp_dir_path("mkv4cafr.test_run_profiler_same_file_profiled_again")
+    profiler = profileutils.RunProfiler(dir_path, 5)
+
+    def process(value: int) -> int:
+        return value * 2
+
+    # act (the same file processed in two batches of watch mode)
+    profiler.profile("/foo/a.mkv", process, 1)
+    profiler.profile("/foo/b.mkv", process, 2)
+    profiler.profile("/foo/a.mkv", process, 3)
+
+    # assert each run of a file has its own statistics file
+    assert sorted(os.listdir(dir_path)) == ["00001-a.mkv.pstats", "00002-b.mkv.pstats", "00003-a.mkv.pstats"]
+    assert len(set(profiler.stats_files)) == 3
+    stats = profiler.get_batch_stats()
+    process_calls = [total_calls for (file_name, line, function_name), (primitive_calls, total_calls, total_time, cumulative_time, callers) in stats.stats.items() if function_name == "process"]
+    assert process_calls == [3]
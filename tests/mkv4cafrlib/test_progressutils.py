@@ -0,0 +1,85 @@
+import pytest
+import io
+from mkv4cafrlib import progressutils
+
+
+class FakeTerminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_size_str():
+    assert progressutils.get_size_str(0) == "0 bytes"
+    assert progressutils.get_size_str(1536) == "1.5 KB"
+    assert progressutils.get_size_str(3*1024*1024*1024) == "3.0 GB"
+
+
+def test_progress_tracker_aggregates_tasks():
+    # arrange
+    tracker = progressutils.ProgressTracker(io.StringIO())
+
+    # act
+    task1 = tracker.begin_task("foo.mkv", 1000)
+    task2 = tracker.begin_task("bar.mkv", 3000)
+    tracker.update_task(task1, 1000)
+    tracker.update_task(task2, 1000)
+
+    # assert progress is weighted by size
+    assert tracker.get_totals() == (2000, 4000, 2)
+    assert tracker.get_status_str(None) == "Copying:  50% 2.0 KB of 3.9 KB (2 files)"
+
+    # assert completed tasks are removed
+    tracker.end_task(task1)
+    assert tracker.get_totals() == (1000, 3000, 1)
+
+
+def test_progress_tracker_terminal_refresh_rate():
+    # arrange
+    stream = FakeTerminal()
+    clock = FakeClock()
+    tracker = progressutils.ProgressTracker(stream, 2.0, clock=clock)
+
+    # act
+    task = tracker.begin_task("foo.mkv", 100)
+    for i in range(100):
+        tracker.update_task(task, i)
+    redraw_count_before = stream.getvalue().count("\r")
+    clock.now = 0.6
+    tracker.update_task(task, 100)
+    redraw_count_after = stream.getvalue().count("\r")
+
+    # assert redraws are limited to 2 per second
+    assert redraw_count_before == 1
+    assert redraw_count_after == 2
+
+    # act, assert the status line is erased when all tasks are completed
+    tracker.end_task(task)
+    assert stream.getvalue().endswith("\r")
+
+
+def test_progress_tracker_plain_text():
+    # arrange
+    stream = io.StringIO()
+    clock = FakeClock()
+    tracker = progressutils.ProgressTracker(stream, text_interval=10.0, clock=clock)
+
+    # act
+    task = tracker.begin_task("foo.mkv", 100)
+    tracker.update_task(task, 10)
+    clock.now = 10.0
+    tracker.update_task(task, 50)
+    clock.now = 15.0
+    tracker.update_task(task, 75)
+    tracker.write_output("Processing file 'bar.mkv'.\n")
+    tracker.end_task(task)
+
+    # assert
+    assert stream.getvalue() == "Copying:  50% 50 bytes of 100 bytes\nProcessing file 'bar.mkv'.\n"
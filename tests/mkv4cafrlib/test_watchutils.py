@@ -0,0 +1,78 @@
+import pytest
+import os
+import sys
+from tests import testutils
+from mkv4cafrlib import watchutils
+
+
+def write_file(file_path: str, content: bytes, mode: str = "wb"):
+    with open(file_path, mode) as file:
+        file.write(content)
+
+
+def test_stability_tracker():
+    # arrange
+    dir_path = testutils.get_empty_temp_dir_path("mkv4cafr.test_stability_tracker")
+    file_path = os.path.join(dir_path, "foo.mkv")
+    write_file(file_path, b"foo")
+    tracker = watchutils.StabilityTracker(5.0)
+
+    # act, assert a new file is not stable right away
+    tracker.add(file_path, 100.0)
+    assert tracker.pop_stable_paths(100.0) == []
+    assert tracker.pop_stable_paths(104.0) == []
+
+    # act, assert writing to the file restarts the settle time
+    write_file(file_path, b"bar", "ab")
+    assert tracker.pop_stable_paths(106.0) == []
+    assert tracker.pop_stable_paths(110.0) == []
+    assert tracker.pop_stable_paths(111.0) == [file_path]
+    assert tracker.get_pending_count() == 0
+
+    # act, assert deleted files are forgotten
+    tracker.add(file_path, 200.0)
+    os.remove(file_path)
+    assert tracker.pop_stable_paths(300.0) == []
+    assert tracker.get_pending_count() == 0
+
+
+def test_polling_watcher():
+    # arrange
+    dir_path = testutils.get_empty_temp_dir_path("mkv4cafr.test_polling_watcher")
+    write_file(os.path.join(dir_path, "existing.mkv"), b"foo")
+    watcher = watchutils.PollingWatcher(dir_path, ".mkv", False, False, 0.01)
+
+    # act, assert existing files are not reported
+    assert watcher.get_changed_paths(1.0) == []
+
+    # act, assert new and modified files are reported
+    write_file(os.path.join(dir_path, "new.mkv"), b"foo")
+    write_file(os.path.join(dir_path, "new.txt"), b"foo")
+    write_file(os.path.join(dir_path, "existing.mkv"), b"bar", "ab")
+    changed_paths = watcher.get_changed_paths(1.0)
+    assert sorted(changed_paths) == [os.path.join(dir_path, "existing.mkv"), os.path.join(dir_path, "new.mkv")]
+    watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_inotify_watcher():
+    # arrange
+    dir_path = testutils.get_empty_temp_dir_path("mkv4cafr.test_inotify_watcher")
+    watcher = watchutils.InotifyWatcher(dir_path, ".mkv", True, False)
+
+    # act
+    write_file(os.path.join(dir_path, "new.mkv"), b"foo")
+    write_file(os.path.join(dir_path, ".hidden.mkv"), b"foo")
+    write_file(os.path.join(dir_path, "new.txt"), b"foo")
+    changed_paths = watcher.get_changed_paths(1.0)
+
+    # assert
+    assert changed_paths == [os.path.join(dir_path, "new.mkv")]
+
+    # act, assert files in new subdirectories are reported
+    os.makedirs(os.path.join(dir_path, "subdir"))
+    assert watcher.get_changed_paths(1.0) == []
+    write_file(os.path.join(dir_path, "subdir", "sub.mkv"), b"foo")
+    changed_paths = watcher.get_changed_paths(1.0)
+    assert changed_paths == [os.path.join(dir_path, "subdir", "sub.mkv")]
+    watcher.close()
@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 import subprocess
 import coverage
 
@@ -35,6 +37,29 @@ def get_test_output_dir_path():
     return dir_path
 
 
+def get_fake_mkvtoolnix_dir_path():
+    dir_path = get_project_root_dir_path()
+    if (dir_path is None):
+        return None
+    dir_path = os.path.join(dir_path,"tools")
+    dir_path = os.path.join(dir_path,"fake_mkvtoolnix")
+    return dir_path
+
+
+def get_empty_temp_dir_path(name: str) -> str:
+    dir_path = os.path.join(tempfile.gettempdir(), name)
+    shutil.rmtree(dir_path, ignore_errors=True)
+    os.makedirs(dir_path)
+    return dir_path
+
+
+def get_temp_file_path(name: str) -> str:
+    file_path = os.path.join(tempfile.gettempdir(), name)
+    if (os.path.isfile(file_path)):
+        os.remove(file_path)
+    return file_path
+
+
 def run_mkv4cafr(additional_args: list) -> dict:
     # Output values
     output = dict()
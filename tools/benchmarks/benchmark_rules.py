@@ -0,0 +1,233 @@
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+
+from mkv4cafrlib import mkv4cafrlib
+from mkv4cafrlib import mkvmergeutils
+from mkv4cafrlib import jsonutils
+from tools.generate_medias import synthetic_medias
+
+# Constants
+DEFAULT_SEED = 1
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME_SECONDS = 0.2
+DEFAULT_THRESHOLD_PERCENT = 10.0
+TRACK_COUNTS = [3, 10, 50, 100, 500]
+DURATION_SECONDS = 5400
+NAME_LENGTHS = {
+    "short": 12,
+    "long": 120,
+    "very_long": 1000,
+}
+INPUT_FILE_NAME = "Movie Title (2021) VF2 1080p BluRay x264.mkv"
+NAME_WORDS = ["VFQ", "VFF", "VFI", "VO", "AD", "SDH", "DVD", "Canadian", "France", "TrueFrench",
+              "English", "Français", "Commentary", "Forced", "Stereo", "5.1", "Director's", "Cut",
+              "Atmos", "Dolby", "Original", "(VFQ)", "[VO]", "CA", "Cantina", "Advert"]
+ADVERSARIAL_NAME_LENGTHS = [256, 1024, 4096]
+ADVERSARIAL_NAME_PATTERNS = {
+    # a flag that is not delimited, at the end of a long word
+    "tail": lambda length: "x" * (length - 4) + "SDHx",
+    # flags repeated without delimiters
+    "repeated": lambda length: ("VOCA" * length)[:length],
+    # flags separated by delimiters
+    "delimited": lambda length: ("VO.CA-AD(SDH)" * length)[:length],
+}
+AUDIO_LANGUAGES = [("fre", "fr-CA"), ("fre", "fr-FR"), ("fre", "fr"), ("eng", "en"), ("und", "und")]
+
+
+def get_track_name(rng: random.Random, length: int) -> str:
+    words = list()
+    name_length = -1
+    while (name_length < length):
+        word = rng.choice(NAME_WORDS)
+        words.append(word)
+        name_length += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def create_media_document(seed: int, track_count: int, name_length: int) -> dict:
+    # Creates a document with the builder of the synthetic corpus, with a fixed number of tracks and names of a fixed length.
+    # The first track is a video track. The remaining tracks are 60% audio and 40% subtitles.
+    rng = random.Random(seed)
+    builder = synthetic_medias.MediaBuilder(rng, DURATION_SECONDS)
+    builder.add_video_track(synthetic_medias.VIDEO_CODECS[0], "1080p", "Movie Title (2021) 1080p")
+    while (len(builder.tracks) < track_count):
+        if (rng.random() < 0.6):
+            language, language_ietf = rng.choice(AUDIO_LANGUAGES)
+            builder.add_audio_track(language, language_ietf, get_track_name(rng, name_length))
+        else:
+            language, language_ietf, full_name, forced_name = rng.choice(synthetic_medias.SUBTITLES_LANGUAGES)
+            builder.add_subtitles_track(synthetic_medias.SUBTITLES_CODECS[0], language, language_ietf, get_track_name(rng, name_length), rng.choice([12, 45, 900, 1500]))
+    return builder.get_media_info(INPUT_FILE_NAME, "Movie Title (2021)", 12)
+
+
+def get_benchmarks(json_obj: dict) -> dict:
+    # Returns the functions to measure, with their arguments bound to the given document.
+    # Each benchmark receives the output of the previous steps of the pipeline, as in `process_file()`.
+    json_copy = mkv4cafrlib.update_properties_as_per_preferences(json_obj, INPUT_FILE_NAME)
+    json_diff = mkv4cafrlib.compute_json_differences(json_obj, json_copy)
+    tracks = json_obj['tracks']
+
+    def get_all_track_name_flags_array():
+        for track in tracks:
+            mkvmergeutils.get_track_name_flags_array(track)
+
+    benchmarks = dict()
+    benchmarks['update_properties_as_per_preferences'] = lambda: mkv4cafrlib.update_properties_as_per_preferences(json_obj, INPUT_FILE_NAME)
+    benchmarks['compute_json_differences'] = lambda: mkv4cafrlib.compute_json_differences(json_obj, json_copy)
+    benchmarks['get_mkvpropedit_args_for_diff'] = lambda: mkv4cafrlib.get_mkvpropedit_args_for_diff(json_diff, INPUT_FILE_NAME)
+    benchmarks['get_track_name_flags_array'] = get_all_track_name_flags_array
+    benchmarks['dump_details'] = lambda: jsonutils.dump_details(json_obj)
+    return benchmarks
+
+
+def get_flag_benchmarks(name: str) -> dict:
+    # Returns the functions that extract flags from a single name.
+    # The cache of the track name flags is bypassed to measure the parsing of the name.
+    benchmarks = dict()
+    benchmarks['get_flags_array_for_track_name'] = lambda: mkvmergeutils.get_flags_array_for_track_name.__wrapped__(name, "")
+    benchmarks['get_track_name_flags_from_filename'] = lambda: mkvmergeutils.get_track_name_flags_from_filename(name)
+    return benchmarks
+
+
+def measure(func, repeat: int, min_time: float) -> dict:
+    # Calls the function in loops that last at least `min_time` seconds, `repeat` times.
+    # Returns the time per call in microseconds.
+    loops = 1
+    while (True):
+        start_time = time.perf_counter()
+        for i in range(loops):
+            func()
+        elapsed_time = time.perf_counter() - start_time
+        if (elapsed_time >= min_time):
+            break
+        loops *= 10 if elapsed_time < min_time / 10 else 2
+
+    timings = [elapsed_time / loops]
+    for i in range(repeat - 1):
+        start_time = time.perf_counter()
+        for i in range(loops):
+            func()
+        timings.append((time.perf_counter() - start_time) / loops)
+
+    result = dict()
+    result['loops'] = loops
+    result['min_us'] = min(timings) * 1000000.0
+    result['median_us'] = statistics.median(timings) * 1000000.0
+    return result
+
+
+def run_benchmarks(args) -> dict:
+    results = dict()
+    for track_count in TRACK_COUNTS:
+        for name_length_name, name_length in NAME_LENGTHS.items():
+            json_obj = create_media_document(args.seed, track_count, name_length)
+
+            # The rules print warnings about the VF2 file name. Do not mix them with the results.
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmarks = get_benchmarks(json_obj)
+
+            for function_name, func in benchmarks.items():
+                case_name = "{0}[tracks={1},names={2}]".format(function_name, track_count, name_length_name)
+                if (args.filter is not None and case_name.find(args.filter) == -1):
+                    continue
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = measure(func, args.repeat, args.min_time)
+                result['function'] = function_name
+                result['tracks'] = track_count
+                result['names'] = name_length_name
+                results[case_name] = result
+                print("{0:<70} {1:>12.1f} us".format(case_name, result['median_us']), flush=True)
+
+    # Adversarial names. The time should grow linearly with the length of the name.
+    for pattern_name, create_name in ADVERSARIAL_NAME_PATTERNS.items():
+        for name_length in ADVERSARIAL_NAME_LENGTHS:
+            benchmarks = get_flag_benchmarks(create_name(name_length))
+            for function_name, func in benchmarks.items():
+                case_name = "{0}[length={1},pattern={2}]".format(function_name, name_length, pattern_name)
+                if (args.filter is not None and case_name.find(args.filter) == -1):
+                    continue
+
+                result = measure(func, args.repeat, args.min_time)
+                result['function'] = function_name
+                result['length'] = name_length
+                result['pattern'] = pattern_name
+                results[case_name] = result
+                print("{0:<70} {1:>12.1f} us".format(case_name, result['median_us']), flush=True)
+    return results
+
+
+def compare_results(base_path: str, new_path: str, threshold: float) -> int:
+    # Prints the change of the median time of each case found in both files.
+    # Returns the number of cases that are slower by more than `threshold` percent.
+    with open(base_path, 'r', encoding="utf-8") as file:
+        base_results = json.load(file)['results']
+    with open(new_path, 'r', encoding="utf-8") as file:
+        new_results = json.load(file)['results']
+
+    regression_count = 0
+    for case_name, new_result in new_results.items():
+        if (not case_name in base_results):
+            continue
+        base_time = base_results[case_name]['median_us']
+        new_time = new_results[case_name]['median_us']
+        change = (new_time - base_time) / base_time * 100.0 if base_time > 0 else 0.0
+        marker = ""
+        if (change > threshold):
+            marker = " SLOWER"
+            regression_count += 1
+        elif (change < -threshold):
+            marker = " faster"
+        print("{0:<70} {1:>12.1f} us {2:>12.1f} us {3:>+8.1f}%{4}".format(case_name, base_time, new_time, change, marker))
+
+    print("")
+    print(str(regression_count) + " cases are more than " + str(threshold) + "% slower.")
+    return regression_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the rule engine and the diff engine on synthetic mkvmerge documents.')
+    parser.add_argument('-o', '--output', help='Write the results to this json file.')
+    parser.add_argument('-c', '--compare', nargs=2, metavar=('BASE', 'NEW'), help='Compare two results files instead of running the benchmarks.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_PERCENT, help='Percentage of change considered as a regression when comparing results.')
+    parser.add_argument('--filter', help='Only run the cases whose name contains this string.')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Number of measurements of each case.')
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME_SECONDS, help='Minimum duration of a measurement, in seconds.')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Seed of the synthetic documents.')
+
+    try:
+        args = parser.parse_args()
+    except Exception as e:
+        print(str(e))
+        return 1
+
+    if (args.compare is not None):
+        regression_count = compare_results(args.compare[0], args.compare[1], args.threshold)
+        return 1 if regression_count > 0 else 0
+
+    results = run_benchmarks(args)
+
+    if (args.output is not None):
+        output = dict()
+        output['python'] = platform.python_version()
+        output['platform'] = platform.platform()
+        output['time'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        output['seed'] = args.seed
+        output['repeat'] = args.repeat
+        output['results'] = results
+        with open(args.output, 'w', encoding="utf-8") as file:
+            json.dump(output, file, indent=2)
+        print("Results written to file '" + args.output + "'.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
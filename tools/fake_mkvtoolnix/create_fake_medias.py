@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+import argparse
+
+from tools.generate_medias import synthetic_medias
+
+# Constants
+DEFAULT_COUNT = 1000
+
+
+def create_fake_medias(output_dir: str, count: int, seed: int):
+    # Writes fake media files for the fake `mkvmerge` and `mkvpropedit` tools.
+    # Each `.mkv` file contains a synthetic `mkvmerge -J` document.
+    os.makedirs(output_dir, exist_ok=True)
+    for index in range(count):
+        json_obj = synthetic_medias.create_media_info(seed, index)
+        file_name = synthetic_medias.get_corpus_file_name(json_obj, index)[:-len(".json")] + ".mkv"
+        with open(os.path.join(output_dir, file_name), "w", encoding="utf-8") as file:
+            json.dump(json_obj, file, indent=2, ensure_ascii=False)
+        if ((index + 1) % 10000 == 0 or index + 1 == count):
+            print("Created " + str(index + 1) + " of " + str(count) + " fake media files.", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Creates fake media files for the fake MKVToolNix tools.')
+    parser.add_argument('output_dir', help='Directory where the fake media files are created.')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT, help='Number of fake media files to create.')
+    parser.add_argument('--seed', type=int, default=synthetic_medias.DEFAULT_SEED, help='Seed of the synthetic documents.')
+    args = parser.parse_args()
+
+    create_fake_medias(args.output_dir, args.count, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import random
+
+# Stand-in for the `mkvmerge` and `mkvpropedit` executables of MKVToolNix.
+# Add the directory of this file at the beginning of the PATH environment variable to use them.
+#
+# A fake media file is a text file that contains the output of `mkvmerge -J` for that file.
+# `mkvmerge -J` prints the content of the file and `mkvpropedit` applies its edits to the content of the file.
+# The output of `mkvmerge -J` can also be served from a fixture directory instead, for files that are not fake media files.
+#
+# Environment variables:
+#   FAKE_MKVTOOLNIX_FIXTURES:     directory of `<file name without extension>.json` files served by `mkvmerge -J`.
+#   FAKE_MKVTOOLNIX_LATENCY:      seconds added to each execution.
+#   FAKE_MKVTOOLNIX_JITTER:       maximum number of random seconds added to the latency.
+#   FAKE_MKVTOOLNIX_FAILURE_RATE: probability, between 0 and 1, that an execution fails.
+#   FAKE_MKVTOOLNIX_FAIL_PATTERN: executions on a file whose path contains this string always fail.
+#   FAKE_MKVTOOLNIX_SEED:         seed of the jitter and of the failures.
+#   FAKE_MKVTOOLNIX_LOG:          json lines file where the arguments of each execution are appended.
+#
+# The jitter and the failures of a file only depend on the seed, the tool and the name of the file.
+# A run can be reproduced exactly, whatever the order in which files are processed.
+
+# Constants
+ENV_FIXTURES = "FAKE_MKVTOOLNIX_FIXTURES"
+ENV_LATENCY = "FAKE_MKVTOOLNIX_LATENCY"
+ENV_JITTER = "FAKE_MKVTOOLNIX_JITTER"
+ENV_FAILURE_RATE = "FAKE_MKVTOOLNIX_FAILURE_RATE"
+ENV_FAIL_PATTERN = "FAKE_MKVTOOLNIX_FAIL_PATTERN"
+ENV_SEED = "FAKE_MKVTOOLNIX_SEED"
+ENV_LOG = "FAKE_MKVTOOLNIX_LOG"
+EXIT_CODE_SUCCESS = 0
+EXIT_CODE_ERROR = 2 # MKVToolNix exits with 2 on errors
+VERSION = "v89.0 ('And the Melody Still Lingers On (Night in Tunisia)') 64-bit"
+
+# mkvpropedit property names, and the mkvmerge property each one edits
+MKVPROPEDIT_TRACK_PROPERTIES = {
+    "flag-default": "default_track",
+    "flag-enabled": "enabled_track",
+    "flag-forced": "forced_track",
+    "language": "language",
+    "language-ietf": "language_ietf",
+    "name": "track_name",
+}
+MKVPROPEDIT_BOOLEAN_PROPERTIES = ["flag-default", "flag-enabled", "flag-forced"]
+
+
+class ToolError(Exception):
+    pass
+
+
+def get_env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if (value is None or value == ""):
+        return default
+    return float(value)
+
+
+def get_file_random(tool_name: str, file_path: str) -> random.Random:
+    seed = os.environ.get(ENV_SEED, "0")
+    return random.Random("{0}-{1}-{2}".format(seed, tool_name, os.path.basename(file_path)))
+
+
+def simulate_latency(rng: random.Random):
+    latency = get_env_float(ENV_LATENCY, 0.0)
+    jitter = get_env_float(ENV_JITTER, 0.0)
+    delay = latency + rng.uniform(0.0, jitter)
+    if (delay > 0):
+        time.sleep(delay)
+
+
+def is_failure_injected(rng: random.Random, file_path: str) -> bool:
+    fail_pattern = os.environ.get(ENV_FAIL_PATTERN)
+    if (fail_pattern is not None and fail_pattern != "" and file_path.find(fail_pattern) != -1):
+        return True
+    return rng.random() < get_env_float(ENV_FAILURE_RATE, 0.0)
+
+
+def write_log(tool_name: str, argv: list, exit_code: int, duration: float):
+    log_path = os.environ.get(ENV_LOG)
+    if (log_path is None or log_path == ""):
+        return
+    record = dict()
+    record['tool'] = tool_name
+    record['argv'] = argv
+    record['exit_code'] = exit_code
+    record['duration'] = duration
+    record['time'] = time.time()
+    record['pid'] = os.getpid()
+    # A single write in append mode. Lines of concurrent executions are not mixed.
+    with open(log_path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(record) + "\n")
+
+
+def read_fake_media_file(file_path: str) -> dict:
+    try:
+        with open(file_path, "rb") as file:
+            data = file.read()
+    except OSError as e:
+        raise ToolError("The file '" + file_path + "' could not be opened for reading: " + str(e))
+    if (not data.lstrip().startswith(b'{')):
+        return None
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        raise ToolError("The file '" + file_path + "' is not a valid fake media file: " + str(e))
+
+
+def read_fixture(file_path: str) -> dict:
+    fixtures_dir = os.environ.get(ENV_FIXTURES)
+    if (fixtures_dir is None or fixtures_dir == ""):
+        return None
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    fixture_path = os.path.join(fixtures_dir, file_name + ".json")
+    if (not os.path.isfile(fixture_path)):
+        return None
+    with open(fixture_path, "rb") as file:
+        return json.load(file)
+
+
+def get_media_info(file_path: str) -> dict:
+    # Fixtures have priority over the content of the file
+    json_obj = read_fixture(file_path)
+    if (json_obj is None):
+        if (not os.path.isfile(file_path)):
+            raise ToolError("The file '" + file_path + "' could not be opened for reading: No such file or directory.")
+        json_obj = read_fake_media_file(file_path)
+    if (json_obj is None):
+        raise ToolError("The type of file '" + file_path + "' could not be recognized.")
+    json_obj['file_name'] = file_path
+    return json_obj
+
+
+def run_mkvmerge(argv: list, rng_factory) -> int:
+    if (len(argv) == 1 and argv[0] in ["-V", "--version"]):
+        print("mkvmerge " + VERSION)
+        return EXIT_CODE_SUCCESS
+    if (len(argv) != 2 or argv[0] not in ["-J", "--identification-format=json"]):
+        raise ToolError("Only `mkvmerge -J <file>` is supported.")
+    file_path = argv[1]
+    rng = rng_factory(file_path)
+    simulate_latency(rng)
+    if (is_failure_injected(rng, file_path)):
+        raise ToolError("Simulated failure while identifying file '" + file_path + "'.")
+    json_obj = get_media_info(file_path)
+    sys.stdout.flush()
+    sys.stdout.buffer.write((json.dumps(json_obj, indent=2, ensure_ascii=False) + "\n").encode("utf-8"))
+    return EXIT_CODE_SUCCESS
+
+
+def apply_property_edit(properties: dict, name: str, value):
+    if (value is None):
+        properties.pop(name, None)
+    else:
+        properties[name] = value
+
+
+def apply_mkvpropedit_args(json_obj: dict, args: list):
+    # Applies `--edit <selector>` followed by `--set <name>=<value>` and `--delete <name>` arguments
+    properties = None
+    is_track = False
+    i = 0
+    while (i < len(args)):
+        if (i + 1 >= len(args)):
+            raise ToolError("Missing value for argument '" + args[i] + "'.")
+        option = args[i]
+        value = args[i + 1]
+        i += 2
+        if (option in ["-e", "--edit"]):
+            if (value in ["info", "segment_info"]):
+                properties = json_obj['container'].setdefault('properties', dict())
+                is_track = False
+            elif (value.startswith("track:")):
+                # mkvpropedit's track numbers start at 1
+                track_number = int(value[len("track:"):])
+                tracks = json_obj['tracks'] if 'tracks' in json_obj else list()
+                if (track_number < 1 or track_number > len(tracks)):
+                    raise ToolError("No track corresponding to the edit specification '" + value + "' was found.")
+                properties = tracks[track_number - 1].setdefault('properties', dict())
+                is_track = True
+            else:
+                raise ToolError("Unsupported edit specification '" + value + "'.")
+            continue
+        if (properties is None):
+            raise ToolError("No edit specification given before '" + option + "'.")
+        if (option in ["-s", "--set"]):
+            name, separator, property_value = value.partition("=")
+            if (separator == ""):
+                raise ToolError("Invalid property assignment '" + value + "'.")
+        elif (option in ["-d", "--delete"]):
+            name = value
+            property_value = None
+        else:
+            raise ToolError("Unsupported argument '" + option + "'.")
+
+        if (not is_track):
+            if (name != "title"):
+                raise ToolError("Unsupported segment information property '" + name + "'.")
+            apply_property_edit(properties, name, property_value)
+            continue
+        if (not name in MKVPROPEDIT_TRACK_PROPERTIES):
+            raise ToolError("Unsupported track property '" + name + "'.")
+        if (property_value is not None and name in MKVPROPEDIT_BOOLEAN_PROPERTIES):
+            property_value = property_value.lower() in ["1", "true"]
+        apply_property_edit(properties, MKVPROPEDIT_TRACK_PROPERTIES[name], property_value)
+
+
+def run_mkvpropedit(argv: list, rng_factory) -> int:
+    if (len(argv) == 1 and argv[0] in ["-V", "--version"]):
+        print("mkvpropedit " + VERSION)
+        return EXIT_CODE_SUCCESS
+    if (len(argv) < 1):
+        raise ToolError("No file name given.")
+    file_path = argv[0]
+    rng = rng_factory(file_path)
+    print("The file is being analyzed.")
+    simulate_latency(rng)
+    if (is_failure_injected(rng, file_path)):
+        raise ToolError("Simulated failure while editing file '" + file_path + "'.")
+
+    # Files served from the fixture directory are not modified. Only the arguments are logged.
+    json_obj = read_fake_media_file(file_path) if os.path.isfile(file_path) else None
+    if (json_obj is None):
+        fixture = read_fixture(file_path)
+        if (fixture is None):
+            raise ToolError("The file '" + file_path + "' could not be opened for reading and writing.")
+        apply_mkvpropedit_args(fixture, argv[1:])
+    else:
+        apply_mkvpropedit_args(json_obj, argv[1:])
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(json_obj, file, indent=2, ensure_ascii=False)
+    print("The changes are written to the file.")
+    print("Done.")
+    return EXIT_CODE_SUCCESS
+
+
+def run_tool(tool_name: str, argv: list) -> int:
+    start_time = time.monotonic()
+    rng_factory = lambda file_path: get_file_random(tool_name, file_path)
+    try:
+        match tool_name:
+            case "mkvmerge":
+                exit_code = run_mkvmerge(argv, rng_factory)
+            case "mkvpropedit":
+                exit_code = run_mkvpropedit(argv, rng_factory)
+            case _:
+                raise ToolError("Unknown tool '" + tool_name + "'.")
+    except (ToolError, ValueError) as e:
+        # MKVToolNix prints its errors on stdout
+        print("Error: " + str(e))
+        exit_code = EXIT_CODE_ERROR
+    sys.stdout.flush()
+    write_log(tool_name, [tool_name] + argv, exit_code, time.monotonic() - start_time)
+    return exit_code
@@ -1,10 +1,12 @@
 import os
 import sys
+import argparse
 import subprocess
 
 from mkv4cafrlib import findutils
 from mkv4cafrlib import ffmpegutils
 from mkv4cafrlib import mkvtoolnixutils
+from tools.generate_medias import synthetic_medias
 
 # Constants
 # N/A
@@ -257,6 +259,18 @@ def generate_mkv_files():
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Generates the media files used by the unit tests.')
+    parser.add_argument('--synthetic', metavar='DIR', help='Write synthetic `mkvmerge -J` documents to this directory instead of encoding media files. Neither ffmpeg nor MKVToolNix is required.')
+    parser.add_argument('--count', type=int, default=synthetic_medias.DEFAULT_CORPUS_SIZE, help='Number of synthetic documents to generate.')
+    parser.add_argument('--seed', type=int, default=synthetic_medias.DEFAULT_SEED, help='Seed of the synthetic documents. The same seed always generates the same documents.')
+    args = parser.parse_args()
+
+    if (args.synthetic is not None):
+        print_step_header("generate_synthetic_corpus()")
+        synthetic_medias.generate_corpus(args.synthetic, args.count, args.seed)
+        print("done.")
+        return
+
     # Find ffmpeg in path
     ffmpeg_exec_path = ffmpegutils.find_ffmpeg_exec_path_in_path()
     if ffmpeg_exec_path is None or not os.path.isfile(ffmpeg_exec_path):
@@ -0,0 +1,305 @@
+import os
+import json
+import random
+
+# Constants
+DEFAULT_CORPUS_SIZE = 100000
+DEFAULT_SEED = 1
+IDENTIFICATION_FORMAT_VERSION = 19
+WRITING_APPLICATION = "mkvmerge v89.0 ('And the Melody Still Lingers On (Night in Tunisia)') 64-bit"
+MUXING_APPLICATION = "libebml v1.4.5 + libmatroska v1.7.1"
+
+TITLE_WORDS = ["The", "Last", "Silent", "River", "Night", "Winter", "Storm", "Secret", "Garden", "City",
+               "Lost", "Shadow", "King", "Queen", "Island", "Road", "Fire", "Ocean", "Dream", "Empire",
+               "Blue", "Broken", "Golden", "Hidden", "Wild", "Dark", "Light", "Summer", "Echo", "Stone"]
+RESOLUTIONS = ["480p", "576p", "720p", "1080p", "2160p"]
+SOURCES = ["BluRay", "WEB-DL", "WEBRip", "HDTV", "DVDRip", "Remux"]
+VIDEO_CODECS = [("AVC/H.264/MPEG-4p10", "V_MPEG4/ISO/AVC", "x264"), ("HEVC/H.265/MPEG-H", "V_MPEGH/ISO/HEVC", "x265"), ("MPEG-1/2", "V_MPEG2", "MPEG2"), ("AV1", "V_AV1", "AV1")]
+AUDIO_CODECS = [("AC-3", "A_AC3"), ("E-AC-3", "A_EAC3"), ("DTS", "A_DTS"), ("AAC", "A_AAC"), ("FLAC", "A_FLAC"), ("Opus", "A_OPUS"), ("TrueHD", "A_TRUEHD"), ("MP3", "A_MPEG/L3")]
+AUDIO_CHANNELS = [1, 2, 2, 6, 6, 6, 8]
+SUBTITLES_CODECS = [("SubRip/SRT", "S_TEXT/UTF8"), ("SubStationAlpha", "S_TEXT/ASS"), ("HDMV PGS", "S_HDMV/PGS"), ("VobSub", "S_VOBSUB")]
+
+# Release flags found in file names, and how often they occur
+FILE_NAME_FLAGS = [("VF2", 20), ("VFQ", 20), ("VFF", 15), ("TrueFrench", 5), ("VFI", 5), ("VOF", 2), ("VO", 8), ("MULTi", 10), (None, 15)]
+
+# Track names used by release groups for each kind of French audio track
+VFQ_TRACK_NAMES = ["VFQ", "Français (VFQ)", "French Canadian", "Québécois", "FR-CA", "Canadien", "VFQ AC3 5.1", "French (Canada)"]
+VFF_TRACK_NAMES = ["VFF", "Français (VFF)", "TrueFrench", "French (France)", "VOF", "FR", "France", "VFF DTS-HD MA"]
+VFI_TRACK_NAMES = ["VFI", "Français (VFI)", "French International"]
+FRENCH_TRACK_NAMES = ["Français", "French", "FR", ""]
+ENGLISH_TRACK_NAMES = ["English", "VO", "English (VO)", "Original", "English Atmos", ""]
+AD_TRACK_NAMES = ["Audio Description", "AD", "English (AD)", "Français AD"]
+COMMENTARY_TRACK_NAMES = ["Commentary", "Director's Commentary", "Commentaire du réalisateur"]
+OTHER_AUDIO_LANGUAGES = [("spa", "es"), ("ger", "de"), ("ita", "it"), ("jpn", "ja"), ("por", "pt-BR")]
+
+# Subtitles languages: (language, language_ietf, full name, forced name)
+SUBTITLES_LANGUAGES = [("fre", "fr", "Français", "Français (Forcés)"), ("fre", "fr-CA", "Français Canadien", "Forced VFQ"),
+                       ("eng", "en", "English", "English (Forced)"), ("spa", "es", "Español", "Español (Forzados)"),
+                       ("ger", "de", "Deutsch", "Deutsch (Erzwungen)"), ("jpn", "ja", "日本語", "日本語 (強制)")]
+
+FONT_NAMES = ["arial.ttf", "ariblk.ttf", "comic.ttf", "georgia.ttf", "impact.ttf", "tahoma.ttf", "times.ttf", "trebuc.ttf", "verdana.ttf", "NotoSansJP-Regular.otf"]
+
+
+def get_weighted_choice(rng: random.Random, choices: list):
+    values = [choice[0] for choice in choices]
+    weights = [choice[1] for choice in choices]
+    return rng.choices(values, weights)[0]
+
+
+def get_language_ietf(rng: random.Random, language_ietf: str) -> str:
+    # Files muxed with old versions of mkvmerge have no 'language_ietf' property.
+    # Release groups also often leave regional French tracks as plain 'fr'.
+    if (rng.random() < 0.1):
+        return None
+    if (language_ietf.startswith("fr-") and rng.random() < 0.3):
+        return "fr"
+    return language_ietf
+
+
+def get_hex_string(rng: random.Random, length: int) -> str:
+    return "%0*x" % (length, rng.getrandbits(length * 4))
+
+
+class MediaBuilder:
+    # Builds a document with the same structure as the output of `mkvmerge -J`.
+    def __init__(self, rng: random.Random, duration_seconds: int):
+        self.rng = rng
+        self.duration_seconds = duration_seconds
+        self.tracks = list()
+        self.attachments = list()
+
+    def get_common_properties(self, codec_id: str, language: str, language_ietf: str, track_name: str) -> dict:
+        properties = dict()
+        properties['codec_id'] = codec_id
+        properties['default_track'] = False
+        properties['enabled_track'] = True
+        properties['forced_track'] = False
+        properties['language'] = language
+        language_ietf = get_language_ietf(self.rng, language_ietf)
+        if (language_ietf is not None):
+            properties['language_ietf'] = language_ietf
+        properties['minimum_timestamp'] = 0
+        properties['number'] = len(self.tracks) + 1
+        if (track_name is not None and track_name != ""):
+            properties['track_name'] = track_name
+        properties['uid'] = self.rng.getrandbits(63)
+        return properties
+
+    def set_statistics_tags(self, properties: dict, number_of_frames: int, bps: int):
+        properties['tag__statistics_tags'] = "BPS DURATION NUMBER_OF_FRAMES NUMBER_OF_BYTES"
+        properties['tag__statistics_writing_app'] = WRITING_APPLICATION
+        properties['tag__statistics_writing_date_utc'] = "2025-03-24 00:48:43"
+        properties['tag_bps'] = str(bps)
+        properties['tag_duration'] = "{0:02d}:{1:02d}:{2:02d}.000000000".format(self.duration_seconds // 3600, self.duration_seconds // 60 % 60, self.duration_seconds % 60)
+        properties['tag_number_of_bytes'] = str(bps * self.duration_seconds // 8)
+        properties['tag_number_of_frames'] = str(number_of_frames)
+
+    def add_track(self, track_type: str, codec: str, properties: dict):
+        track = dict()
+        track['codec'] = codec
+        track['id'] = len(self.tracks)
+        track['properties'] = properties
+        track['type'] = track_type
+        self.tracks.append(track)
+        return track
+
+    def add_video_track(self, video_codec: tuple, resolution: str, track_name: str):
+        codec, codec_id, codec_short_name = video_codec
+        height = int(resolution[:-1])
+        width = height * 16 // 9
+        properties = self.get_common_properties(codec_id, "und", "und", track_name)
+        properties['codec_private_data'] = get_hex_string(self.rng, 88)
+        properties['codec_private_length'] = 44
+        properties['default_duration'] = 41708333
+        properties['display_dimensions'] = "{0}x{1}".format(width, height)
+        properties['display_unit'] = 0
+        properties['num_index_entries'] = self.duration_seconds // 2
+        properties['packetizer'] = "mpeg4_p10_video" if codec_short_name == "x264" else "mpegh_p2_video"
+        properties['pixel_dimensions'] = "{0}x{1}".format(width, height)
+        self.set_statistics_tags(properties, int(self.duration_seconds * 23.976), self.rng.randint(2000000, 40000000))
+        self.add_track("video", codec, properties)
+
+    def add_audio_track(self, language: str, language_ietf: str, track_name: str):
+        codec, codec_id = self.rng.choice(AUDIO_CODECS)
+        properties = self.get_common_properties(codec_id, language, language_ietf, track_name)
+        properties['audio_channels'] = self.rng.choice(AUDIO_CHANNELS)
+        properties['audio_sampling_frequency'] = self.rng.choice([44100, 48000, 48000, 96000])
+        properties['codec_private_length'] = 0
+        properties['default_duration'] = 32000000
+        properties['num_index_entries'] = 0
+        self.set_statistics_tags(properties, self.duration_seconds * 31, self.rng.choice([128000, 192000, 384000, 640000, 1509000]))
+        self.add_track("audio", codec, properties)
+
+    def add_subtitles_track(self, subtitles_codec: tuple, language: str, language_ietf: str, track_name: str, number_of_frames: int):
+        codec, codec_id = subtitles_codec
+        properties = self.get_common_properties(codec_id, language, language_ietf, track_name)
+        if (codec_id == "S_TEXT/ASS"):
+            properties['codec_private_data'] = get_hex_string(self.rng, 512)
+            properties['codec_private_length'] = 256
+        properties['num_index_entries'] = 0
+        properties['text_subtitles'] = codec_id.startswith("S_TEXT")
+        # Some muxers do not write statistics tags. The number of frames is then unknown.
+        if (number_of_frames is not None):
+            self.set_statistics_tags(properties, number_of_frames, 120)
+        self.add_track("subtitles", codec, properties)
+
+    def add_font_attachments(self, count: int):
+        for font_name in self.rng.sample(FONT_NAMES, min(count, len(FONT_NAMES))):
+            attachment = dict()
+            attachment['content_type'] = "font/otf" if font_name.endswith(".otf") else "font/ttf"
+            attachment['description'] = ""
+            attachment['file_name'] = font_name
+            attachment['id'] = len(self.attachments) + 1
+            attachment['properties'] = { "uid": self.rng.getrandbits(63) }
+            attachment['size'] = self.rng.randint(20000, 15000000)
+            self.attachments.append(attachment)
+
+    def get_media_info(self, file_name: str, title: str, chapters_count: int) -> dict:
+        # The first video track and the first audio track are flagged as default. Other tracks have random flags.
+        for track_type in ["video", "audio"]:
+            for track in self.tracks:
+                if (track['type'] == track_type):
+                    track['properties']['default_track'] = True
+                    break
+        for track in self.tracks:
+            if (track['type'] != "video" and self.rng.random() < 0.05):
+                track['properties']['default_track'] = True
+
+        container_properties = dict()
+        container_properties['container_type'] = 17
+        container_properties['date_local'] = "2025-03-23T20:48:43-04:00"
+        container_properties['date_utc'] = "2025-03-24T00:48:43Z"
+        container_properties['duration'] = self.duration_seconds * 1000000000
+        container_properties['is_providing_timestamps'] = True
+        container_properties['muxing_application'] = MUXING_APPLICATION
+        container_properties['segment_uid'] = get_hex_string(self.rng, 32)
+        container_properties['timestamp_scale'] = 1000000
+        if (title is not None):
+            container_properties['title'] = title
+        container_properties['writing_application'] = WRITING_APPLICATION
+
+        json_obj = dict()
+        json_obj['attachments'] = self.attachments
+        json_obj['chapters'] = [ { "num_entries": chapters_count } ] if chapters_count > 0 else list()
+        json_obj['container'] = { "properties": container_properties, "recognized": True, "supported": True, "type": "Matroska" }
+        json_obj['errors'] = list()
+        json_obj['file_name'] = file_name
+        json_obj['global_tags'] = [ { "num_entries": 3 } ] if self.rng.random() < 0.3 else list()
+        json_obj['identification_format_version'] = IDENTIFICATION_FORMAT_VERSION
+        json_obj['track_tags'] = [ { "num_entries": 7, "track_id": track['id'] } for track in self.tracks if 'tag_bps' in track['properties'] ]
+        json_obj['tracks'] = self.tracks
+        json_obj['warnings'] = list()
+        return json_obj
+
+
+def get_release_title(rng: random.Random) -> tuple:
+    # Returns the title of a movie or of an episode of a series, and the duration of the video
+    words = rng.sample(TITLE_WORDS, rng.randint(1, 4))
+    title = " ".join(words)
+    if (rng.random() < 0.35):
+        season = rng.randint(1, 12)
+        episode = rng.randint(1, 24)
+        return ("{0} S{1:02d}E{2:02d}".format(title, season, episode), rng.randint(20, 60) * 60)
+    return ("{0} ({1})".format(title, rng.randint(1950, 2025)), rng.randint(80, 180) * 60)
+
+
+def get_release_file_name(title: str, file_name_flag: str, resolution: str, source: str, video_codec_name: str, group: str) -> str:
+    # Examples:
+    #   The Silent River (1998) VF2 1080p BluRay x264-GRP.mkv
+    #   Lost Empire S02E05 VFQ 720p WEB-DL x265-GRP.mkv
+    parts = [title]
+    if (file_name_flag is not None):
+        parts.append(file_name_flag)
+    parts.append(resolution)
+    parts.append(source)
+    parts.append(video_codec_name + "-" + group)
+    return " ".join(parts) + ".mkv"
+
+
+def add_french_audio_tracks(builder: MediaBuilder, rng: random.Random, file_name_flag: str):
+    # Add the French audio tracks advertised by the file name.
+    # The name of the track does not always agree with its language properties.
+    if (file_name_flag == "VF2"):
+        builder.add_audio_track("fre", "fr-CA", rng.choice(VFQ_TRACK_NAMES + FRENCH_TRACK_NAMES))
+        builder.add_audio_track("fre", "fr-FR", rng.choice(VFF_TRACK_NAMES + FRENCH_TRACK_NAMES))
+    elif (file_name_flag == "VFQ"):
+        builder.add_audio_track("fre", "fr-CA", rng.choice(VFQ_TRACK_NAMES + FRENCH_TRACK_NAMES))
+    elif (file_name_flag in ["VFF", "TrueFrench", "VOF"]):
+        builder.add_audio_track("fre", "fr-FR", rng.choice(VFF_TRACK_NAMES + FRENCH_TRACK_NAMES))
+    elif (file_name_flag == "VFI"):
+        builder.add_audio_track("fre", "fr", rng.choice(VFI_TRACK_NAMES + FRENCH_TRACK_NAMES))
+    elif (file_name_flag == "MULTi"):
+        for i in range(rng.randint(1, 2)):
+            builder.add_audio_track(rng.choice(["fre", "und"]), rng.choice(["fr", "fr-CA", "fr-FR", "und"]), rng.choice(VFQ_TRACK_NAMES + VFF_TRACK_NAMES + FRENCH_TRACK_NAMES))
+
+
+def create_media_info(seed: int, index: int) -> dict:
+    # Each document is created from its own random generator.
+    # Any document of the corpus can be created again without creating the previous ones.
+    rng = random.Random("{0}-{1}".format(seed, index))
+
+    title, duration_seconds = get_release_title(rng)
+    file_name_flag = get_weighted_choice(rng, FILE_NAME_FLAGS)
+    resolution = rng.choice(RESOLUTIONS)
+    video_codec = rng.choice(VIDEO_CODECS)
+    group = rng.choice(["GRP", "FRENCHiES", "QCMUX", "NOTAG", "AnimeFR"])
+    is_anime = (group == "AnimeFR")
+    file_name = get_release_file_name(title, file_name_flag, resolution, rng.choice(SOURCES), video_codec[2], group)
+
+    builder = MediaBuilder(rng, duration_seconds)
+    builder.add_video_track(video_codec, resolution, rng.choice([None, title, title + " " + resolution]))
+
+    # Audio tracks
+    if (file_name_flag != "VO"):
+        add_french_audio_tracks(builder, rng, file_name_flag)
+    if (file_name_flag in ["VF2", "VO", "MULTi", None] or rng.random() < 0.7):
+        builder.add_audio_track("eng", "en", rng.choice(ENGLISH_TRACK_NAMES))
+    if (rng.random() < 0.1):
+        builder.add_audio_track(rng.choice(["eng", "fre"]), rng.choice(["en", "fr"]), rng.choice(AD_TRACK_NAMES))
+    if (rng.random() < 0.1):
+        builder.add_audio_track("eng", "en", rng.choice(COMMENTARY_TRACK_NAMES))
+    for i in range(rng.choice([0, 0, 0, 1, 2, 4]) if not is_anime else rng.randint(2, 30)):
+        language, language_ietf = rng.choice(OTHER_AUDIO_LANGUAGES)
+        builder.add_audio_track(language, language_ietf, rng.choice(["", language.upper()]))
+
+    # Subtitles tracks. Forced subtitles only have a few frames per hour.
+    subtitles_codec = rng.choice(SUBTITLES_CODECS) if not is_anime else SUBTITLES_CODECS[1]
+    subtitles_count = rng.choice([0, 1, 2, 2, 3, 4, 6]) if not is_anime else rng.randint(10, 80)
+    for i in range(subtitles_count):
+        language, language_ietf, full_name, forced_name = rng.choice(SUBTITLES_LANGUAGES)
+        if (rng.random() < 0.3):
+            track_name = rng.choice([forced_name, full_name, ""])
+            number_of_frames = rng.randint(5, 60) * duration_seconds // 3600
+        else:
+            track_name = rng.choice([full_name, full_name + " SDH", full_name + " (DVD)", ""])
+            number_of_frames = rng.randint(400, 1500) * duration_seconds // 3600
+        if (rng.random() < 0.1):
+            number_of_frames = None
+        builder.add_subtitles_track(subtitles_codec, language, language_ietf, track_name, number_of_frames)
+
+    if (is_anime):
+        builder.add_font_attachments(rng.randint(3, len(FONT_NAMES)))
+
+    container_title = rng.choice([None, "", title, file_name[:-len(".mkv")]])
+    chapters_count = rng.choice([0, 0, 6, 12, 24, 150])
+    return builder.get_media_info(file_name, container_title, chapters_count)
+
+
+def get_corpus_file_name(json_obj: dict, index: int) -> str:
+    # The index keeps the names unique. Different releases may have the same name.
+    file_name = json_obj['file_name']
+    return "{0:06d} {1}.json".format(index, file_name[:-len(".mkv")])
+
+
+def generate_corpus(output_dir: str, count: int = DEFAULT_CORPUS_SIZE, seed: int = DEFAULT_SEED):
+    # Writes `count` documents, each in its own json file, to the output directory.
+    # The 'file_name' of each document is set to the media file the document describes.
+    os.makedirs(output_dir, exist_ok=True)
+    for index in range(count):
+        json_obj = create_media_info(seed, index)
+        corpus_file_name = get_corpus_file_name(json_obj, index)
+        json_obj['file_name'] = corpus_file_name[:-len(".json")] + ".mkv"
+        with open(os.path.join(output_dir, corpus_file_name), "w", encoding="utf-8") as file:
+            json.dump(json_obj, file, indent=2, ensure_ascii=False)
+        if ((index + 1) % 10000 == 0 or index + 1 == count):
+            print("Generated " + str(index + 1) + " of " + str(count) + " files.", flush=True)